@@ -0,0 +1,228 @@
+"""Token lifecycle management for the Systemair SAVE Connect integration."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from typing import Any, Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+from systemair.saveconnect import SaveConnect
+
+from .const import (DOMAIN, HA_SC_AUTHENTICATION_INTERVAL,
+                    TOKEN_REFRESH_MARGIN, TOKEN_STORAGE_VERSION)
+from .util import async_create_background_task
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _token_store(hass: HomeAssistant, email: str) -> Store:
+    """Return the store of the tokens of an account."""
+    return Store(hass, TOKEN_STORAGE_VERSION, f"{DOMAIN}.token_{slugify(email)}")
+
+
+async def async_remove_token(hass: HomeAssistant, email: str) -> None:
+    """Remove the stored tokens of an account."""
+    await _token_store(hass, email).async_remove()
+
+
+def _password_hash(password: str, salt: str) -> str:
+    """Return the salted hash of a password, binding stored tokens to the password they were issued for."""
+    return hashlib.sha256(f"{salt}:{password}".encode()).hexdigest()
+
+
+class SaveConnectTokenManager:
+    """Persist the SaveConnect tokens of an account and refresh them before they expire.
+
+    On restart the stored tokens are reused without a full login, provided they were issued for the
+    same password. All refreshes, whether
+    scheduled or triggered by an unauthorized response in the library, are serialized so
+    that concurrent requests share a single re-authentication.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: SaveConnect) -> None:
+        """Initialize the token manager."""
+        self._hass = hass
+        self._sc = client
+        self._store = _token_store(hass, client.email)
+        self._lock = asyncio.Lock()
+
+        """Expiry of the access and refresh token, as unix timestamps."""
+        self._expires_at = 0.0
+        self._refresh_expires_at = 0.0
+
+        """Monotonic timestamp of the last completed refresh or login."""
+        self._last_refresh = 0.0
+        self._unsub_refresh: Callable[[], None] | None = None
+
+        """The task listening to the websocket, started once logged in."""
+        self._ws_task: asyncio.Task | None = None
+
+        self.login_count = 0
+        self.refresh_count = 0
+
+        """Route the refreshes done by the library itself through the manager."""
+        self._sc.refresh_token = self.async_refresh_token
+
+    async def async_login(self) -> bool:
+        """Authenticate, reusing the stored tokens when they are still valid."""
+        async with self._lock:
+            stored = await self._store.async_load()
+            if (
+                    stored
+                    and self._password_matches(stored)
+                    and stored["refresh_expires_at"] > time.time() + TOKEN_REFRESH_MARGIN
+            ):
+                _LOGGER.debug("Reusing stored SaveConnect token for %s", self._sc.email)
+                self._apply_token(stored["token"], stored["expires_at"], stored["refresh_expires_at"])
+
+                if self._expires_at > time.time() + TOKEN_REFRESH_MARGIN:
+                    self._async_schedule_refresh()
+                    self.async_start_websocket()
+                    return True
+
+                if await self._async_refresh():
+                    self.async_start_websocket()
+                    return True
+
+            return await self._async_full_login()
+
+    def _password_matches(self, stored: dict[str, Any]) -> bool:
+        """Return True if the stored tokens were issued for the password of the client.
+
+        Tokens stored without a password hash are not reused.
+        """
+        if "password_hash" not in stored:
+            return False
+        return hmac.compare_digest(
+            stored["password_hash"], _password_hash(self._sc.password, stored["password_salt"])
+        )
+
+    async def async_refresh_token(self) -> None:
+        """Refresh the tokens. Callers waiting on a refresh in progress reuse its result."""
+        requested_at = time.monotonic()
+        async with self._lock:
+            if self._last_refresh > requested_at:
+                return
+
+            if not await self._async_refresh():
+                await self._async_full_login()
+
+    @callback
+    def async_start_websocket(self) -> None:
+        """Listen to the websocket with the current token, if push is enabled and it is not listening yet.
+
+        The library connects it in a task it does not keep. Here the task is kept, to be cancelled on close.
+        """
+        if not self._sc.ws_enabled:
+            return
+
+        self._sc._ws.set_access_token(self._sc.auth.token)
+        if self._ws_task is not None and not self._ws_task.done():
+            return
+
+        self._ws_task = async_create_background_task(
+            self._hass, self._sc._ws.listen_forever(), f"{DOMAIN} websocket {self._sc.email}"
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the scheduled refresh."""
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+
+    async def async_close(self) -> None:
+        """Cancel the scheduled refresh and stop listening to the websocket."""
+        self.async_stop()
+        if self._ws_task is not None:
+            self._ws_task.cancel()
+            await asyncio.gather(self._ws_task, return_exceptions=True)
+            self._ws_task = None
+
+    async def _async_full_login(self) -> bool:
+        """Log in with email and password.
+
+        The library reports any answer of the token endpoint as a successful login, including the error
+        returned for wrong credentials, so the token itself is checked.
+        """
+        self.login_count += 1
+        if not await self._sc.auth.auth(self._sc.email, self._sc.password) or "access_token" not in self._sc.auth.token:
+            return False
+
+        self._sc.graphql.set_access_token(self._sc.auth.token)
+        await self._async_token_updated(self._sc.auth.token)
+        self.async_start_websocket()
+        return True
+
+    async def _async_refresh(self) -> bool:
+        """Refresh the access token using the refresh token. Returns False if it was rejected."""
+        self.refresh_count += 1
+        previous = self._sc.auth.token
+        try:
+            await self._sc.auth.refresh_token()
+        except Exception as e:  # pylint: disable=broad-except
+            _LOGGER.warning("Could not refresh SaveConnect token for %s: %s", self._sc.email, e)
+            return False
+
+        """The library swallows connection timeouts, leaving the previous token in place."""
+        token = self._sc.auth.token
+        if token is previous:
+            _LOGGER.warning("Could not refresh SaveConnect token for %s: no response", self._sc.email)
+            return False
+        if "access_token" not in token:
+            _LOGGER.info("SaveConnect token refresh was rejected for %s", self._sc.email)
+            return False
+
+        self._sc.graphql.set_access_token(token)
+        self._sc._ws.set_access_token(token)
+        await self._async_token_updated(token)
+        return True
+
+    async def _async_token_updated(self, token: dict[str, Any]) -> None:
+        """Record the expiry of a new token, persist it and schedule its refresh."""
+        now = time.time()
+        self._apply_token(
+            token,
+            now + token.get("expires_in", HA_SC_AUTHENTICATION_INTERVAL),
+            now + token.get("refresh_expires_in", HA_SC_AUTHENTICATION_INTERVAL),
+        )
+        self._last_refresh = time.monotonic()
+
+        salt = secrets.token_hex(16)
+        await self._store.async_save({
+            "token": token,
+            "expires_at": self._expires_at,
+            "refresh_expires_at": self._refresh_expires_at,
+            "password_salt": salt,
+            "password_hash": _password_hash(self._sc.password, salt),
+        })
+        self._async_schedule_refresh()
+
+    def _apply_token(self, token: dict[str, Any], expires_at: float, refresh_expires_at: float) -> None:
+        self._sc.auth.token = token
+        self._sc.graphql.set_access_token(token)
+
+        """The library treats the token as valid only once its own expiry has passed. Keep it in the past,
+        so that it does not refresh before every read."""
+        self._sc.auth._token_expiry = 0
+
+        self._expires_at = expires_at
+        self._refresh_expires_at = refresh_expires_at
+
+    @callback
+    def _async_schedule_refresh(self) -> None:
+        """Schedule a refresh shortly before the access token expires."""
+        self.async_stop()
+        delay = max(self._expires_at - time.time() - TOKEN_REFRESH_MARGIN, 0)
+        self._unsub_refresh = async_call_later(self._hass, delay, self._async_scheduled_refresh)
+
+    async def _async_scheduled_refresh(self, _now) -> None:
+        self._unsub_refresh = None
+        await self.async_refresh_token()
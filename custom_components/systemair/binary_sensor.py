@@ -2,22 +2,24 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Callable
+from typing import Any, Callable
 
-from custom_components.systemair import SaveConnectDevice
+from custom_components.systemair.device import ALARM_BITS, ALARM_REGISTERS, SaveConnectDevice
 from custom_components.systemair.const import (DOMAIN,
                                                            SAVECONNECT_DEVICES,
                                                            SAVECONNECT_NAME)
+from custom_components.systemair.entity import SaveConnectEntity
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.components.sensor import SensorEntityDescription
+from homeassistant.core import callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 
 @dataclass
 class SaveConnectRequiredKeysMixin:
     """Mixin for required keys."""
-    value_fn: Callable
+    value_fn: Callable[[Any], bool]
+    registers: frozenset[int]
 
 
 @dataclass
@@ -27,39 +29,40 @@ class SaveConnectBinaryEntityDescription(
     """Describes SaveConnect sensor entities."""
 
 
+def _alarm_value_fn(bit: int) -> Callable[[SaveConnectDevice], bool]:
+    """Return a function that reads the alarm bit from a device."""
+    return lambda device: bool(device.state.alarms & bit)
+
+
+"""Alarm sensors are generated once from the alarm bitmask layout."""
+ALARM_SENSORS: tuple[SaveConnectBinaryEntityDescription, ...] = tuple(
+    SaveConnectBinaryEntityDescription(
+        key=key,
+        name=' '.join([x.capitalize() for x in key.split("_")]),
+        value_fn=_alarm_value_fn(bit),
+        registers=frozenset({ALARM_REGISTERS[key]}),
+        entity_registry_enabled_default=True,
+    )
+    for key, bit in ALARM_BITS.items()
+)
+
+
 async def async_setup_entry(hass, entry, async_add_entities: AddEntitiesCallback):
     """Add sensors for passed config_entry in HA."""
     entry_config = hass.data[DOMAIN][entry.entry_id]
 
     sc_devices = entry_config.get(SAVECONNECT_DEVICES)
 
-    binary_sensor_descriptions: list[SaveConnectBinaryEntityDescription, ...] = []
-    for device in sc_devices:
-        """Retrieve all alarm_ prefixed sensor names."""
-        sensor_names = [x for x in dir(device.state) if x.startswith("alarm_")]
-
-        for sensor_key in sensor_names:
-            def wrap(dev, key):
-                return lambda: getattr(dev.state, key) == 'active'
-
-            binary_sensor_descriptions.append(SaveConnectBinaryEntityDescription(
-                key=sensor_key,
-                name=' '.join([x.capitalize() for x in sensor_key.split("_")]),
-                value_fn=wrap(device, sensor_key),
-                entity_registry_enabled_default=True,
-            )
-            )
-
     entities = [
         SaveConnectDeviceSensor(sc_device, description)
-        for description in binary_sensor_descriptions
         for sc_device in sc_devices
+        for description in ALARM_SENSORS
     ]
 
     async_add_entities(entities)
 
 
-class SaveConnectDeviceSensor(CoordinatorEntity, BinarySensorEntity):
+class SaveConnectDeviceSensor(SaveConnectEntity, BinarySensorEntity):
     """Representation of a BinarySensor."""
 
     entity_description: SaveConnectBinaryEntityDescription
@@ -70,14 +73,20 @@ class SaveConnectDeviceSensor(CoordinatorEntity, BinarySensorEntity):
             description: SaveConnectBinaryEntityDescription,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(device.coordinator)
-        self._device: SaveConnectDevice = device
+        super().__init__(device)
+        self._registers = description.registers
 
         self._attr_has_entity_name = True
         self._attr_name = f"{description.name}"
         self._attr_unique_id = f"{SAVECONNECT_NAME}-{device.device_id}-{description.key}"
         self.entity_description = description
+        self._async_update_from_device()
+
+    @callback
+    def _async_update_from_device(self) -> None:
+        self._attr_is_on = self.entity_description.value_fn(self._device)
 
     @property
-    def is_on(self):
-        return self.entity_description.value_fn()
+    def extra_state_attributes(self):
+        """Return True while the state is restored from a snapshot."""
+        return {"stale": self._device.stale}
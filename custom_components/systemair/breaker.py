@@ -0,0 +1,123 @@
+"""Circuit breakers of the Systemair SAVE Connect integration, per device and per account."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from .const import (HA_SC_BREAKER_FAILURE_THRESHOLD, HA_SC_BREAKER_MAX_RESET_TIMEOUT,
+                    HA_SC_BREAKER_RESET_TIMEOUT)
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class SaveConnectCircuitBreaker:
+    """Stop sending requests to a device or an account that keeps failing.
+
+    The breaker is closed while requests succeed. After `failure_threshold` consecutive failures it
+    opens, and requests are refused without any network I/O. Once `reset_timeout` has passed, it is
+    half-open: a single probe request is let through. If the probe succeeds, the breaker closes. If
+    it fails, the breaker opens again, for twice as long, up to `max_reset_timeout`.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int = HA_SC_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout: float = HA_SC_BREAKER_RESET_TIMEOUT.total_seconds(),
+            max_reset_timeout: float = HA_SC_BREAKER_MAX_RESET_TIMEOUT.total_seconds(),
+    ) -> None:
+        """Initialize a closed breaker."""
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._max_reset_timeout = max_reset_timeout
+
+        self._state = STATE_CLOSED
+        self._failures = 0
+
+        """Monotonic timestamp after which an open breaker is half-open, and how long it was opened for."""
+        self._open_until = 0.0
+        self._open_timeout = reset_timeout
+
+        """True while the probe of a half-open breaker is in progress, and when it was allowed. A probe whose
+        outcome was never recorded, e.g. as it was cancelled, is given up on after the reset timeout."""
+        self._probing = False
+        self._probe_started = 0.0
+
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and time.monotonic() >= self._open_until:
+            return STATE_HALF_OPEN
+        return self._state
+
+    @property
+    def closed(self) -> bool:
+        return self._state == STATE_CLOSED
+
+    @property
+    def open(self) -> bool:
+        return self.state == STATE_OPEN
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent. In the half-open state, only the probe is allowed."""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+
+        now = time.monotonic()
+        if state == STATE_HALF_OPEN and (not self._probing or now - self._probe_started > self._open_timeout):
+            self._probing = True
+            self._probe_started = now
+            return True
+
+        self.short_circuited += 1
+        return False
+
+    def cancel_probe(self) -> None:
+        """Give back the probe of a half-open breaker, when it was allowed but not sent."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        if self._state != STATE_CLOSED:
+            _LOGGER.info("Requests to %s succeed again, resuming", self.name)
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._probing = False
+        self._open_timeout = self._reset_timeout
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing:
+            self._probing = False
+            self._open(min(self._open_timeout * 2, self._max_reset_timeout))
+        elif self._state == STATE_CLOSED and self._failures >= self._failure_threshold:
+            self._open(self._reset_timeout)
+
+    def trip(self) -> None:
+        """Open the breaker now, e.g. when a device could not be set up."""
+        if self._state == STATE_CLOSED:
+            self._open(self._reset_timeout)
+
+    def _open(self, timeout: float) -> None:
+        if self._state == STATE_CLOSED:
+            _LOGGER.warning("Requests to %s are failing, pausing them for %ds", self.name, timeout)
+            self.times_opened += 1
+        self._state = STATE_OPEN
+        self._open_timeout = timeout
+        self._open_until = time.monotonic() + timeout
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+        }
@@ -0,0 +1,135 @@
+"""Catalog of the numeric registers of the Systemair SAVE Connect integration exposed as sensors.
+
+Sensors are generated from this catalog and disabled by default. As registers are only read
+while an enabled entity depends on them, catalog sensors cost nothing until they are enabled.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
+from homeassistant.const import (CONCENTRATION_PARTS_PER_MILLION, PERCENTAGE, PRESSURE_PA,
+                                 TEMP_CELSIUS, TIME_MONTHS)
+from systemair.saveconnect.register import Register
+
+
+@dataclass(frozen=True)
+class CatalogRegister:
+    """A numeric register, and how to present it as a sensor."""
+
+    key: str
+    name: str
+    register: int
+
+    """The raw value is divided by the scale, e.g. 10 for temperatures in tenths of a degree."""
+    scale: float = 1
+    unit: str | None = None
+    device_class: SensorDeviceClass | None = None
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+    icon: str | None = None
+
+
+def _temperature(key: str, name: str, register: int) -> CatalogRegister:
+    return CatalogRegister(
+        key=key,
+        name=name,
+        register=register,
+        scale=10,
+        unit=TEMP_CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        icon="mdi:temperature-celsius",
+    )
+
+
+REGISTER_CATALOG: tuple[CatalogRegister, ...] = (
+    _temperature("extract_temperature", "Extract Temperature", Register.REG_SENSOR_EAT),
+    _temperature("room_temperature", "Room Temperature", Register.REG_SENSOR_RAT),
+    _temperature("frost_protection_temperature", "Frost Protection Temperature", Register.REG_SENSOR_FPT),
+    _temperature("extra_controller_temperature", "Extra Controller Temperature", Register.REG_SENSOR_ECT),
+    _temperature("efficiency_temperature", "Efficiency Temperature", Register.REG_SENSOR_EFT),
+    CatalogRegister(
+        key="relative_humidity",
+        name="Relative Humidity",
+        register=Register.REG_SENSOR_RHS,
+        unit=PERCENTAGE,
+        device_class=SensorDeviceClass.HUMIDITY,
+        icon="mdi:water-percent",
+    ),
+    CatalogRegister(
+        key="co2",
+        name="CO2",
+        register=Register.REG_SENSOR_CO2S,
+        unit=CONCENTRATION_PARTS_PER_MILLION,
+        device_class=SensorDeviceClass.CO2,
+        icon="mdi:molecule-co2",
+    ),
+    CatalogRegister(
+        key="supply_air_pressure",
+        name="Supply Air Pressure",
+        register=Register.REG_SENSOR_P_SAF,
+        unit=PRESSURE_PA,
+        device_class=SensorDeviceClass.PRESSURE,
+        icon="mdi:gauge",
+    ),
+    CatalogRegister(
+        key="extract_air_pressure",
+        name="Extract Air Pressure",
+        register=Register.REG_SENSOR_P_EAF,
+        unit=PRESSURE_PA,
+        device_class=SensorDeviceClass.PRESSURE,
+        icon="mdi:gauge",
+    ),
+    CatalogRegister(
+        key="supply_air_flow",
+        name="Supply Air Flow",
+        register=Register.REG_SENSOR_FLOW_SAF,
+        unit="m³/h",
+        icon="mdi:weather-windy",
+    ),
+    CatalogRegister(
+        key="extract_air_flow",
+        name="Extract Air Flow",
+        register=Register.REG_SENSOR_FLOW_EAF,
+        unit="m³/h",
+        icon="mdi:weather-windy",
+    ),
+    CatalogRegister(
+        key="supply_fan_speed",
+        name="Supply Fan Speed",
+        register=Register.REG_SENSOR_RPM_SAF,
+        unit="rpm",
+        icon="mdi:fan",
+    ),
+    CatalogRegister(
+        key="extract_fan_speed",
+        name="Extract Fan Speed",
+        register=Register.REG_SENSOR_RPM_EAF,
+        unit="rpm",
+        icon="mdi:fan",
+    ),
+    CatalogRegister(
+        key="supply_fan_output",
+        name="Supply Fan Output",
+        register=Register.REG_OUTPUT_SAF,
+        unit=PERCENTAGE,
+        icon="mdi:fan-chevron-up",
+    ),
+    CatalogRegister(
+        key="extract_fan_output",
+        name="Extract Fan Output",
+        register=Register.REG_OUTPUT_EAF,
+        unit=PERCENTAGE,
+        icon="mdi:fan-chevron-down",
+    ),
+    CatalogRegister(
+        key="filter_period",
+        name="Filter Period",
+        register=Register.REG_FILTER_PERIOD,
+        unit=TIME_MONTHS,
+        state_class=None,
+        icon="mdi:air-filter",
+    ),
+)
+
+"""Registers of the catalog."""
+CATALOG_REGISTERS: frozenset[int] = frozenset(entry.register for entry in REGISTER_CATALOG)
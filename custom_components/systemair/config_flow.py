@@ -7,13 +7,21 @@ from typing import Any
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant import config_entries, exceptions
-from homeassistant.auth.providers.homeassistant import InvalidAuth
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
-from homeassistant.core import HomeAssistant
-
-from .const import (DOMAIN, HA_SC_AUTHENTICATION_INTERVAL, HA_SC_CLOUD_PUSH,
-                    HA_SC_CLOUD_PUSH_DEFAULT)
-from .gateway import SaveConnectAPI
+from homeassistant.const import CONF_EMAIL, CONF_HOST, CONF_PASSWORD, CONF_PORT
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (DOMAIN, HA_SC_CLOUD_PUSH, HA_SC_DEBUG_SENSORS,
+                    HA_SC_CLOUD_PUSH_DEFAULT, HA_SC_IMPORT_STATISTICS, HA_SC_MAX_CONCURRENT_REQUESTS,
+                    HA_SC_MAX_CONCURRENT_REQUESTS_DEFAULT, HA_SC_MAX_POLL_INTERVAL,
+                    HA_SC_MAX_POLL_INTERVAL_DEFAULT, HA_SC_MIN_POLL_INTERVAL,
+                    HA_SC_MIN_POLL_INTERVAL_DEFAULT, HA_SC_MODBUS_MAX_BLOCK_SIZE,
+                    HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT, HA_SC_MODBUS_MAX_GAP,
+                    HA_SC_MODBUS_MAX_GAP_DEFAULT, HA_SC_MODBUS_PORT_DEFAULT,
+                    HA_SC_MODBUS_SLAVE, HA_SC_MODBUS_SLAVE_DEFAULT,
+                    HA_SC_PUSH_SILENCE_WINDOW, HA_SC_PUSH_SILENCE_WINDOW_DEFAULT,
+                    HA_SC_TRANSPORT, HA_SC_TRANSPORT_CLOUD, HA_SC_TRANSPORT_LOCAL)
+from .gateway import async_discard_api, async_get_api
+from .modbus import SaveConnectModbusAPI
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,6 +31,14 @@ DATA_SCHEMA = vol.Schema({
     vol.Optional(HA_SC_CLOUD_PUSH, default=HA_SC_CLOUD_PUSH_DEFAULT): cv.boolean,
 }, required=True)
 
+LOCAL_DATA_SCHEMA = vol.Schema({
+    vol.Required(CONF_HOST): vol.basestring,
+    vol.Optional(CONF_PORT, default=HA_SC_MODBUS_PORT_DEFAULT): cv.port,
+    vol.Optional(HA_SC_MODBUS_SLAVE, default=HA_SC_MODBUS_SLAVE_DEFAULT): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=247)
+    ),
+}, required=True)
+
 
 async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
     """Validate the user input allows us to connect.
@@ -30,26 +46,46 @@ async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
     Data has the keys from DATA_SCHEMA with values provided by the user.
     """
 
-    hub = SaveConnectAPI(
+    """The authenticated client stays in the shared registry, where the new entry picks it up."""
+    hub = await async_get_api(
         hass,
         email=data[CONF_EMAIL],
         password=data[CONF_PASSWORD],
         ws_enabled=data[HA_SC_CLOUD_PUSH],
-        refresh_token_interval=HA_SC_AUTHENTICATION_INTERVAL,
-        loop=hass.loop
     )
 
-    result = await hub.test_connection()
-    if not result:
-        raise CannotConnect
+    authenticated = False
+    try:
+        result = await hub.test_connection()
+        if not result:
+            raise CannotConnect
 
-    auth_result = await hub.auth()
-    if not auth_result:
-        raise InvalidAuth
+        authenticated = await hub.auth()
+        if not authenticated:
+            raise InvalidAuth
+    finally:
+        """A client no entry uses is only kept once logged in."""
+        if not authenticated and not hub.ref_count:
+            await async_discard_api(hass, hub)
 
     return {"title": f"{data[CONF_EMAIL]}"}
 
 
+async def validate_local_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
+    """Validate the unit answers over Modbus/TCP.
+
+    Data has the keys from LOCAL_DATA_SCHEMA with values provided by the user.
+    """
+    api = SaveConnectModbusAPI(hass, host=data[CONF_HOST], port=data[CONF_PORT], slave=data[HA_SC_MODBUS_SLAVE])
+    try:
+        if not await api.auth():
+            raise CannotConnect
+    finally:
+        await api.async_close()
+
+    return {"title": f"{data[CONF_HOST]}"}
+
+
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Hello World."""
 
@@ -57,24 +93,117 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
 
     async def async_step_user(self, user_input=None):
-        """Handle the initial step."""
+        """Handle the initial step, choosing between the SaveConnect cloud and a local connection."""
+        return self.async_show_menu(
+            step_id="user",
+            menu_options=[HA_SC_TRANSPORT_CLOUD, HA_SC_TRANSPORT_LOCAL]
+        )
+
+    async def async_step_cloud(self, user_input=None):
+        """Handle the SaveConnect account step."""
         errors = {}
         if user_input is not None:
             try:
                 info = await validate_input(self.hass, user_input)
-                return self.async_create_entry(title=info["title"], data=user_input)
+                return self.async_create_entry(
+                    title=info["title"],
+                    data={**user_input, HA_SC_TRANSPORT: HA_SC_TRANSPORT_CLOUD}
+                )
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidHost:
                 errors["host"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+
+        return self.async_show_form(
+            step_id="cloud", data_schema=DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_local(self, user_input=None):
+        """Handle the Modbus/TCP step."""
+        errors = {}
+        if user_input is not None:
+            try:
+                info = await validate_local_input(self.hass, user_input)
+                return self.async_create_entry(
+                    title=info["title"],
+                    data={**user_input, HA_SC_TRANSPORT: HA_SC_TRANSPORT_LOCAL}
+                )
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
 
         return self.async_show_form(
-            step_id="user", data_schema=DATA_SCHEMA, errors=errors
+            step_id="local", data_schema=LOCAL_DATA_SCHEMA, errors=errors
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry):
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options for Systemair."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        schema = {
+            vol.Optional(
+                HA_SC_PUSH_SILENCE_WINDOW,
+                default=options.get(HA_SC_PUSH_SILENCE_WINDOW, HA_SC_PUSH_SILENCE_WINDOW_DEFAULT)
+            ): vol.All(vol.Coerce(int), vol.Range(min=30)),
+            vol.Optional(
+                HA_SC_MAX_CONCURRENT_REQUESTS,
+                default=options.get(HA_SC_MAX_CONCURRENT_REQUESTS, HA_SC_MAX_CONCURRENT_REQUESTS_DEFAULT)
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+            vol.Optional(
+                HA_SC_MIN_POLL_INTERVAL,
+                default=options.get(HA_SC_MIN_POLL_INTERVAL, HA_SC_MIN_POLL_INTERVAL_DEFAULT)
+            ): vol.All(vol.Coerce(int), vol.Range(min=10)),
+            vol.Optional(
+                HA_SC_MAX_POLL_INTERVAL,
+                default=options.get(HA_SC_MAX_POLL_INTERVAL, HA_SC_MAX_POLL_INTERVAL_DEFAULT)
+            ): vol.All(vol.Coerce(int), vol.Range(min=10)),
+            vol.Optional(
+                HA_SC_DEBUG_SENSORS,
+                default=options.get(HA_SC_DEBUG_SENSORS, False)
+            ): cv.boolean,
+            vol.Optional(
+                HA_SC_IMPORT_STATISTICS,
+                default=options.get(HA_SC_IMPORT_STATISTICS, False)
+            ): cv.boolean,
+        }
+
+        if self.config_entry.data.get(HA_SC_TRANSPORT) == HA_SC_TRANSPORT_LOCAL:
+            schema.update({
+                vol.Optional(
+                    HA_SC_MODBUS_MAX_GAP,
+                    default=options.get(HA_SC_MODBUS_MAX_GAP, HA_SC_MODBUS_MAX_GAP_DEFAULT)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=124)),
+                vol.Optional(
+                    HA_SC_MODBUS_MAX_BLOCK_SIZE,
+                    default=options.get(HA_SC_MODBUS_MAX_BLOCK_SIZE, HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=125)),
+            })
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
+
 
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -82,3 +211,7 @@ class CannotConnect(exceptions.HomeAssistantError):
 
 class InvalidHost(exceptions.HomeAssistantError):
     """Error to indicate there is an invalid hostname."""
+
+
+class InvalidAuth(exceptions.HomeAssistantError):
+    """Error to indicate there is invalid auth."""
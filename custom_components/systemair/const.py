@@ -1,41 +1,96 @@
 """Constants for the Systemair integration."""
-
-from homeassistant.components.climate.const import FAN_HIGH, FAN_LOW, FAN_OFF
-from systemair.saveconnect.const import Airflow, UserModes
+from datetime import timedelta
 
 DOMAIN = "systemair"
 
 HA_SC_AUTHENTICATION_INTERVAL = 300
+
+TOKEN_STORAGE_VERSION = 1
+TOKEN_REFRESH_MARGIN = 60
+SNAPSHOT_STORAGE_VERSION = 1
+
+"""Delay, in seconds, before the snapshot of the device state is saved."""
+SNAPSHOT_SAVE_DELAY = 60
+
+"""Readings of the measurement sensors the recorder does not record, like disabled sensors, can be imported as
+hourly long-term statistics, see statistics.py."""
+HA_SC_IMPORT_STATISTICS = "import_statistics"
+STATISTICS_STORAGE_VERSION = 1
+STATISTICS_SAVE_DELAY = 60
+
+HA_SC_TRANSPORT = "transport"
+HA_SC_TRANSPORT_CLOUD = "cloud"
+HA_SC_TRANSPORT_LOCAL = "local"
+
+HA_SC_MODBUS_SLAVE = "slave"
+HA_SC_MODBUS_SLAVE_DEFAULT = 1
+HA_SC_MODBUS_PORT_DEFAULT = 502
+HA_SC_MODBUS_TIMEOUT = 5
+
+"""Unused registers read to merge two block reads, and registers read in a single Modbus request (at most 125)."""
+HA_SC_MODBUS_MAX_GAP = "modbus_max_gap"
+HA_SC_MODBUS_MAX_GAP_DEFAULT = 16
+HA_SC_MODBUS_MAX_BLOCK_SIZE = "modbus_max_block_size"
+HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT = 125
+
 HA_SC_CLOUD_PUSH = "cloud_push"
 
 HA_SC_CLOUD_PUSH_DEFAULT = True
 
+HA_SC_PUSH_SILENCE_WINDOW = "push_silence_window"
+HA_SC_PUSH_SILENCE_WINDOW_DEFAULT = 300
+
+HA_SC_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+HA_SC_MAX_CONCURRENT_REQUESTS_DEFAULT = 4
+
+"""Timeout, in seconds, of a single SaveConnect request, from when it is sent."""
+HA_SC_REQUEST_TIMEOUT = 30
+
+"""Requests per second to the SaveConnect API, and requests that can be sent at once, across all entries.
+The rate is multiplied by the backoff factor after a failed request, and raised by the recovery step after a
+successful one."""
+HA_SC_REQUEST_RATE = 2.0
+HA_SC_REQUEST_BURST = 10
+HA_SC_REQUEST_RATE_MIN = 0.1
+HA_SC_REQUEST_RATE_BACKOFF = 0.5
+HA_SC_REQUEST_RATE_RECOVERY = 0.05
+
+"""Consecutive failed requests after which requests to a device or an account are paused, and for how long.
+The pause doubles after each failed probe, up to the maximum."""
+HA_SC_BREAKER_FAILURE_THRESHOLD = 3
+HA_SC_BREAKER_RESET_TIMEOUT = timedelta(seconds=30)
+HA_SC_BREAKER_MAX_RESET_TIMEOUT = timedelta(minutes=15)
+HA_SC_SETUP_RETRY_INTERVAL = timedelta(seconds=30)
+
+"""The device view read by the library."""
+DEVICE_HOME_ROUTE = "/device/home"
+
+"""Interval between reads of the device info views."""
+DEVICE_INFO_REFRESH_INTERVAL = timedelta(hours=6)
+
+"""Delay, in seconds, used to coalesce successive commands and to confirm them with a single read."""
+COMMAND_COALESCE_DELAY = 0.5
+COMMAND_CONFIRM_DELAY = 5
+
+HA_SC_DEBUG_SENSORS = "debug_sensors"
+
+HA_SC_MIN_POLL_INTERVAL = "min_poll_interval"
+HA_SC_MIN_POLL_INTERVAL_DEFAULT = 30
+HA_SC_MAX_POLL_INTERVAL = "max_poll_interval"
+HA_SC_MAX_POLL_INTERVAL_DEFAULT = 300
+
+"""How long to poll at the minimum interval after a command or an alarm transition."""
+POLL_ACTIVITY_WINDOW = timedelta(minutes=2)
+MAX_POLL_BACKOFF_INTERVAL = timedelta(minutes=15)
+
+SAVECONNECT_API = "saveconnect_api"
+SAVECONNECT_CLIENTS = "systemair_clients"
+SAVECONNECT_SCHEDULER = "systemair_scheduler"
+SAVECONNECT_MODBUS_CONNECTIONS = "systemair_modbus_connections"
 SAVECONNECT_DEVICES = "saveconnect_devices"
+SAVECONNECT_COORDINATOR = "saveconnect_coordinator"
 SAVECONNECT_NAME = "SAVE Connect"
 SAVECONNECT_UNITS_FAHRENHEIT = "UNITS_FAHRENHEIT"
 SAVECONNECT_UNITS_CELSIUS = "UNITS_CELSIUS"
 SAVECONNECT_FAN_MINIMUM = "minimum"
 SAVECONNECT_FAN_MAXIMUM = "maximum"
-SAVECONNECT_FAN_MODES = [FAN_OFF, FAN_LOW, "normal", FAN_HIGH]
-
-
-SAVECONNECT_AIRFLOW_TO_STR_SETTABLE = {
-    Airflow.OFF: Airflow.OFF,
-    Airflow.MINIMUM: Airflow.LOW,
-    Airflow.NORMAL: Airflow.NORMAL,
-    Airflow.HIGH: Airflow.HIGH,
-    Airflow.MAXIMUM: Airflow.HIGH
-}
-
-SAVECONNECT_MODE_TO_STR_SETTABLE = {
-    UserModes.AUTO: "Auto",
-    UserModes.MANUAL: "Manual",
-    UserModes.AWAY: "Away",
-    UserModes.CROWDED: "Crowded",
-    UserModes.FIREPLACE: "Fireplace",
-    UserModes.HOLIDAY: "Holiday"
-}
-
-STR_TO_SAVECONNECT_PROFILE_SETTABLE = {
-    value: key for (key, value) in SAVECONNECT_MODE_TO_STR_SETTABLE.items()
-}
@@ -0,0 +1,211 @@
+"""Coordinators for the Systemair SAVE Connect integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .const import DOMAIN, MAX_POLL_BACKOFF_INTERVAL
+
+if TYPE_CHECKING:
+    from .device import SaveConnectDevice, SaveConnectDeviceData
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SaveConnectPollScheduler:
+    """Adaptive poll interval driven by device activity and the error rate.
+
+    Polls at `min_interval` for `activity_window` after a command or an alarm transition.
+    While the operational state (user mode, airflow level and alarms) is stable, the
+    interval doubles each poll up to `max_interval`. Consecutive failed polls back off
+    further, up to MAX_POLL_BACKOFF_INTERVAL.
+    """
+
+    def __init__(self, min_interval: timedelta, max_interval: timedelta, activity_window: timedelta) -> None:
+        """Initialize the scheduler."""
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self._activity_window = activity_window.total_seconds()
+
+        """Monotonic timestamp until which the device is polled at the minimum interval."""
+        self._active_until = 0.0
+
+        """Number of consecutive polls without state changes, and of consecutive failed polls."""
+        self._stable_polls = 0
+        self._failed_polls = 0
+
+    def notify_activity(self) -> None:
+        """Poll at the minimum interval for the activity window."""
+        self._active_until = time.monotonic() + self._activity_window
+        self._stable_polls = 0
+
+    def next_interval(self, success: bool, state_changed: bool, alarm_changed: bool) -> timedelta:
+        """Return the interval until the next poll, given the outcome of the last one."""
+        if not success:
+            self._failed_polls += 1
+            return min(
+                max(self.min_interval * (2 ** min(self._failed_polls, 16)), self._stable_interval),
+                max(MAX_POLL_BACKOFF_INTERVAL, self.max_interval)
+            )
+        self._failed_polls = 0
+
+        if alarm_changed:
+            self.notify_activity()
+        elif state_changed:
+            self._stable_polls = 0
+        else:
+            self._stable_polls += 1
+
+        if time.monotonic() < self._active_until:
+            return self.min_interval
+
+        return self._stable_interval
+
+    @property
+    def _stable_interval(self) -> timedelta:
+        return min(self.min_interval * (2 ** min(self._stable_polls, 16)), self.max_interval)
+
+
+class SaveConnectCoordinator(DataUpdateCoordinator):
+    """Hybrid push/poll coordinator for all SaveConnect devices of a config entry.
+
+    The coordinator data maps each device ID to that device's state. Each refresh
+    cycle reads every device concurrently, bounded by `max_concurrent_requests`.
+
+    Devices whose register pushes keep arriving over the websocket are not polled.
+    Polling of a device only resumes once no push from it has been seen for
+    `silence_window`, at the interval chosen by the SaveConnectPollScheduler.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            name: str,
+            push_enabled: bool,
+            scheduler: SaveConnectPollScheduler,
+            silence_window: timedelta,
+            max_concurrent_requests: int,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}-{name}",
+            # Polling interval. Will only be polled if there are subscribers.
+            update_interval=scheduler.min_interval,
+        )
+        self.devices: dict[str, SaveConnectDevice] = {}
+        self.data: dict[str, SaveConnectDeviceData] = {}
+
+        self._push_enabled = push_enabled
+        self.scheduler = scheduler
+        self._silence_window = silence_window
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+        """Monotonic timestamp of the last register push received, by device ID."""
+        self._last_push: dict[str, float] = {}
+
+        """Latency of the last poll cycle, in seconds, in total and per device ID."""
+        self.last_cycle_latency: float | None = None
+        self.last_device_latencies: dict[str, float] = {}
+
+    def add_device(self, device: SaveConnectDevice) -> None:
+        """Add a device to the refresh cycle."""
+        self.devices[device.device_id] = device
+        self.data[device.device_id] = device.state
+
+    def push_healthy(self, device_id: str) -> bool:
+        """Return True if a push from the device has been received within the silence window."""
+        last_push = self._last_push.get(device_id)
+        if not self._push_enabled or last_push is None:
+            return False
+        return time.monotonic() - last_push < self._silence_window.total_seconds()
+
+    @callback
+    def async_handle_push(self, device: SaveConnectDevice, changed: bool) -> None:
+        """Register a pushed register update, publishing the state if it changed.
+
+        Listeners are notified without rescheduling the refresh, so that pushes from one device do not
+        postpone the polls of the others. Without push, the updates are the echoes of writes.
+        """
+        if self._push_enabled:
+            self._last_push[device.device_id] = time.monotonic()
+
+        if changed:
+            self.async_update_listeners()
+
+    @callback
+    def async_notify_activity(self) -> None:
+        """Poll at the minimum interval for a while, e.g. after a command, and notify listeners."""
+        self.scheduler.notify_activity()
+        if not all(self.push_healthy(device_id) for device_id in self.devices):
+            self.update_interval = self.scheduler.min_interval
+        # Also reschedules the next refresh with the new interval.
+        self.async_set_updated_data(self.data)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the derived metrics and notify listeners, then reset the changed registers of every device."""
+        for device in self.devices.values():
+            device.derived.async_update(device.changed_registers)
+        super().async_update_listeners()
+        for device in self.devices.values():
+            device.changed_registers.clear()
+            device.metrics.end_cycle()
+
+    async def _async_update_device(self, device: SaveConnectDevice) -> bool:
+        """Poll a single device, recording its latency."""
+        async with self.semaphore:
+            start = time.monotonic()
+            success = False
+            try:
+                success = await device.async_update()
+                return success
+            finally:
+                latency = time.monotonic() - start
+                self.last_device_latencies[device.device_id] = latency
+                device.metrics.record_poll(success, latency)
+
+    async def _async_update_data(self) -> dict[str, SaveConnectDeviceData]:
+        """Poll all devices in one cycle, except those the websocket is keeping fresh."""
+        polled = [device for device in self.devices.values() if not self.push_healthy(device.device_id)]
+        if not polled and self.devices:
+            """Check again when the push of a device may have gone quiet."""
+            self.update_interval = max(
+                timedelta(seconds=min(self._last_push.values()) - time.monotonic()) + self._silence_window,
+                self.scheduler.min_interval
+            )
+            return self.data
+
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(self._async_update_device(device) for device in polled)
+        )
+        self.last_cycle_latency = time.monotonic() - start
+
+        """A device failing on its own only opens its breaker. The devices of an entry share their account, whose
+        breaker counts a failure when all the devices sending requests failed, e.g. as the account is unreachable."""
+        sent = [success for device, success in zip(polled, results) if device.update_sent]
+        if sent and not any(sent):
+            polled[0].api.breaker.record_failure()
+
+        _LOGGER.debug(
+            "Polled %d devices in %.3fs (per device: %s)",
+            len(results),
+            self.last_cycle_latency,
+            {device_id: round(latency, 3) for device_id, latency in self.last_device_latencies.items()}
+        )
+
+        self.update_interval = self.scheduler.next_interval(
+            success=any(results) or not results,
+            state_changed=any(device.has_state_changes() for device in polled),
+            alarm_changed=any(device.has_alarm_changes() for device in polled),
+        )
+
+        return self.data
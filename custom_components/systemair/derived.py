@@ -0,0 +1,167 @@
+"""Metrics derived from the registers of a device in the Systemair SAVE Connect integration.
+
+Each metric is recomputed only when one of its input registers changed, with a constant amount
+of work, once per coordinator cycle. Recovered energy is integrated over time on every cycle. The
+filter is reported by when it is due, a timestamp that does not change as time passes.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+from systemair.saveconnect.register import Register
+
+from .const import MAX_POLL_BACKOFF_INTERVAL, SAVECONNECT_UNITS_FAHRENHEIT
+
+if TYPE_CHECKING:
+    from .device import SaveConnectDevice
+
+"""Heat capacity of air per volume, in J/(m³·K), at about 20 °C."""
+AIR_VOLUMETRIC_HEAT_CAPACITY = 1.2 * 1005
+
+"""Below this difference between extract and outdoor air, in K, the efficiency is not meaningful."""
+MIN_EFFICIENCY_TEMPERATURE_DIFFERENCE = 2.0
+
+"""Average length of a month, in days, used with the filter period in months."""
+DAYS_PER_MONTH = 30.44
+
+"""Temperatures, in tenths of a degree, used for the heat recovery metrics."""
+RECOVERY_TEMPERATURE_REGISTERS: frozenset[int] = frozenset({
+    Register.REG_SENSOR_OAT,
+    Register.REG_SENSOR_SAT,
+    Register.REG_SENSOR_PDM_EAT_VALUE,
+})
+RECOVERY_REGISTERS: frozenset[int] = RECOVERY_TEMPERATURE_REGISTERS | frozenset({Register.REG_SENSOR_FLOW_SAF})
+
+"""Differences in the filter due date below this are the countdown of the unit being read at another time."""
+FILTER_DUE_TOLERANCE = timedelta(hours=1)
+
+"""Alarms raised when the filter is due. The filter is assumed replaced when they are cleared."""
+FILTER_ALARMS = ("alarm_filter_change", "alarm_filter_warning")
+FILTER_REGISTERS: frozenset[int] = frozenset({
+    Register.REG_FILTER_PERIOD,
+    Register.REG_FILTER_REMAINING_TIME_L,
+    Register.REG_ALARM_FILTER_ALARM,
+    Register.REG_ALARM_FILTER_WARNING_ALARM,
+})
+
+
+class SaveConnectDerivedMetrics:
+    """Heat exchanger efficiency, recovered power and energy, and filter due date of a device."""
+
+    def __init__(self, device: SaveConnectDevice) -> None:
+        self._device = device
+
+        """Temperature efficiency, in %, and recovered power, in W. None when they cannot be computed."""
+        self.efficiency: float | None = None
+        self.recovered_power: float | None = None
+
+        """Recovered energy, in kWh, integrated from the recovered power since the device was added."""
+        self.recovered_energy = 0.0
+        self._last_integration: float | None = None
+
+        """When the filter was last replaced and when it is due, and whether a filter alarm is active."""
+        self.filter_replaced: datetime | None = None
+        self.filter_due: datetime | None = None
+        self._filter_alarm: bool | None = None
+
+        """Set while the device state is unknown, so that all metrics are recomputed once it is known again."""
+        self._recompute = True
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "recovered_energy": self.recovered_energy,
+            "filter_replaced": self.filter_replaced.isoformat() if self.filter_replaced else None,
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        self.recovered_energy = snapshot.get("recovered_energy", 0.0)
+        if snapshot.get("filter_replaced"):
+            self.filter_replaced = dt_util.parse_datetime(snapshot["filter_replaced"])
+
+    @callback
+    def async_update(self, changed_registers: set[int]) -> None:
+        """Update the metrics after a coordinator cycle, recomputing those whose inputs changed."""
+        if self._device.stale or not self._device.available:
+            """No energy is accounted for while the device state is unknown."""
+            self._last_integration = None
+            self._recompute = True
+            return
+
+        self._integrate_energy()
+
+        if self._recompute or not changed_registers.isdisjoint(RECOVERY_REGISTERS):
+            self._update_recovery()
+
+        if self._recompute or not changed_registers.isdisjoint(FILTER_REGISTERS):
+            self._update_filter()
+
+        self._recompute = False
+
+    def _integrate_energy(self) -> None:
+        """Add the energy recovered at the power of the previous cycle. Cooling recovered in summer counts too."""
+        now = time.monotonic()
+        if self._last_integration is not None and self.recovered_power is not None:
+            elapsed = min(now - self._last_integration, MAX_POLL_BACKOFF_INTERVAL.total_seconds())
+            self.recovered_energy += abs(self.recovered_power) * elapsed / 3_600_000
+        self._last_integration = now
+
+    def _temperature(self, register: int) -> float | None:
+        value = self._device.register_value(register)
+        return None if value is None else float(value) / 10
+
+    def _update_recovery(self) -> None:
+        outdoor = self._temperature(Register.REG_SENSOR_OAT)
+        supply = self._temperature(Register.REG_SENSOR_SAT)
+        extract = self._temperature(Register.REG_SENSOR_PDM_EAT_VALUE)
+        if outdoor is None or supply is None or extract is None:
+            self.efficiency = self.recovered_power = None
+            return
+
+        """Temperatures are in the unit of the device. Differences are converted to kelvin."""
+        scale = 5 / 9 if self._device.device.units.temperature == SAVECONNECT_UNITS_FAHRENHEIT else 1
+        recovered = (supply - outdoor) * scale
+        available = (extract - outdoor) * scale
+
+        if abs(available) < MIN_EFFICIENCY_TEMPERATURE_DIFFERENCE:
+            self.efficiency = None
+        else:
+            self.efficiency = round(max(0.0, min(100.0, recovered / available * 100)), 1)
+
+        """Supply air flow is in m³/h. Units without flow sensors report no recovered power."""
+        flow = self._device.register_value(Register.REG_SENSOR_FLOW_SAF)
+        if not flow:
+            self.recovered_power = None
+        else:
+            self.recovered_power = round(AIR_VOLUMETRIC_HEAT_CAPACITY * float(flow) / 3600 * recovered, 1)
+
+    def _update_filter(self) -> None:
+        """Update when the filter is due, from the filter countdown of the unit, or from when it was replaced.
+
+        The replacement date is seeded from the countdown and the filter period, so that it is known without
+        seeing the filter alarms being cleared. While an alarm is active, the filter is due since it was raised.
+        """
+        now = dt_util.utcnow()
+        filter_alarm = any(self._device.state.is_alarm_active(key) for key in FILTER_ALARMS)
+        if self._filter_alarm and not filter_alarm:
+            self.filter_replaced = now
+        self._filter_alarm = filter_alarm
+
+        value = self._device.register_value(Register.REG_FILTER_PERIOD)
+        period = timedelta(days=float(value) * DAYS_PER_MONTH) if value else None
+        remaining = self._device.register_value(Register.REG_FILTER_REMAINING_TIME_L)
+
+        if filter_alarm:
+            if self.filter_due is None or self.filter_due > now:
+                self.filter_due = now
+        elif remaining is not None:
+            due = now + timedelta(seconds=float(remaining))
+            if self.filter_due is None or abs(due - self.filter_due) > FILTER_DUE_TOLERANCE:
+                self.filter_due = due
+                if period is not None:
+                    self.filter_replaced = due - period
+        elif self.filter_replaced is not None and period is not None:
+            self.filter_due = self.filter_replaced + period
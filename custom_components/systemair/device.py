@@ -0,0 +1,806 @@
+"""Devices of the Systemair SAVE Connect integration, and their setup.
+
+This module imports the SaveConnect library, and with it its HTTP, websocket and pydantic
+dependencies. It is imported in the executor when the first config entry is set up, so that
+none of this lands on the event loop while Home Assistant starts.
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import sys
+import time
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_EMAIL, CONF_HOST, CONF_PORT, ATTR_MODEL
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.entity import DeviceInfo
+from systemair.saveconnect.const import UserModes, Airflow, APIRoutes
+from systemair.saveconnect.models import SaveConnectDevice as ExtSaveConnectDevice
+from systemair.saveconnect.models import SaveConnectRegisterItem
+from systemair.saveconnect.register import Register
+from .config_flow import InvalidAuth
+from .const import (COMMAND_COALESCE_DELAY, COMMAND_CONFIRM_DELAY, DEVICE_HOME_ROUTE, DEVICE_INFO_REFRESH_INTERVAL,
+                    DOMAIN, HA_SC_CLOUD_PUSH,
+                    HA_SC_MODBUS_MAX_BLOCK_SIZE, HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT,
+                    HA_SC_MODBUS_MAX_GAP, HA_SC_MODBUS_MAX_GAP_DEFAULT,
+                    HA_SC_MODBUS_SLAVE, HA_SC_SETUP_RETRY_INTERVAL,
+                    HA_SC_TRANSPORT, HA_SC_TRANSPORT_CLOUD, HA_SC_TRANSPORT_LOCAL, MAX_POLL_BACKOFF_INTERVAL)
+from .coordinator import SaveConnectCoordinator
+from .gateway import SaveConnectAPI, async_acquire_api, async_release_api
+from .modbus import SaveConnectModbusAPI
+from .breaker import SaveConnectCircuitBreaker
+from .derived import SaveConnectDerivedMetrics
+from .metrics import SaveConnectDeviceMetrics
+from .snapshot import SaveConnectSnapshotStore
+from .util import async_cancel_on_unload, async_create_background_task
+
+_LOGGER = logging.getLogger(__name__)
+
+MANUFACTURER = "Systemair"
+
+"""The device info views, read at setup and every DEVICE_INFO_REFRESH_INTERVAL."""
+DEVICE_INFO_ROUTES = (
+    APIRoutes.VIEWS_UNIT_INFORMATION_COMPONENTS_DESC,
+    APIRoutes.VIEWS_UNIT_INFORMATION_SENSORS_DESC,
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_INPUT_STATUS_DESC,
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_OUTPUT_STATUS_DESC,
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_DATE_TIME_TITLE,
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_VERSION_DESC,
+)
+
+async def async_acquire_transport(hass: HomeAssistant, entry: ConfigEntry) -> SaveConnectAPI | SaveConnectModbusAPI:
+    """Return the transport of the config entry, the SaveConnect cloud or a local Modbus/TCP connection."""
+    if entry.data.get(HA_SC_TRANSPORT, HA_SC_TRANSPORT_CLOUD) == HA_SC_TRANSPORT_LOCAL:
+        return SaveConnectModbusAPI(
+            hass,
+            host=entry.data[CONF_HOST],
+            port=entry.data[CONF_PORT],
+            slave=entry.data[HA_SC_MODBUS_SLAVE],
+            max_gap=entry.options.get(HA_SC_MODBUS_MAX_GAP, HA_SC_MODBUS_MAX_GAP_DEFAULT),
+            max_block_size=entry.options.get(HA_SC_MODBUS_MAX_BLOCK_SIZE, HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT),
+        )
+
+    """Clients are shared between the config flow and all entries of the same account."""
+    return await async_acquire_api(
+        hass,
+        email=entry.data[CONF_EMAIL],
+        password=entry.data[CONF_PASSWORD],
+        ws_enabled=entry.data[HA_SC_CLOUD_PUSH],
+    )
+
+
+async def async_release_transport(hass: HomeAssistant, api: SaveConnectAPI | SaveConnectModbusAPI) -> None:
+    """Release the transport of a config entry."""
+    if isinstance(api, SaveConnectModbusAPI):
+        await api.async_close()
+    else:
+        await async_release_api(hass, api)
+
+
+async def async_auth_login(api: SaveConnectAPI | SaveConnectModbusAPI):
+    """Authenticate towards the SaveConnect API."""
+    auth_result = await api.auth()
+    if not auth_result:
+        raise InvalidAuth
+
+
+async def save_connect_device_setup(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api: SaveConnectAPI | SaveConnectModbusAPI,
+        coordinator: SaveConnectCoordinator,
+        snapshot: SaveConnectSnapshotStore
+):
+    """Set up the devices of the entry.
+
+    When a snapshot of the devices exists, they are restored from it, and the first refresh runs
+    in the background. Otherwise, setup waits for the first refresh.
+    """
+    stored = await snapshot.async_load()
+    if stored:
+        sc_devices = api.restore_devices([device_snapshot["device"] for device_snapshot in stored.values()])
+    else:
+        sc_devices = await api.get_devices(update=True, fetch_device_info=False)
+
+    devices = [SaveConnectDevice(
+        device=device,
+        api=api,
+        coordinator=coordinator
+    ) for device in sc_devices]
+
+    for device in devices:
+        if device.device_id in stored:
+            device.restore(stored[device.device_id])
+
+    snapshot.async_track(devices)
+    entry.async_on_unload(coordinator.async_add_listener(snapshot.async_schedule_save))
+
+    if not stored:
+        await async_refresh_devices(hass, entry, coordinator, devices)
+        return devices
+
+    _LOGGER.info("Restored %d SaveConnect devices from snapshot", len(devices))
+    refresh_task = hass.async_create_task(
+        async_refresh_restored_devices(hass, entry, api, coordinator, devices, snapshot)
+    )
+    async_cancel_on_unload(entry, refresh_task)
+    return devices
+
+
+async def async_refresh_restored_devices(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api: SaveConnectAPI | SaveConnectModbusAPI,
+        coordinator: SaveConnectCoordinator,
+        devices: list[SaveConnectDevice],
+        snapshot: SaveConnectSnapshotStore
+) -> None:
+    """Refresh devices restored from the snapshot, reloading the entry if the account has other devices now.
+
+    The library answers an empty listing when the API cannot be reached. As a failed listing, it leaves the
+    devices unknown, and the snapshot is kept.
+    """
+    try:
+        sc_devices = await api.get_devices(update=True, fetch_device_info=False)
+    except Exception as e:  # pylint: disable=broad-except
+        _LOGGER.warning("Could not list the devices of %s: %s", entry.title, e)
+    else:
+        if not sc_devices:
+            _LOGGER.warning("Listing the devices of %s returned none, keeping the snapshot", entry.title)
+        elif {device.identifier for device in sc_devices} != {device.device_id for device in devices}:
+            _LOGGER.info("The devices of %s changed since the snapshot, reloading", entry.title)
+            snapshot.async_track([])
+            await snapshot.async_remove()
+            hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+            return
+
+    await async_refresh_devices(hass, entry, coordinator, devices)
+
+
+async def async_refresh_devices(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: SaveConnectCoordinator,
+        devices: list[SaveConnectDevice]
+) -> None:
+    """Fetch the device info and refresh all devices."""
+    start = time.monotonic()
+
+    """Fetch device info concurrently. Devices that fail are retried in the background."""
+    device_info_results = await asyncio.gather(
+        *(async_update_device_info(device, coordinator.semaphore) for device in devices)
+    )
+    device_info_time = time.monotonic() - start
+
+    for device, success in zip(devices, device_info_results):
+        if success:
+            continue
+        if not device.stale:
+            device.mark_unavailable()
+        """The retries can go on for long, so they do not hold up the startup of Home Assistant."""
+        retry_task = async_create_background_task(
+            hass, async_retry_device_setup(device, coordinator), f"{DOMAIN} retry setup {device.device_id}"
+        )
+        async_cancel_on_unload(entry, retry_task)
+
+    """Refresh all devices in a single cycle."""
+    await coordinator.async_refresh()
+
+    _LOGGER.info(
+        "Set up %d SaveConnect devices in %.2fs (device info: %.2fs, first refresh: %.2fs, failed: %d)",
+        len(devices),
+        time.monotonic() - start,
+        device_info_time,
+        time.monotonic() - start - device_info_time,
+        device_info_results.count(False)
+    )
+
+
+async def async_update_device_info(
+        device: SaveConnectDevice,
+        semaphore: asyncio.Semaphore
+) -> bool:
+    """Fetch the device info of a single device. Returns False if it failed."""
+    async with semaphore:
+        return await device.async_update_device_info()
+
+
+async def async_retry_device_setup(
+        device: SaveConnectDevice,
+        coordinator: SaveConnectCoordinator
+) -> None:
+    """Retry fetching the device info of a device that failed during setup, with backoff."""
+    retry_interval = HA_SC_SETUP_RETRY_INTERVAL
+    while True:
+        await asyncio.sleep(retry_interval.total_seconds())
+
+        if await async_update_device_info(device, coordinator.semaphore):
+            device.mark_succeeded()
+            break
+
+        retry_interval = min(retry_interval * 2, MAX_POLL_BACKOFF_INTERVAL)
+
+    await device.async_update()
+    coordinator.async_update_listeners()
+    _LOGGER.info("Set up %s after retrying", device.name)
+
+
+"""Alarm keys and the register holding each alarm. The order defines the bit of each alarm in the alarm bitmask."""
+ALARM_REGISTERS: dict[str, int] = {
+    "alarm_supply_air_fan_control": Register.REG_ALARM_SAF_CTRL_ALARM,
+    "alarm_extract_air_fan_control": Register.REG_ALARM_EAF_CTRL_ALARM,
+    "alarm_frost_protection": Register.REG_ALARM_FROST_PROT_ALARM,
+    "alarm_defrosting_malfunction": Register.REG_ALARM_DEFROSTING_ALARM,
+    "alarm_supply_air_fan_rpm": Register.REG_ALARM_SAF_RPM_ALARM,
+    "alarm_extract_air_fan_rpm": Register.REG_ALARM_EAF_RPM_ALARM,
+    "alarm_frost_protection_sensor": Register.REG_ALARM_FPT_ALARM,
+    "alarm_outdoor_air_temperature_sensor": Register.REG_ALARM_OAT_ALARM,
+    "alarm_supply_air_temperature_sensor": Register.REG_ALARM_SAT_ALARM,
+    "alarm_room_air_temperature_sensor": Register.REG_ALARM_RAT_ALARM,
+    "alarm_extract_air_temperature_sensor": Register.REG_ALARM_EAT_ALARM,
+    "alarm_extra_controller_temperature": Register.REG_ALARM_ECT_ALARM,
+    "alarm_efficiency_temperature": Register.REG_ALARM_EFT_ALARM,
+    "alarm_overheat_temperature": Register.REG_ALARM_OHT_ALARM,
+    "alarm_emergency_thermostat": Register.REG_ALARM_EMT_ALARM,
+    "alarm_rotor_guard_sensor": Register.REG_ALARM_RGS_ALARM,
+    "alarm_bypass_damper_malfunction": Register.REG_ALARM_BYS_ALARM,
+    "alarm_secondary_air_damper_position": Register.REG_ALARM_SECONDARY_AIR_ALARM,
+    "alarm_filter_change": Register.REG_ALARM_FILTER_ALARM,
+    "alarm_extra_controller_malfunction": Register.REG_ALARM_EXTRA_CONTROLLER_ALARM,
+    "alarm_external_stop": Register.REG_ALARM_EXTERNAL_STOP_ALARM,
+    "alarm_relative_humidity_sensor": Register.REG_ALARM_RH_ALARM,
+    "alarm_co2_sensor": Register.REG_ALARM_CO2_ALARM,
+    "alarm_supply_air_temperature_low": Register.REG_ALARM_LOW_SAT_ALARM,
+    "alarm_bypass_damper_feedback": Register.REG_ALARM_BYF_ALARM,
+    "alarm_builtin_relative_humidity_sensor": Register.REG_ALARM_PDM_RHS_ALARM,
+    "alarm_builtin_extract_air_temperature": Register.REG_ALARM_PDM_EAT_ALARM,
+    "alarm_manual_stop": Register.REG_ALARM_MANUAL_FAN_STOP_ALARM,
+    "alarm_overheat_temperature2": Register.REG_ALARM_OVERHEAT_TEMPERATURE_ALARM,
+    "alarm_fire_alarm": Register.REG_ALARM_FIRE_ALARM_ALARM,
+    "alarm_filter_warning": Register.REG_ALARM_FILTER_WARNING_ALARM,
+}
+
+"""Bit of each alarm in SaveConnectDeviceData.alarms, by alarm key and by register."""
+ALARM_BITS: dict[str, int] = {key: 1 << i for i, key in enumerate(ALARM_REGISTERS)}
+ALARM_REGISTER_BITS: dict[int, int] = {register: ALARM_BITS[key] for key, register in ALARM_REGISTERS.items()}
+
+
+_MISSING = object()
+
+"""Slotted dataclasses require Python 3.10."""
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclasses.dataclass(**_DATACLASS_SLOTS)
+class SaveConnectDeviceData:
+    device_model: str = None
+
+    user_mode: str = None
+    airflow_level: str = None
+
+    main_board_version_major: int = None
+    main_board_version_minor: int = None
+    main_board_version_build: int = None
+
+    iam_version_major: int = None
+    iam_version_minor: int = None
+    iam_version_build: int = None
+
+    """Bitmask of active alarms, see ALARM_BITS."""
+    alarms: int = 0
+
+    def is_alarm_active(self, key: str) -> bool:
+        return bool(self.alarms & ALARM_BITS[key])
+
+    @property
+    def any_alarm_active(self) -> bool:
+        return self.alarms != 0
+
+    @property
+    def active_alarm_count(self) -> int:
+        return bin(self.alarms).count("1")
+
+    @property
+    def active_alarms(self) -> list[str]:
+        return [key for key, bit in ALARM_BITS.items() if self.alarms & bit]
+
+    @property
+    def iam_version(self):
+        return f"{self.iam_version_major}.{self.iam_version_minor}.{self.iam_version_build}"
+
+    @property
+    def main_board_version(self):
+        return f"{self.main_board_version_major}.{self.main_board_version_minor}.{self.main_board_version_build}"
+
+
+"""Register to SaveConnectDeviceData field index used when dispatching register updates. Alarms use ALARM_REGISTER_BITS."""
+REGISTER_STATE_FIELDS: dict[int, str] = {
+    Register.REG_USERMODE_MODE_HMI: "user_mode",
+    Register.REG_USERMODE_HMI_CHANGE_REQUEST: "user_mode",
+    Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF: "airflow_level",
+    Register.REG_SPEED_INDICATION_APP: "airflow_level",
+    Register.REG_SYSTEM_UNIT_MODEL1: "device_model",
+}
+
+"""Registers describing the operational state of a device."""
+STATE_REGISTERS: frozenset[int] = frozenset(REGISTER_STATE_FIELDS) | frozenset(ALARM_REGISTER_BITS)
+
+"""Registers that rarely change, or whose changes are not needed on every poll, like the filter countdown.
+They are only refreshed with the device info."""
+SLOW_REGISTERS: frozenset[int] = frozenset({
+    Register.REG_SYSTEM_UNIT_MODEL1,
+    Register.REG_FILTER_PERIOD,
+    Register.REG_FILTER_REMAINING_TIME_L,
+    Register.REG_PU_RUNNING_VERSION_MAJOR,
+    Register.REG_PU_RUNNING_VERSION_MINOR,
+    Register.REG_PU_RUNNING_VERSION_BUILD,
+})
+
+"""Version registers are shared by the main board (internalDeviceType=1) and the IAM (internalDeviceType=2)."""
+VERSION_REGISTER_STATE_FIELDS: dict[int, dict[int, str]] = {
+    Register.REG_PU_RUNNING_VERSION_MAJOR: {
+        1: "main_board_version_major",
+        2: "iam_version_major",
+    },
+    Register.REG_PU_RUNNING_VERSION_MINOR: {
+        1: "main_board_version_minor",
+        2: "iam_version_minor",
+    },
+    Register.REG_PU_RUNNING_VERSION_BUILD: {
+        1: "main_board_version_build",
+        2: "iam_version_build",
+    },
+}
+
+
+class SaveConnectDevice:
+    """SaveConnect Device instance."""
+
+    def __init__(
+            self,
+            device: ExtSaveConnectDevice,
+            api: SaveConnectAPI | SaveConnectModbusAPI,
+            coordinator: SaveConnectCoordinator
+    ):
+        self.state = SaveConnectDeviceData()
+        self.device = device
+
+        """Last raw value of each register, used to detect changes."""
+        self._register_values: dict[int, Any] = {}
+
+        """Registers changed since the coordinator last notified its listeners."""
+        self.changed_registers: set[int] = set()
+
+        """Poll, push, callback and entity write metrics."""
+        self.metrics = SaveConnectDeviceMetrics()
+
+        """Heat recovery and filter metrics derived from the registers."""
+        self.derived = SaveConnectDerivedMetrics(self)
+
+        """Registers the enabled entities depend on, counted per entity."""
+        self._required_registers: Counter[int] = Counter()
+
+        """Registers returned by each device view."""
+        self._route_registers: dict[str, set[int]] = {}
+
+        """Monotonic timestamp after which the device info views are read again."""
+        self._next_device_info_read = 0.0
+
+        """True while the state is restored from a snapshot, until the first successful update."""
+        self.stale = False
+
+        """Add sensor callback."""
+        self.device.add_update_callback(self._on_register_update)
+
+        """Populate state data."""
+        self.populate_state_data(device)
+
+        """Set SaveConnect attribute."""
+        self.api: SaveConnectAPI | SaveConnectModbusAPI = api
+
+        """Pauses requests to the device while they keep failing, and drives its availability."""
+        self.breaker = SaveConnectCircuitBreaker(f"device {device.identifier}")
+
+        """False if the last update sent no request, as a breaker was open."""
+        self.update_sent = False
+
+        """The coordinator object, shared by all devices of the config entry."""
+        self._coordinator: SaveConnectCoordinator = coordinator
+        coordinator.add_device(self)
+
+        """Pushed register updates waiting to be applied as one batch, and the scheduled flush."""
+        self._push_buffer: list[tuple[int, Any, Any]] = []
+        self._push_flush: asyncio.Handle | None = None
+
+        """Extra attributes for the device."""
+        self._extra_attributes = {}
+
+        """Commands waiting to be written, and the register values to revert to if a write fails."""
+        self._pending_airflow: str | None = None
+        self._pending_mode: str | None = None
+        self._rollback: dict[int, Any] = {}
+
+        self._command_debouncer = Debouncer(
+            coordinator.hass,
+            _LOGGER,
+            cooldown=COMMAND_COALESCE_DELAY,
+            immediate=False,
+            function=self._async_flush_commands,
+        )
+        self._confirm_debouncer = Debouncer(
+            coordinator.hass,
+            _LOGGER,
+            cooldown=COMMAND_CONFIRM_DELAY,
+            immediate=False,
+            function=self._async_confirm_commands,
+        )
+
+    def populate_state_data(self, device):
+        for attr in device.registry.dict().keys():
+            register = getattr(device.registry, attr)
+            if not register:
+                continue
+            self.set_update_callback(register.register_, register.value, register)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the device metadata, state and registers, to be restored on the next setup."""
+        registers = []
+        for attr in self.device.registry.dict().keys():
+            register = getattr(self.device.registry, attr)
+            if register:
+                registers.append(register.dict(by_alias=True))
+
+        return {
+            "device": self.device.dict(exclude={"registry", "cb"}),
+            "state": dataclasses.asdict(self.state),
+            "registers": registers,
+            "derived": self.derived.snapshot(),
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        """Restore the state and registers of a snapshot. They are stale until the first successful update."""
+        for field in dataclasses.fields(self.state):
+            if field.name in snapshot["state"]:
+                setattr(self.state, field.name, snapshot["state"][field.name])
+
+        for item in snapshot["registers"]:
+            attr = Register.map.get(str(item["register"]))
+            if attr is None:
+                continue
+            register = SaveConnectRegisterItem.parse_obj(item)
+            setattr(self.device.registry, attr, register)
+            self.set_update_callback(register.register_, register.value, register)
+
+        self.derived.restore(snapshot.get("derived", {}))
+        self.stale = True
+
+    def set_update_callback(self, register, value, metadata) -> bool:
+        """When API returns data, the register values are sent to this callback.
+
+        Returns True if the register value changed. Changed registers are collected in changed_registers.
+        """
+        fields = VERSION_REGISTER_STATE_FIELDS.get(register)
+        if fields is not None:
+            """Version registers are shared between boards, so their change is tracked on the state field."""
+            field = fields.get(getattr(metadata, "internalDeviceType", None))
+            if field is None or getattr(self.state, field) == value:
+                return False
+            setattr(self.state, field, value)
+            self.changed_registers.add(register)
+            return True
+
+        if self._register_values.get(register, _MISSING) == value:
+            return False
+
+        self._register_values[register] = value
+        self.changed_registers.add(register)
+
+        bit = ALARM_REGISTER_BITS.get(register)
+        if bit is not None:
+            if value == 'active':
+                self.state.alarms |= bit
+            else:
+                self.state.alarms &= ~bit
+        else:
+            field = REGISTER_STATE_FIELDS.get(register)
+            if field is not None:
+                setattr(self.state, field, value)
+
+        return True
+
+    def register_value(self, register: int):
+        """Return the last raw value of a register, or None if it has not been read."""
+        return self._register_values.get(register)
+
+    def has_state_changes(self) -> bool:
+        """Return True if the user mode, airflow level or an alarm changed since listeners were last notified."""
+        return not self.changed_registers.isdisjoint(STATE_REGISTERS)
+
+    def has_alarm_changes(self) -> bool:
+        """Return True if an alarm changed since listeners were last notified."""
+        return not self.changed_registers.isdisjoint(ALARM_REGISTER_BITS)
+
+    def _on_register_update(self, register, value, metadata):
+        """Apply a register update from the library, buffering pushes until the next event loop iteration.
+
+        Updates dispatched while the transport decodes a view read of this device are applied at once,
+        and attributed to the view. The reader notifies the listeners. Any other update, like a push or
+        the echo of a write, is buffered. A websocket frame carries many registers, which the library
+        dispatches one by one within the same iteration. Buffering them applies the frame as one batch,
+        with a single coordinator update.
+        """
+        decoding_view = self.api.decoding_view
+        if decoding_view is not None and decoding_view[0] == self.device_id:
+            self.set_update_callback(register, value, metadata)
+            self._route_registers.setdefault(decoding_view[1], set()).add(register)
+        else:
+            self.metrics.record_push()
+            self._push_buffer.append((register, value, metadata))
+            if self._push_flush is None:
+                self._push_flush = self._coordinator.hass.loop.call_soon(self.async_flush_pushes)
+
+    @callback
+    def async_flush_pushes(self) -> None:
+        """Apply the buffered pushes, and forward them to the coordinator as one update."""
+        if self._push_flush is not None:
+            self._push_flush.cancel()
+            self._push_flush = None
+
+        if not self._push_buffer:
+            return
+
+        start = time.perf_counter()
+        batch, self._push_buffer = self._push_buffer, []
+        changed = False
+        for register, value, metadata in batch:
+            changed = self.set_update_callback(register, value, metadata) or changed
+
+        self._coordinator.async_handle_push(self, changed)
+        self.metrics.record_push_batch(len(batch))
+        self.metrics.record_callback(time.perf_counter() - start)
+
+    @callback
+    def async_unload(self) -> None:
+        """Detach from the library device, which outlives this entry when the client is shared."""
+        if self._on_register_update in self.device.cb:
+            self.device.cb.remove(self._on_register_update)
+        if self._push_flush is not None:
+            self._push_flush.cancel()
+            self._push_flush = None
+        self._push_buffer.clear()
+        self._command_debouncer.async_cancel()
+        self._confirm_debouncer.async_cancel()
+
+    @property
+    def registry(self):
+        return self.device.registry
+
+    @property
+    def name(self) -> Optional[str]:
+        if self.device_model is None:
+            return self.device.name
+        return f"{MANUFACTURER} {self.device_model}"
+
+    @property
+    def device_model(self):
+        return self.state.device_model
+
+    @callback
+    def async_require_registers(self, registers: Iterable[int]) -> None:
+        """Add registers that an enabled entity depends on to the registers read each poll."""
+        self._required_registers.update(registers)
+
+    @callback
+    def async_release_registers(self, registers: Iterable[int]) -> None:
+        """Remove registers of an entity that was removed or disabled."""
+        self._required_registers.subtract(registers)
+        self._required_registers += Counter()
+
+    def _plan_routes(self) -> list[str]:
+        """Select the device views that cover the registers of the enabled entities.
+
+        The registers each view returns are learned from earlier reads. Views are picked greedily,
+        preferring the one covering the most missing registers with the smallest payload. Registers
+        not known to be in any view fall back to the home view, which is what the library reads.
+        """
+        needed = set(self._required_registers) - SLOW_REGISTERS
+        routes = []
+        while needed:
+            route = max(
+                self._route_registers,
+                key=lambda x: (len(needed & self._route_registers[x]), -len(self._route_registers[x])),
+                default=None
+            )
+            if route is None or needed.isdisjoint(self._route_registers[route]):
+                break
+            routes.append(route)
+            needed -= self._route_registers[route]
+
+        if (needed or not routes) and DEVICE_HOME_ROUTE not in routes:
+            routes.append(DEVICE_HOME_ROUTE)
+
+        return routes
+
+    async def _async_read_routes(self, routes: Iterable[str]) -> bool:
+        """Read device views one by one, learning which registers each view returns.
+
+        Pushes received before the read are older than its values, so they are applied first.
+        """
+        self.async_flush_pushes()
+
+        route = None
+        try:
+            for route in routes:
+                self._route_registers[route] = set()
+                if not await self.api.read_view(self.device, route):
+                    return False
+            return True
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Reading %s of %s timed out", route, self.name)
+            return False
+        except Exception as e:  # pylint: disable=broad-except
+            _LOGGER.warning("Reading %s of %s raised an exception: %s", route, self.name, e)
+            return False
+
+    async def async_update_device_info(self) -> bool:
+        """Read the device info views, which hold slow-changing registers like versions and unit model."""
+        success = await self._async_read_routes(DEVICE_INFO_ROUTES)
+        if success:
+            self._next_device_info_read = time.monotonic() + DEVICE_INFO_REFRESH_INTERVAL.total_seconds()
+        return success
+
+    def _allow_request(self) -> bool:
+        """Return True if both the device and the account breakers let a request through."""
+        if not self.breaker.allow_request():
+            return False
+        if not self.api.breaker.allow_request():
+            self.breaker.cancel_probe()
+            return False
+        return True
+
+    async def async_update(self) -> bool:
+        """Pull the registers of the enabled entities from SaveConnect API.
+
+        While the breaker of the device or of its account is open, no request is sent.
+        """
+        self.update_sent = self._allow_request()
+        if not self.update_sent:
+            return False
+
+        if time.monotonic() >= self._next_device_info_read:
+            success = await self.async_update_device_info()
+        else:
+            success = True
+
+        success = success and await self._async_read_routes(self._plan_routes())
+
+        if success:
+            self.mark_succeeded()
+            self.stale = False
+        else:
+            _LOGGER.debug("Update failed for %s", self.name)
+            self.mark_failed()
+
+        return bool(success)
+
+    def mark_succeeded(self) -> None:
+        """Close the breakers of the device and of its account."""
+        self.breaker.record_success()
+        self.api.breaker.record_success()
+
+    def mark_failed(self) -> None:
+        """Count a failed request towards opening the breaker of the device.
+
+        The breaker of the account only counts the cycles in which every device failed, see the coordinator.
+        """
+        self.breaker.record_failure()
+
+    def mark_unavailable(self) -> None:
+        """Mark the device as unavailable until a probe request succeeds."""
+        self.breaker.trip()
+
+    @property
+    def coordinator(self) -> SaveConnectCoordinator:
+        """Return coordinator associated."""
+        return self._coordinator
+
+    async def async_set_fan_mode(self, mode: Airflow) -> None:
+        """Optimistically set the airflow level, and queue the write to the device."""
+        self._pending_airflow = mode
+        self._async_set_optimistic(Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF, mode)
+        await self._command_debouncer.async_call()
+
+    async def async_set_mode(self, mode: UserModes) -> None:
+        """Optimistically set the user mode, and queue the write to the device."""
+        self._pending_mode = mode
+        self._async_set_optimistic(Register.REG_USERMODE_MODE_HMI, mode)
+        await self._command_debouncer.async_call()
+
+    @callback
+    def _async_set_optimistic(self, register: int, value) -> None:
+        """Apply a value locally before it is confirmed by the device."""
+        self._rollback.setdefault(register, self._register_values.get(register))
+        self.set_update_callback(register, value, None)
+        self._coordinator.async_notify_activity()
+
+    async def _async_write(self, write_fn, register: int, value) -> None:
+        """Write a queued command, reverting the optimistic value if it fails."""
+        previous = self._rollback.pop(register, None)
+
+        if self.breaker.open or self.api.breaker.open:
+            """Fail fast while requests to the device or its account are paused."""
+            success = False
+        else:
+            try:
+                success = await write_fn(self.device, value)
+            except Exception as e:  # pylint: disable=broad-except
+                _LOGGER.warning("Writing %s to %s raised an exception: %s", value, self.name, e)
+                success = False
+
+        if not success:
+            _LOGGER.error("Error setting %s to: %s", self.name, value)
+            if self.set_update_callback(register, previous, None):
+                self._coordinator.async_update_listeners()
+
+    async def _async_flush_commands(self) -> None:
+        """Write the latest queued commands, coalescing rapid successive changes into one write each."""
+        mode, self._pending_mode = self._pending_mode, None
+        airflow, self._pending_airflow = self._pending_airflow, None
+
+        """The mode is written first, as the airflow level can only be set in manual mode."""
+        if mode is not None:
+            await self._async_write(
+                lambda device, value: self.api.user_mode.set_mode(device, value, duration=60),  # TODO duration
+                Register.REG_USERMODE_MODE_HMI,
+                mode
+            )
+        if airflow is not None:
+            await self._async_write(
+                self.api.user_mode.set_airflow,
+                Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF,
+                airflow
+            )
+
+        """Pushes confirm the write when the websocket is healthy. Otherwise read the device once."""
+        if not self._coordinator.push_healthy(self.device_id):
+            await self._confirm_debouncer.async_call()
+
+    async def _async_confirm_commands(self) -> None:
+        """Read the device to confirm the written commands."""
+        if await self.async_update():
+            self._coordinator.async_update_listeners()
+
+    @property
+    def available(self) -> bool:
+        """Return True while the breakers of the device and of its account are closed."""
+        return self.breaker.closed and self.api.breaker.closed
+
+    @property
+    def device_id(self):
+        """Return device ID."""
+        return self.device.identifier
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return a device description for device registry."""
+        _device_info = DeviceInfo(
+            identifiers={(DOMAIN, self.device_id)},
+            manufacturer=MANUFACTURER,
+            name=self.name
+        )
+        _device_info[ATTR_MODEL] = f"{MANUFACTURER} ({self.device.identifier})"
+
+        return _device_info
+
+    @property
+    def extra_attributes(self):
+        return {
+            "main_board_version": self.state.main_board_version,
+            "iam_version": self.state.iam_version,
+            "stale": self.stale
+        }
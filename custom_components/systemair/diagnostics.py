@@ -0,0 +1,46 @@
+"""Diagnostics support for the Systemair SAVE Connect integration."""
+from __future__ import annotations
+
+import dataclasses
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_EMAIL, CONF_HOST, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, SAVECONNECT_API, SAVECONNECT_COORDINATOR, SAVECONNECT_DEVICES
+
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+        hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_config = hass.data[DOMAIN][entry.entry_id]
+    api = entry_config[SAVECONNECT_API]
+    coordinator = entry_config[SAVECONNECT_COORDINATOR]
+    sc_devices = entry_config[SAVECONNECT_DEVICES]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "transport": async_redact_data(api.diagnostics(), TO_REDACT),
+        "coordinator": {
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "last_update_success": coordinator.last_update_success,
+            "last_cycle_latency": coordinator.last_cycle_latency,
+        },
+        "devices": {
+            device.device_id: {
+                "name": device.name,
+                "available": device.available,
+                "stale": device.stale,
+                "push_healthy": coordinator.push_healthy(device.device_id),
+                "state": dataclasses.asdict(device.state),
+                "metrics": device.metrics.as_dict(),
+                "breaker": device.breaker.diagnostics(),
+            }
+            for device in sc_devices
+        },
+    }
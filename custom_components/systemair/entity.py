@@ -0,0 +1,65 @@
+"""Base entity for the Systemair SAVE Connect integration."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+if TYPE_CHECKING:
+    from .device import SaveConnectDevice
+
+
+class SaveConnectEntity(CoordinatorEntity):
+    """Coordinator entity that only writes its state when its registers, staleness or availability changed."""
+
+    """Registers the state of the entity depends on."""
+    _registers: frozenset[int] = frozenset()
+
+    def __init__(self, device: SaveConnectDevice) -> None:
+        """Initialize the entity."""
+        super().__init__(device.coordinator)
+        self._device: SaveConnectDevice = device
+        self._last_update_success = True
+        self._stale = device.stale
+        self._device_available = device.available
+
+    async def async_added_to_hass(self) -> None:
+        """Read the registers of the entity while it is enabled."""
+        await super().async_added_to_hass()
+        self._device.async_require_registers(self._registers)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop reading the registers of the entity."""
+        await super().async_will_remove_from_hass()
+        self._device.async_release_registers(self._registers)
+
+    @property
+    def available(self) -> bool:
+        """Return True if the last update succeeded and requests to the device are not paused by its breakers."""
+        return super().available and self._device.available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state if a register of the entity, its staleness or its availability changed."""
+        last_update_success = self.coordinator.last_update_success
+        if (
+                last_update_success == self._last_update_success
+                and self._stale == self._device.stale
+                and self._device_available == self._device.available
+                and self._registers.isdisjoint(self._device.changed_registers)
+        ):
+            self._device.metrics.suppressed_writes += 1
+            return
+
+        self._device.metrics.record_entity_write()
+
+        self._last_update_success = last_update_success
+        self._stale = self._device.stale
+        self._device_available = self._device.available
+        self._async_update_from_device()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_update_from_device(self) -> None:
+        """Decode the state of the entity from the device, once per update that concerns it."""
@@ -6,24 +6,46 @@ from collections.abc import Mapping
 from math import ceil, floor
 from typing import Any, Callable, NamedTuple
 
-from homeassistant.components.climate.const import FAN_OFF
 from homeassistant.components.fan import (FanEntity, FanEntityFeature,
                                           NotValidPresetModeError)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from systemair.saveconnect.const import Airflow
+from systemair.saveconnect.const import Airflow, UserModes
+from systemair.saveconnect.register import Register
 
-from . import SaveConnectDevice
-from .const import (DOMAIN, SAVECONNECT_AIRFLOW_TO_STR_SETTABLE,
-                    SAVECONNECT_DEVICES, SAVECONNECT_FAN_MODES,
-                    SAVECONNECT_MODE_TO_STR_SETTABLE, SAVECONNECT_NAME,
-                    STR_TO_SAVECONNECT_PROFILE_SETTABLE)
+from .const import DOMAIN, SAVECONNECT_DEVICES, SAVECONNECT_NAME
+from .device import SaveConnectDevice
+from .entity import SaveConnectEntity
 
 _LOGGER = logging.getLogger(__name__)
 
+SAVECONNECT_FAN_MODES = [Airflow.OFF, Airflow.LOW, Airflow.NORMAL, Airflow.HIGH]
+
+
+SAVECONNECT_AIRFLOW_TO_STR_SETTABLE = {
+    Airflow.OFF: Airflow.OFF,
+    Airflow.MINIMUM: Airflow.LOW,
+    Airflow.LOW: Airflow.LOW,
+    Airflow.NORMAL: Airflow.NORMAL,
+    Airflow.HIGH: Airflow.HIGH,
+    Airflow.MAXIMUM: Airflow.HIGH
+}
+
+SAVECONNECT_MODE_TO_STR_SETTABLE = {
+    UserModes.AUTO: "Auto",
+    UserModes.MANUAL: "Manual",
+    UserModes.AWAY: "Away",
+    UserModes.CROWDED: "Crowded",
+    UserModes.FIREPLACE: "Fireplace",
+    UserModes.HOLIDAY: "Holiday"
+}
+
+STR_TO_SAVECONNECT_PROFILE_SETTABLE = {
+    value: key for (key, value) in SAVECONNECT_MODE_TO_STR_SETTABLE.items()
+}
+
 
 class ExtraStateAttributeDetails(NamedTuple):
     """Extra state attribute details."""
@@ -36,6 +58,9 @@ EXTRA_STATE_ATTRIBUTES = (
     ExtraStateAttributeDetails(
         description="fan_speed", data_fn=lambda device: device.state.airflow_level
     ),
+    ExtraStateAttributeDetails(
+        description="stale", data_fn=lambda device: device.stale
+    ),
 )
 
 
@@ -58,17 +83,22 @@ async def async_setup_entry(
     async_add_entities(devices)
 
 
-class SaveConnectDeviceFan(CoordinatorEntity, FanEntity):
+class SaveConnectDeviceFan(SaveConnectEntity, FanEntity):
     """Representation of the fan."""
 
+    _registers = frozenset({
+        Register.REG_USERMODE_MODE_HMI,
+        Register.REG_USERMODE_HMI_CHANGE_REQUEST,
+        Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF,
+        Register.REG_SPEED_INDICATION_APP,
+    })
+
     def __init__(
             self,
             device: SaveConnectDevice
     ) -> None:
         """Initialize the fan."""
-        super().__init__(device.coordinator)
-
-        self._device = device
+        super().__init__(device)
 
         self._attr_name = "Ventilation"
         self._attr_unique_id = f"{SAVECONNECT_NAME}-{device.device_id}-fan"
@@ -82,16 +112,14 @@ class SaveConnectDeviceFan(CoordinatorEntity, FanEntity):
 
         value = SAVECONNECT_FAN_MODES[option]
 
-        success = await self._device.async_set_fan_mode(value)
-        if not success:
-            _LOGGER.error("Error setting fan level to: %s", value)
-
-        await self.coordinator.async_request_refresh()
+        await self._device.async_set_fan_mode(value)
 
     @property
     def percentage(self) -> int | None:
         """Return the current speed as a percentage."""
         fan_speed = self.airflow_state
+        if fan_speed is None:
+            return None
         index = SAVECONNECT_FAN_MODES.index(fan_speed)
 
         percentage = int(index * self.percentage_step)
@@ -110,9 +138,12 @@ class SaveConnectDeviceFan(CoordinatorEntity, FanEntity):
         return list(STR_TO_SAVECONNECT_PROFILE_SETTABLE.keys())
 
     @property
-    def is_on(self) -> bool:
+    def is_on(self) -> bool | None:
         """Return if device is on."""
-        return self.airflow_state != FAN_OFF
+        airflow_state = self.airflow_state
+        if airflow_state is None:
+            return None
+        return airflow_state != Airflow.OFF
 
     @property
     def airflow_state(self):
@@ -123,7 +154,8 @@ class SaveConnectDeviceFan(CoordinatorEntity, FanEntity):
             return None
 
         self._attr_available = True
-        return SAVECONNECT_AIRFLOW_TO_STR_SETTABLE[airflow_level_value]
+        """Levels the fan does not know, e.g. from a newer firmware, are reported as unknown."""
+        return SAVECONNECT_AIRFLOW_TO_STR_SETTABLE.get(airflow_level_value)
 
     @property
     def preset_state(self):
@@ -162,21 +194,14 @@ class SaveConnectDeviceFan(CoordinatorEntity, FanEntity):
         if preset_mode == self.preset_mode:
             return False
 
-        success = await self._device.async_set_mode(STR_TO_SAVECONNECT_PROFILE_SETTABLE[preset_mode])
-        if not success:
-            _LOGGER.error("Error setting preset to: %s", preset_mode)
-            return False
+        await self._device.async_set_mode(STR_TO_SAVECONNECT_PROFILE_SETTABLE[preset_mode])
 
         return True
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
         """Set new preset mode."""
-        update_needed = await self._async_set_preset_mode_internal(preset_mode)
-
-        if update_needed:
-            # This state change affects other entities like sensors. Force an immediate update that
-            # can be observed by all parties involved.
-            await self.coordinator.async_request_refresh()
+        # The preset is applied optimistically. The device confirms it through a push, or a single delayed read.
+        await self._async_set_preset_mode_internal(preset_mode)
 
     async def async_turn_on(
             self,
@@ -188,21 +213,11 @@ class SaveConnectDeviceFan(CoordinatorEntity, FanEntity):
         _LOGGER.debug("Turn on")
 
         if not self.is_on:
-            success = await self._device.async_set_fan_mode(Airflow.LOW)
-            if not success:
-                _LOGGER.error("Error turning on device.")
-                return
-
-            await self.coordinator.async_request_refresh()
+            await self._device.async_set_fan_mode(Airflow.LOW)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the device off."""
         if not self.is_on:
             return
 
-        success = await self._device.async_set_fan_mode(Airflow.OFF)
-        if not success:
-            _LOGGER.error("Error turning off device.")
-            return
-
-        await self.coordinator.async_request_refresh()
+        await self._device.async_set_fan_mode(Airflow.OFF)
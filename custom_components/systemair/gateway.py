@@ -1,5 +1,18 @@
+import asyncio
+import json
+import logging
+
 from homeassistant.core import HomeAssistant
 from systemair.saveconnect import SaveConnect
+from systemair.saveconnect.models import SaveConnectDeviceUnits
+
+from .auth import SaveConnectTokenManager
+from .breaker import SaveConnectCircuitBreaker
+from .const import DEVICE_HOME_ROUTE, SAVECONNECT_CLIENTS, SAVECONNECT_SCHEDULER
+from .scheduler import SaveConnectRequestScheduler, async_get_scheduler
+from .util import async_create_background_task
+
+_LOGGER = logging.getLogger(__name__)
 
 
 class SaveConnectAPI:
@@ -16,6 +29,8 @@ class SaveConnectAPI:
         """Init SaveConnect API."""
         self._hass = hass
 
+        """The library starts its worker as it is constructed, in a task it does not keep. Keep it to cancel it on close."""
+        tasks = asyncio.all_tasks(loop)
         self._sc = SaveConnect(
             email=email,
             password=password,
@@ -24,11 +39,65 @@ class SaveConnectAPI:
             refresh_token_interval=refresh_token_interval,
             loop=loop
         )
+        self._library_tasks = asyncio.all_tasks(loop) - tasks
         self.online = False
 
+        """Device and view whose read is being decoded. Register updates dispatched meanwhile are read results.
+        The library decodes responses in its data store, so the store is wrapped to mark the reads sent here."""
+        self.decoding_view: tuple[str, str] | None = None
+        self._reading_views: set[tuple[str, str]] = set()
+        self._data_update = self._sc.data.update
+        self._sc.data.update = self._decode
+
+        """Reads following a push, by device. See _async_on_ws_data."""
+        self._push_reads: dict[str, asyncio.Task] = {}
+        self._sc._ws.set_callback(self._async_on_ws_data)
+
+        """Persists and refreshes the tokens of the account."""
+        self.tokens = SaveConnectTokenManager(hass, self._sc)
+
+        """True once logged in. Guarded by the lock so concurrent users share a single login."""
+        self.authenticated = False
+        self._auth_lock = asyncio.Lock()
+
+        """Number of config entries using this client."""
+        self.ref_count = 0
+
+        """Pauses the requests of the account while they keep failing."""
+        self.breaker = SaveConnectCircuitBreaker(f"SaveConnect account {email}")
+
+        """Rate limits the requests of all clients. See SaveConnectRequestScheduler."""
+        self.scheduler: SaveConnectRequestScheduler = async_get_scheduler(hass)
+        self._user_mode = SaveConnectScheduledUserMode(self)
+
+    @property
+    def email(self) -> str:
+        return self._sc.email
+
+    @property
+    def password(self) -> str:
+        return self._sc.password
+
+    @property
+    def client(self) -> SaveConnect:
+        return self._sc
+
     @property
     def user_mode(self):
-        return self._sc.user_mode
+        return self._user_mode
+
+    def diagnostics(self) -> dict:
+        """Return the state and counters of the client."""
+        return {
+            "transport": "cloud",
+            "authenticated": self.authenticated,
+            "entries": self.ref_count,
+            "push_enabled": self._sc.ws_enabled,
+            "logins": self.tokens.login_count,
+            "token_refreshes": self.tokens.refresh_count,
+            "scheduler": self.scheduler.diagnostics(),
+            "breaker": self.breaker.diagnostics(),
+        }
 
     async def test_connection(self) -> bool:
         """Test connectivity to the SaveConnect API is OK."""
@@ -36,14 +105,200 @@ class SaveConnectAPI:
         return True  # await self._sc.test_connectivity()
 
     async def auth(self) -> bool:
-        return await self._sc.login()
+        async with self._auth_lock:
+            if not self.authenticated:
+                self.authenticated = await self.tokens.async_login()
+        return self.authenticated
+
+    async def async_enable_push(self) -> None:
+        """Start the websocket if this client was logged in without it."""
+        if self._sc.ws_enabled:
+            return
+
+        self._sc.ws_enabled = True
+        if self.authenticated:
+            self.tokens.async_start_websocket()
+
+    async def async_close(self) -> None:
+        """Stop the background tasks of the library and close the websocket and HTTP sessions."""
+        await self.tokens.async_close()
+        for task in self._push_reads.values():
+            task.cancel()
+        await asyncio.gather(*self._push_reads.values(), return_exceptions=True)
+        for task in self._library_tasks:
+            task.cancel()
+        await asyncio.gather(*self._library_tasks, return_exceptions=True)
+        self._library_tasks = set()
+
+        if self._sc._ws.ws is not None:
+            await self._sc._ws.ws.close()
+            self._sc._ws.ws = None
+
+        await self._sc.auth._http.aclose()
+        await self._sc.graphql._http.aclose()
+        self.authenticated = False
 
     async def get_devices(self, update=True, fetch_device_info=False):
-        res = await self._sc.get_devices(update=update, fetch_device_info=fetch_device_info)
+        res = await self.scheduler.async_read(
+            (self.email.lower(), update, fetch_device_info),
+            lambda: self._sc.get_devices(update=update, fetch_device_info=fetch_device_info)
+        )
+
+        """The library sets the listed fields of the devices it already knows as is, leaving their units a dict."""
+        for device in res or []:
+            if isinstance(device.units, dict):
+                device.units = SaveConnectDeviceUnits.parse_obj(device.units)
         return res
 
+    def restore_devices(self, devices: list[dict]):
+        """Recreate devices from their stored metadata, without querying the account."""
+        for device in devices:
+            if device["identifier"] not in self._sc.data.devices:
+                self._sc.data.update_device(device)
+        return [self._sc.data.get_device(device["identifier"]) for device in devices]
+
     async def update_device_info(self, devices):
         await self._sc.update_device_info(devices)
 
     async def read_data(self, device) -> bool:
         return await self._sc.read_data(device=device)
+
+    async def read_view(self, device, route: str) -> bool:
+        """Read the registers of a single device view. Identical reads in flight are sent once."""
+        return await self.scheduler.async_read(
+            (device.identifier, route),
+            lambda: self._async_query_view(device.identifier, route)
+        )
+
+    async def _async_query_view(self, device_id: str, route: str) -> bool:
+        self._reading_views.add((device_id, route))
+        try:
+            return await self._sc.graphql.queryDeviceView(device_id, route)
+        finally:
+            self._reading_views.discard((device_id, route))
+
+    async def _async_on_ws_data(self, data) -> bool:
+        """Handle a websocket message, reading the device after a push through the request scheduler.
+
+        The library reads all registers of the device after each push, outside of the scheduler, and
+        before receiving the next message. Here the home view is read in the background instead, once
+        for all the pushes of a device received while it is read. Its values are applied as pushes.
+        """
+        message = json.loads(data)
+        payload = message.get("payload", {})
+        if message.get("type") != "DEVICE_PUSH_EVENT" or "dataItems" not in payload:
+            return await self._sc.on_ws_data(data)
+
+        device_id = payload["deviceId"]
+        self._sc.data.update(device_id, payload["dataItems"])
+
+        if device_id in self._sc.data.devices and device_id not in self._push_reads:
+            self._push_reads[device_id] = async_create_background_task(
+                self._hass, self._async_read_pushed_device(device_id), f"SaveConnect read after push of {device_id}"
+            )
+        return True
+
+    async def _async_read_pushed_device(self, device_id: str) -> None:
+        try:
+            if self.breaker.closed:
+                await self.scheduler.async_read(
+                    ("push", device_id),
+                    lambda: self._sc.graphql.queryDeviceView(device_id, DEVICE_HOME_ROUTE)
+                )
+        except Exception as e:  # pylint: disable=broad-except
+            _LOGGER.debug("Reading %s after a push raised an exception: %s", device_id, e)
+        finally:
+            self._push_reads.pop(device_id, None)
+
+    def _decode(self, device_id: str, data) -> bool:
+        """Dispatch a response or a push through the data store of the library, marking the views read here."""
+        view = data.get("GetDeviceView") if isinstance(data, dict) else None
+        if view and (device_id, view.get("route")) in self._reading_views:
+            self.decoding_view = (device_id, view["route"])
+        try:
+            return self._data_update(device_id, data)
+        finally:
+            self.decoding_view = None
+
+
+class SaveConnectScheduledUserMode:
+    """User mode interaction of the SaveConnect library, with writes sent through the request scheduler."""
+
+    def __init__(self, api: SaveConnectAPI) -> None:
+        self._api = api
+
+    async def set_airflow(self, device, mode) -> bool:
+        return await self._api.scheduler.async_write(
+            lambda: self._api.client.user_mode.set_airflow(device, mode)
+        )
+
+    async def set_mode(self, device, mode, duration=60) -> bool:
+        return await self._api.scheduler.async_write(
+            lambda: self._api.client.user_mode.set_mode(device, mode, duration=duration)
+        )
+
+
+async def async_get_api(hass: HomeAssistant, email: str, password: str, ws_enabled: bool) -> SaveConnectAPI:
+    """Return the shared client of an account, creating it if needed.
+
+    The client is not referenced by this call, so that the config flow can log in and hand the
+    authenticated client over to the entry it creates. A client replaced after a password change
+    is closed, unless an entry still uses it.
+    """
+    clients: dict[str, SaveConnectAPI] = hass.data.setdefault(SAVECONNECT_CLIENTS, {})
+
+    key = email.lower()
+    api = clients.get(key)
+    if api is not None and api.password != password:
+        clients.pop(key)
+        if not api.ref_count:
+            _LOGGER.debug("Closing SaveConnect client for %s replaced after a password change", api.email)
+            await api.async_close()
+        api = None
+
+    if api is None:
+        api = SaveConnectAPI(
+            hass,
+            email=email,
+            password=password,
+            ws_enabled=ws_enabled,
+            # Tokens are refreshed by the token manager.
+            refresh_token_interval=0,
+            loop=hass.loop
+        )
+        clients[key] = api
+
+    return api
+
+
+async def async_acquire_api(hass: HomeAssistant, email: str, password: str, ws_enabled: bool) -> SaveConnectAPI:
+    """Return the shared client of an account, and reference it."""
+    api = await async_get_api(hass, email, password, ws_enabled)
+    api.ref_count += 1
+
+    if ws_enabled:
+        await api.async_enable_push()
+
+    return api
+
+
+async def async_release_api(hass: HomeAssistant, api: SaveConnectAPI) -> None:
+    """Dereference a shared client, closing it once no config entry uses it."""
+    api.ref_count -= 1
+    if api.ref_count > 0:
+        return
+
+    await async_discard_api(hass, api)
+
+
+async def async_discard_api(hass: HomeAssistant, api: SaveConnectAPI) -> None:
+    """Close a shared client no config entry uses, e.g. after a failed login in the config flow."""
+    clients: dict[str, SaveConnectAPI] = hass.data.get(SAVECONNECT_CLIENTS, {})
+    if clients.get(api.email.lower()) is api:
+        clients.pop(api.email.lower())
+
+    _LOGGER.debug("Closing SaveConnect client for %s", api.email)
+    await api.async_close()
+
+    if not clients and SAVECONNECT_SCHEDULER in hass.data:
+        hass.data.pop(SAVECONNECT_SCHEDULER).async_close()
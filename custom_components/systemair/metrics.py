@@ -0,0 +1,135 @@
+"""Runtime metrics of the Systemair SAVE Connect integration, exposed through diagnostics and debug sensors."""
+from __future__ import annotations
+
+import bisect
+import time
+from collections import deque
+from typing import Any
+
+"""Upper bounds, in seconds, of the poll latency histogram buckets. The last bucket is unbounded."""
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+"""Upper bounds of the push batch size histogram buckets."""
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+"""Window, in seconds, over which the push rate is measured."""
+PUSH_RATE_WINDOW = 300
+
+
+class Histogram:
+    """Histogram of values, such as latencies, with their count, sum and maximum."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last: float | None = None
+
+    def record(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class SaveConnectDeviceMetrics:
+    """Metrics of a single device."""
+
+    def __init__(self) -> None:
+        self.poll_latency = Histogram()
+        self.poll_successes = 0
+        self.poll_failures = 0
+
+        """Monotonic timestamps of the register pushes received within PUSH_RATE_WINDOW."""
+        self._pushes: deque[float] = deque()
+        self.pushes = 0
+
+        """Number of register pushes applied together, per batch."""
+        self.push_batch_size = Histogram(BATCH_SIZE_BUCKETS)
+
+        """Number and total duration, in seconds, of the dispatches of pushed register batches to the entities."""
+        self.callbacks = 0
+        self.callback_time = 0.0
+
+        """Entity state writes, in total, in the current and in the last coordinator cycle, and writes skipped."""
+        self.entity_writes = 0
+        self._cycle_entity_writes = 0
+        self.last_cycle_entity_writes = 0
+        self.suppressed_writes = 0
+
+    def record_poll(self, success: bool, latency: float) -> None:
+        self.poll_latency.record(latency)
+        if success:
+            self.poll_successes += 1
+        else:
+            self.poll_failures += 1
+
+    def record_push(self) -> None:
+        now = time.monotonic()
+        self.pushes += 1
+        self._pushes.append(now)
+        while self._pushes[0] < now - PUSH_RATE_WINDOW:
+            self._pushes.popleft()
+
+    def record_push_batch(self, size: int) -> None:
+        self.push_batch_size.record(size)
+
+    def record_callback(self, duration: float) -> None:
+        self.callbacks += 1
+        self.callback_time += duration
+
+    def record_entity_write(self) -> None:
+        self.entity_writes += 1
+        self._cycle_entity_writes += 1
+
+    def end_cycle(self) -> None:
+        """Close the coordinator cycle, after listeners were notified."""
+        self.last_cycle_entity_writes = self._cycle_entity_writes
+        self._cycle_entity_writes = 0
+
+    @property
+    def push_rate(self) -> float:
+        """Register pushes per minute, over the last PUSH_RATE_WINDOW."""
+        now = time.monotonic()
+        while self._pushes and self._pushes[0] < now - PUSH_RATE_WINDOW:
+            self._pushes.popleft()
+        return len(self._pushes) * 60 / PUSH_RATE_WINDOW
+
+    @property
+    def mean_callback_time(self) -> float | None:
+        """Mean duration of the dispatch of a pushed register batch to the entities, in seconds."""
+        return self.callback_time / self.callbacks if self.callbacks else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "poll_latency": self.poll_latency.as_dict(),
+            "poll_successes": self.poll_successes,
+            "poll_failures": self.poll_failures,
+            "pushes": self.pushes,
+            "push_rate_per_minute": self.push_rate,
+            "push_batch_size": self.push_batch_size.as_dict(),
+            "callbacks": self.callbacks,
+            "mean_callback_time": self.mean_callback_time,
+            "entity_writes": self.entity_writes,
+            "last_cycle_entity_writes": self.last_cycle_entity_writes,
+            "suppressed_writes": self.suppressed_writes,
+        }
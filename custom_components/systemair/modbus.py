@@ -0,0 +1,431 @@
+"""Local Modbus/TCP transport for the Systemair SAVE Connect integration.
+
+SAVE units expose the registers of the SaveConnect API over Modbus, either directly or through
+a Modbus/TCP gateway. This transport reads them locally and feeds them through the data store of
+the SaveConnect library, decoded to the values the cloud reports, so that devices, entities and
+register callbacks work the same as with the cloud.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from typing import Iterable
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from systemair.saveconnect.const import Airflow, APIRoutes, UserModes
+from systemair.saveconnect.data import SaveConnectData
+from systemair.saveconnect.register import Register
+
+from .breaker import SaveConnectCircuitBreaker
+from .catalog import CATALOG_REGISTERS
+from .const import (DEVICE_HOME_ROUTE, HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT, HA_SC_MODBUS_MAX_GAP_DEFAULT,
+                    HA_SC_MODBUS_TIMEOUT, SAVECONNECT_MODBUS_CONNECTIONS, SAVECONNECT_NAME,
+                    SAVECONNECT_UNITS_CELSIUS)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+"""Enumerated registers, decoded to the values the SaveConnect API reports. The index is the Modbus value."""
+LOCAL_USER_MODES = (
+    UserModes.AUTO, UserModes.MANUAL, UserModes.CROWDED, UserModes.REFRESH, UserModes.FIREPLACE,
+    UserModes.AWAY, UserModes.HOLIDAY, "cookerhood", "vacuumcleaner", "cdi1", "cdi2", "cdi3", "pressureguard",
+)
+LOCAL_AIRFLOW_LEVELS = (
+    Airflow.OFF, Airflow.MINIMUM, Airflow.LOW, Airflow.NORMAL, Airflow.HIGH, Airflow.MAXIMUM,
+)
+LOCAL_ALARM_STATES = ("inactive", "active", "waiting", "cleared_error_active")
+
+"""Alarm state registers, excluding the registers used to clear them."""
+LOCAL_ALARM_REGISTERS: frozenset[int] = frozenset(
+    getattr(Register, name) for name in dir(Register)
+    if name.startswith("REG_ALARM_") and name.endswith("_ALARM") and "_CLEAR_" not in name
+)
+
+"""The user mode change request is offset by one, as 0 means that no change is requested."""
+LOCAL_ENUM_REGISTERS: dict[int, tuple[str, ...]] = {
+    Register.REG_USERMODE_MODE_HMI: LOCAL_USER_MODES,
+    Register.REG_USERMODE_HMI_CHANGE_REQUEST: ("none", *LOCAL_USER_MODES),
+    Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF: LOCAL_AIRFLOW_LEVELS,
+    Register.REG_SPEED_INDICATION_APP: LOCAL_AIRFLOW_LEVELS,
+    **{register: LOCAL_ALARM_STATES for register in LOCAL_ALARM_REGISTERS},
+}
+
+"""Raw values meaning a register holds nothing. They are not reported, as they would overwrite the state decoded
+from the registers sharing its state field, like the user mode."""
+LOCAL_UNSET_VALUES: dict[int, int] = {
+    Register.REG_USERMODE_HMI_CHANGE_REQUEST: 0,
+}
+
+"""Temperatures are signed 16-bit values."""
+LOCAL_SIGNED_REGISTERS: frozenset[int] = frozenset({
+    Register.REG_SENSOR_FPT,
+    Register.REG_SENSOR_OAT,
+    Register.REG_SENSOR_SAT,
+    Register.REG_SENSOR_RAT,
+    Register.REG_SENSOR_EAT,
+    Register.REG_SENSOR_ECT,
+    Register.REG_SENSOR_EFT,
+    Register.REG_SENSOR_OHT,
+    Register.REG_SENSOR_PDM_EAT_VALUE,
+})
+
+"""Registers of the SaveConnect API that are read from a different Modbus register."""
+LOCAL_REGISTER_SOURCES: dict[int, int] = {
+    Register.REG_USERMODE_MODE_HMI: Register.REG_USERMODE_MODE,
+}
+
+"""Registers returned by each device view. Views that only exist in the cloud return no registers."""
+LOCAL_VIEW_REGISTERS: dict[str, frozenset[int]] = {
+    DEVICE_HOME_ROUTE: frozenset({
+        Register.REG_USERMODE_MODE_HMI,
+        Register.REG_USERMODE_HMI_CHANGE_REQUEST,
+        Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF,
+        Register.REG_SPEED_INDICATION_APP,
+        Register.REG_SENSOR_RHS_PDM,
+        Register.REG_SENSOR_PDM_EAT_VALUE,
+        Register.REG_SENSOR_OAT,
+        Register.REG_SENSOR_OHT,
+        Register.REG_SENSOR_SAT,
+    }) | LOCAL_ALARM_REGISTERS,
+    APIRoutes.VIEWS_UNIT_INFORMATION_SENSORS_DESC: CATALOG_REGISTERS,
+}
+
+"""Timer registers written before changing to a timed user mode, as done by the SaveConnect library."""
+LOCAL_USER_MODE_TIMERS: dict[str, int] = {
+    UserModes.CROWDED: Register.REG_USERMODE_CROWDED_TIME,
+    UserModes.HOLIDAY: Register.REG_USERMODE_HOLIDAY_TIME,
+    UserModes.FIREPLACE: Register.REG_USERMODE_FIREPLACE_TIME,
+    UserModes.AWAY: Register.REG_USERMODE_AWAY_TIME,
+    UserModes.REFRESH: Register.REG_USERMODE_REFRESH_TIME,
+}
+
+
+class LocalConnectionError(HomeAssistantError):
+    """Error to indicate a Modbus request failed."""
+
+
+class LocalRequestError(LocalConnectionError):
+    """Error to indicate the unit answered a Modbus request with an exception response."""
+
+
+def decode_register(register: int, raw: int):
+    """Decode a raw Modbus value to the value reported by the SaveConnect API."""
+    options = LOCAL_ENUM_REGISTERS.get(register)
+    if options is not None:
+        return options[raw] if raw < len(options) else str(raw)
+
+    if register in LOCAL_SIGNED_REGISTERS and raw >= 0x8000:
+        return raw - 0x10000
+
+    return raw
+
+
+def register_blocks(addresses: Iterable[int], max_gap: int, max_size: int) -> list[tuple[int, int]]:
+    """Group addresses into the fewest block reads, as (start, count).
+
+    Addresses separated by at most `max_gap` unused registers are read in the same block, as
+    reading a few extra registers is cheaper than another request. No block spans more than
+    `max_size` registers.
+    """
+    blocks: list[tuple[int, int]] = []
+    for address in sorted(set(addresses)):
+        if blocks:
+            start, count = blocks[-1]
+            end = start + count
+            if address - end <= max_gap and address - start < max_size:
+                blocks[-1] = (start, address - start + 1)
+                continue
+        blocks.append((address, 1))
+    return blocks
+
+
+class SaveConnectModbusConnection:
+    """Modbus/TCP connection to a unit or gateway, reused by all devices behind it.
+
+    Requests are serialized, as most gateways handle a single transaction at a time. The
+    connection is re-established on the next request after a failure.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        """Initialize the connection."""
+        self.host = host
+        self.port = port
+        self._client = None
+        self._lock = asyncio.Lock()
+
+        """Keyword of the unit identifier in requests, `slave` before pymodbus 3.10 and `device_id` since."""
+        self._unit_kwarg = "slave"
+
+        """Number of devices using this connection."""
+        self.ref_count = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def _async_client(self):
+        if self._client is None:
+            """pymodbus is only needed, and imported, when a local transport is configured."""
+            from pymodbus.client import AsyncModbusTcpClient  # pylint: disable=import-outside-toplevel
+
+            self._client = AsyncModbusTcpClient(self.host, port=self.port, timeout=HA_SC_MODBUS_TIMEOUT)
+            if "device_id" in inspect.signature(self._client.read_holding_registers).parameters:
+                self._unit_kwarg = "device_id"
+
+        if not self._client.connected:
+            await self._client.connect()
+            if not self._client.connected:
+                raise LocalConnectionError(f"Could not connect to {self.key}")
+
+        return self._client
+
+    async def read_registers(self, slave: int, address: int, count: int) -> list[int]:
+        """Read a block of holding registers."""
+        async with self._lock:
+            try:
+                client = await self._async_client()
+                result = await client.read_holding_registers(address, count=count, **{self._unit_kwarg: slave})
+            except LocalConnectionError:
+                raise
+            except Exception as e:
+                self.close()
+                raise LocalConnectionError(f"Reading {count} registers at {address} from {self.key} failed: {e}")
+
+        if result.isError():
+            raise LocalRequestError(f"Reading {count} registers at {address} from {self.key} failed: {result}")
+        return result.registers
+
+    async def write_register(self, slave: int, address: int, value: int) -> None:
+        """Write a single holding register."""
+        async with self._lock:
+            try:
+                client = await self._async_client()
+                result = await client.write_register(address, value, **{self._unit_kwarg: slave})
+            except LocalConnectionError:
+                raise
+            except Exception as e:
+                self.close()
+                raise LocalConnectionError(f"Writing {value} to {address} on {self.key} failed: {e}")
+
+        if result.isError():
+            raise LocalRequestError(f"Writing {value} to {address} on {self.key} failed: {result}")
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class SaveConnectModbusUserMode:
+    """Local equivalent of the user mode interaction of the SaveConnect library."""
+
+    def __init__(self, api: SaveConnectModbusAPI) -> None:
+        self._api = api
+
+    async def set_airflow(self, device, mode: Airflow) -> bool:
+        """Set the airflow value. This only works if the mode is "manual"."""
+        return await self._api.write_data(
+            device, Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF, LOCAL_AIRFLOW_LEVELS.index(mode)
+        )
+
+    async def set_mode(self, device, mode: UserModes, duration=60) -> bool:
+        """Set the operation mode of the ventilation unit, and the duration of timed modes."""
+        timer = LOCAL_USER_MODE_TIMERS.get(mode)
+        if timer is not None and not await self._api.write_data(device, timer, duration):
+            return False
+
+        return await self._api.write_data(
+            device, Register.REG_USERMODE_HMI_CHANGE_REQUEST, LOCAL_USER_MODES.index(mode) + 1
+        )
+
+
+class SaveConnectModbusAPI:
+    """Local Modbus/TCP transport, with the interface of SaveConnectAPI used by the devices."""
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            host: str,
+            port: int,
+            slave: int,
+            max_gap: int = HA_SC_MODBUS_MAX_GAP_DEFAULT,
+            max_block_size: int = HA_SC_MODBUS_MAX_BLOCK_SIZE_DEFAULT,
+    ) -> None:
+        """Init the local transport."""
+        self._hass = hass
+        self.slave = slave
+        self.connection = async_get_connection(hass, host, port)
+
+        """Block reads planned for each view, and the read limits they are planned with."""
+        self._max_gap = max_gap
+        self._max_block_size = max_block_size
+        self._view_plans: dict[str, tuple[dict[int, list[int]], list[tuple[int, int]]]] = {}
+
+        """Number of block reads and of registers read, for comparison with per-register reads."""
+        self.read_requests = 0
+        self.registers_read = 0
+
+        """Data store of the SaveConnect library, which dispatches register updates to the device callbacks."""
+        self._data = SaveConnectData()
+        self._data.update_device({
+            "identifier": f"{self.connection.key}:{slave}",
+            "name": f"{SAVECONNECT_NAME} {host}",
+            "connectionStatus": "ONLINE",
+            "units": {
+                "temperature": SAVECONNECT_UNITS_CELSIUS,
+                "pressure": "UNITS_PASCAL",
+                "flow": "UNITS_CUBIC_METERS_PER_HOUR",
+            },
+        })
+
+        """Device and view whose read is being decoded. Register updates dispatched meanwhile are read results."""
+        self.decoding_view: tuple[str, str] | None = None
+
+        self.user_mode = SaveConnectModbusUserMode(self)
+        self.authenticated = False
+
+        """Pauses the requests to the unit while they keep failing."""
+        self.breaker = SaveConnectCircuitBreaker(f"Systemair unit at {self.connection.key}")
+
+    def diagnostics(self) -> dict:
+        """Return the state and counters of the transport."""
+        return {
+            "transport": "local",
+            "authenticated": self.authenticated,
+            "slave": self.slave,
+            "read_requests": self.read_requests,
+            "registers_read": self.registers_read,
+            "block_reads": {route: plan[1] for route, plan in self._view_plans.items()},
+            "breaker": self.breaker.diagnostics(),
+        }
+
+    async def auth(self) -> bool:
+        """Connect to the unit, and check it answers."""
+        if not self.authenticated:
+            try:
+                await self.connection.read_registers(self.slave, Register.REG_USERMODE_MODE, 1)
+            except LocalConnectionError as e:
+                _LOGGER.warning("Could not reach Systemair unit at %s: %s", self.connection.key, e)
+                return False
+            self.authenticated = True
+        return self.authenticated
+
+    async def async_enable_push(self) -> None:
+        """Units do not push register updates over Modbus."""
+
+    async def async_close(self) -> None:
+        """Release the connection, closing it once no device uses it."""
+        await async_release_connection(self._hass, self.connection)
+        self.authenticated = False
+
+    async def get_devices(self, update=True, fetch_device_info=False):
+        return list(self._data.devices.values())
+
+    def restore_devices(self, devices: list[dict]):
+        """The device of a local transport is known without any request."""
+        return list(self._data.devices.values())
+
+    def _plan_view(self, route: str) -> tuple[dict[int, list[int]], list[tuple[int, int]]]:
+        """Return the registers of a view by Modbus address, and the block reads covering them."""
+        plan = self._view_plans.get(route)
+        if plan is None:
+            registers_by_address: dict[int, list[int]] = {}
+            for register in LOCAL_VIEW_REGISTERS.get(route, frozenset()):
+                registers_by_address.setdefault(LOCAL_REGISTER_SOURCES.get(register, register), []).append(register)
+
+            plan = registers_by_address, register_blocks(registers_by_address, self._max_gap, self._max_block_size)
+            self._view_plans[route] = plan
+        return plan
+
+    async def _async_read_block(self, start: int, count: int) -> list[int]:
+        self.read_requests += 1
+        self.registers_read += count
+        return await self.connection.read_registers(self.slave, start, count)
+
+    async def read_view(self, device, route: str) -> bool:
+        """Read the registers of a device view in as few block reads as possible."""
+        registers_by_address, blocks = self._plan_view(route)
+
+        items = []
+        for start, count in list(blocks):
+            try:
+                values = await self._async_read_block(start, count)
+            except LocalRequestError:
+                """Some units reject reads spanning unused registers. Read such a block without gaps from now on."""
+                sub_blocks = register_blocks(
+                    (address for address in registers_by_address if start <= address < start + count), 0, count
+                )
+                if sub_blocks == [(start, count)]:
+                    raise
+                _LOGGER.debug("Splitting rejected block read of %d registers at %d into %s", count, start, sub_blocks)
+
+                index = blocks.index((start, count))
+                blocks[index:index + 1] = sub_blocks
+                values = [0] * count
+                for sub_start, sub_count in sub_blocks:
+                    values[sub_start - start:sub_start - start + sub_count] = await self._async_read_block(
+                        sub_start, sub_count
+                    )
+
+            for address, raw in enumerate(values, start):
+                for register in registers_by_address.get(address, ()):
+                    if LOCAL_UNSET_VALUES.get(register) == raw:
+                        continue
+                    items.append(self._data_item(register, decode_register(register, raw)))
+
+        """Decoded values go through the data store, which dispatches them to the device callbacks."""
+        self.decoding_view = (device.identifier, route)
+        try:
+            return self._data.update(device.identifier, items)
+        finally:
+            self.decoding_view = None
+
+    async def write_data(self, device, register: int, value: int) -> bool:
+        """Write a raw value to a register, and dispatch its decoded value to the device."""
+        try:
+            await self.connection.write_register(self.slave, register, value)
+        except LocalConnectionError as e:
+            _LOGGER.warning("Could not write to Systemair unit at %s: %s", self.connection.key, e)
+            return False
+
+        return self._data.update(device.identifier, [self._data_item(register, decode_register(register, value))])
+
+    @staticmethod
+    def _data_item(register: int, value) -> dict:
+        """A register in the form of the dataItems of the SaveConnect API."""
+        return {
+            "register": register,
+            "value": value,
+            "defaultValue": value,
+            "type": 0,
+            "internalDeviceType": 1,
+        }
+
+
+def async_get_connection(hass: HomeAssistant, host: str, port: int) -> SaveConnectModbusConnection:
+    """Return the shared connection to a host, creating it if needed, and reference it."""
+    connections: dict[str, SaveConnectModbusConnection] = hass.data.setdefault(SAVECONNECT_MODBUS_CONNECTIONS, {})
+
+    connection = connections.get(f"{host}:{port}")
+    if connection is None:
+        connection = SaveConnectModbusConnection(host, port)
+        connections[connection.key] = connection
+
+    connection.ref_count += 1
+    return connection
+
+
+async def async_release_connection(hass: HomeAssistant, connection: SaveConnectModbusConnection) -> None:
+    """Dereference a shared connection, closing it once no device uses it."""
+    connection.ref_count -= 1
+    if connection.ref_count > 0:
+        return
+
+    connections: dict[str, SaveConnectModbusConnection] = hass.data.get(SAVECONNECT_MODBUS_CONNECTIONS, {})
+    if connections.get(connection.key) is connection:
+        connections.pop(connection.key)
+
+    _LOGGER.debug("Closing Modbus connection to %s", connection.key)
+    connection.close()
@@ -0,0 +1,201 @@
+"""Request scheduler of the Systemair SAVE Connect integration, shared by all cloud requests of the process."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (HA_SC_REQUEST_BURST, HA_SC_REQUEST_RATE, HA_SC_REQUEST_RATE_BACKOFF, HA_SC_REQUEST_RATE_MIN,
+                    HA_SC_REQUEST_RATE_RECOVERY, HA_SC_REQUEST_TIMEOUT, SAVECONNECT_SCHEDULER)
+from .metrics import Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class SaveConnectRequestScheduler:
+    """Token bucket limiting the rate of requests to the SaveConnect API, across all accounts and entries.
+
+    Writes are granted tokens before reads, so that commands are not delayed by polls. A read of a
+    device view that is already in flight is not repeated, its result is shared. Failed requests,
+    which is how throttling by the API surfaces through the library, halve the rate. Successful
+    requests raise it again, up to the configured rate. The request timeout only starts once a
+    request is granted its token, so time spent waiting for one never fails a request.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            rate: float = HA_SC_REQUEST_RATE,
+            burst: int = HA_SC_REQUEST_BURST,
+            request_timeout: float = HA_SC_REQUEST_TIMEOUT,
+    ) -> None:
+        """Initialize the scheduler, with a full bucket."""
+        self._hass = hass
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.request_timeout = request_timeout
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+
+        """Requests waiting for a token, writes before reads, and the timer granting the next token."""
+        self._writes: deque[asyncio.Future] = deque()
+        self._reads: deque[asyncio.Future] = deque()
+        self._timer: asyncio.TimerHandle | None = None
+
+        """Reads in flight, by key, whose result is shared by identical reads."""
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+        self.wait_time = Histogram()
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.failures = 0
+        self.deduplicated = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._writes) + len(self._reads)
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "tokens": self._tokens,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "wait_time": self.wait_time.as_dict(),
+            "requests": self.requests,
+            "failures": self.failures,
+            "deduplicated_reads": self.deduplicated,
+        }
+
+    async def async_read(self, key: Hashable, request: Callable[[], Awaitable[_T]]) -> _T:
+        """Run a read, or share the result of the identical read in flight."""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.deduplicated += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                """Run the read if the one in flight was cancelled, rather than this one."""
+                if not inflight.cancelled():
+                    raise
+
+        future = self._hass.loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._async_run(self._reads, request)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            """Retrieve the exception, so that it is not reported as never retrieved when no read shares it."""
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def async_write(self, request: Callable[[], Awaitable[_T]]) -> _T:
+        """Run a write, ahead of the reads waiting for a token."""
+        return await self._async_run(self._writes, request)
+
+    async def _async_run(self, queue: deque[asyncio.Future], request: Callable[[], Awaitable[_T]]) -> _T:
+        await self._async_acquire(queue)
+
+        self.requests += 1
+        try:
+            result = await asyncio.wait_for(request(), self.request_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._async_backoff()
+            raise
+
+        if result is False or result is None:
+            self._async_backoff()
+        else:
+            self._async_recover()
+        return result
+
+    async def _async_acquire(self, queue: deque[asyncio.Future]) -> None:
+        """Wait for a token."""
+        start = time.monotonic()
+        future = self._hass.loop.create_future()
+        queue.append(future)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._async_grant()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future in queue:
+                queue.remove(future)
+            elif future.done() and not future.cancelled():
+                """The token was granted to a request that no longer runs. Give it back."""
+                self._tokens = min(self.burst, self._tokens + 1)
+                self._async_grant()
+            raise
+        finally:
+            self.wait_time.record(time.monotonic() - start)
+
+    @callback
+    def _async_grant(self) -> None:
+        """Grant the available tokens, writes first, and schedule the grant of the next token."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+        while self._tokens >= 1 and (self._writes or self._reads):
+            future = (self._writes or self._reads).popleft()
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+        if (self._writes or self._reads) and self._timer is None:
+            self._timer = self._hass.loop.call_later((1 - self._tokens) / self.rate, self._async_on_timer)
+
+    @callback
+    def _async_on_timer(self) -> None:
+        self._timer = None
+        self._async_grant()
+
+    @callback
+    def _async_backoff(self) -> None:
+        """Halve the rate after a failed request."""
+        self.failures += 1
+        rate = max(HA_SC_REQUEST_RATE_MIN, self.rate * HA_SC_REQUEST_RATE_BACKOFF)
+        if rate != self.rate:
+            _LOGGER.debug("SaveConnect request failed, lowering the request rate to %.2f/s", rate)
+        self.rate = rate
+
+    @callback
+    def _async_recover(self) -> None:
+        """Raise the rate after a successful request, up to the configured rate."""
+        self.rate = min(self.max_rate, self.rate + HA_SC_REQUEST_RATE_RECOVERY)
+
+    @callback
+    def async_close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> SaveConnectRequestScheduler:
+    """Return the scheduler shared by all SaveConnect clients, creating it if needed."""
+    scheduler = hass.data.get(SAVECONNECT_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[SAVECONNECT_SCHEDULER] = SaveConnectRequestScheduler(hass)
+    return scheduler
@@ -1,19 +1,29 @@
 """Platform for Systemair sensor integration."""
 from __future__ import annotations
 
+import dataclasses
+import logging
 from dataclasses import dataclass
 from typing import Any, Callable
 
 from homeassistant.components.sensor import (SensorDeviceClass, SensorEntity,
                                              SensorEntityDescription,
                                              SensorStateClass)
-from homeassistant.const import PERCENTAGE, TEMP_CELSIUS, TEMP_FAHRENHEIT
+from homeassistant.const import (ENERGY_KILO_WATT_HOUR, PERCENTAGE, POWER_WATT, TEMP_CELSIUS, TEMP_FAHRENHEIT,
+                                 TIME_MILLISECONDS)
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from systemair.saveconnect.register import Register
 
-from . import DOMAIN, SAVECONNECT_DEVICES, SaveConnectDevice
-from .const import (SAVECONNECT_NAME, SAVECONNECT_UNITS_CELSIUS,
-                    SAVECONNECT_UNITS_FAHRENHEIT)
+from .catalog import REGISTER_CATALOG
+from .const import (DOMAIN, HA_SC_DEBUG_SENSORS, HA_SC_IMPORT_STATISTICS, SAVECONNECT_COORDINATOR,
+                    SAVECONNECT_DEVICES, SAVECONNECT_NAME, SAVECONNECT_UNITS_FAHRENHEIT)
+from .derived import FILTER_REGISTERS, RECOVERY_REGISTERS, RECOVERY_TEMPERATURE_REGISTERS
+from .device import ALARM_REGISTERS, SaveConnectDevice
+from .entity import SaveConnectEntity
+
+_LOGGER = logging.getLogger(__name__)
 
 
 @dataclass
@@ -21,6 +31,7 @@ class SaveConnectRequiredKeysMixin:
     """Mixin for required keys."""
     value_fn: Callable[[Any], float]
     enabled: Callable[[Any], bool]
+    registers: frozenset[int]
 
 
 @dataclass
@@ -30,6 +41,16 @@ class SaveConnectSensorEntityDescription(
     """Describes SaveConnect sensor entities."""
 
 
+def _register_value_fn(register: int, scale: float = 1) -> Callable[[SaveConnectDevice], float]:
+    """Return a function decoding a numeric register of a device, divided by its scale.
+
+    Values are read from the register values indexed by the device as they arrive, rather than
+    by reflection on the registry of the library.
+    """
+    return lambda device: float(device.register_value(register)) / scale
+
+
+"""Descriptions are shared by all devices and never modified. See _device_description."""
 SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
 
     SaveConnectSensorEntityDescription(
@@ -39,8 +60,9 @@ SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
         native_unit_of_measurement=PERCENTAGE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.HUMIDITY,
-        value_fn=lambda device: float(device.registry.REG_SENSOR_RHS_PDM.value),
+        value_fn=_register_value_fn(Register.REG_SENSOR_RHS_PDM),
         enabled=lambda device: True,
+        registers=frozenset({Register.REG_SENSOR_RHS_PDM}),
         entity_registry_enabled_default=True,
     ),
 
@@ -51,8 +73,9 @@ SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
         native_unit_of_measurement=TEMP_CELSIUS,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        value_fn=lambda device: int(device.registry.REG_SENSOR_PDM_EAT_VALUE.value) / 10.0,
+        value_fn=_register_value_fn(Register.REG_SENSOR_PDM_EAT_VALUE, scale=10),
         enabled=lambda device: True,
+        registers=frozenset({Register.REG_SENSOR_PDM_EAT_VALUE}),
         entity_registry_enabled_default=True,
     ),
 
@@ -63,8 +86,9 @@ SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
         native_unit_of_measurement=TEMP_CELSIUS,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        value_fn=lambda device: int(device.registry.REG_SENSOR_OAT.value) / 10.0,
+        value_fn=_register_value_fn(Register.REG_SENSOR_OAT, scale=10),
         enabled=lambda device: True,
+        registers=frozenset({Register.REG_SENSOR_OAT}),
         entity_registry_enabled_default=True,
     ),
 
@@ -75,8 +99,9 @@ SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
         native_unit_of_measurement=TEMP_CELSIUS,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        value_fn=lambda device: int(device.registry.REG_SENSOR_OHT.value) / 10.0,
+        value_fn=_register_value_fn(Register.REG_SENSOR_OHT, scale=10),
         enabled=lambda device: True,
+        registers=frozenset({Register.REG_SENSOR_OHT}),
         entity_registry_enabled_default=True,
     ),
 
@@ -87,13 +112,186 @@ SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
         native_unit_of_measurement=TEMP_CELSIUS,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        value_fn=lambda device: int(device.registry.REG_SENSOR_SAT.value) / 10.0,
+        value_fn=_register_value_fn(Register.REG_SENSOR_SAT, scale=10),
+        enabled=lambda device: True,
+        registers=frozenset({Register.REG_SENSOR_SAT}),
+        entity_registry_enabled_default=True,
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="active_alarms",
+        name="Active Alarms",
+        icon="mdi:alarm-light",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda device: device.state.active_alarm_count,
         enabled=lambda device: True,
+        registers=frozenset(ALARM_REGISTERS.values()),
         entity_registry_enabled_default=True,
     ),
 )
 
 
+"""Sensors generated from the register catalog, disabled by default."""
+CATALOG_SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = tuple(
+    SaveConnectSensorEntityDescription(
+        key=entry.key,
+        name=entry.name,
+        icon=entry.icon,
+        native_unit_of_measurement=entry.unit,
+        state_class=entry.state_class,
+        device_class=entry.device_class,
+        value_fn=_register_value_fn(entry.register, scale=entry.scale),
+        enabled=lambda device: True,
+        registers=frozenset({entry.register}),
+        entity_registry_enabled_default=False,
+    )
+    for entry in REGISTER_CATALOG
+)
+
+
+"""Sensors derived from several registers, see derived.py. Those that depend on the supply air flow add a
+view read to every poll with the cloud, so they are disabled by default."""
+DERIVED_SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
+    SaveConnectSensorEntityDescription(
+        key="heat_exchanger_efficiency",
+        name="Heat Exchanger Efficiency",
+        icon="mdi:heat-wave",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda device: device.derived.efficiency,
+        enabled=lambda device: True,
+        registers=RECOVERY_TEMPERATURE_REGISTERS,
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="recovered_power",
+        name="Recovered Power",
+        icon="mdi:heat-wave",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda device: device.derived.recovered_power,
+        enabled=lambda device: True,
+        registers=RECOVERY_REGISTERS,
+        entity_registry_enabled_default=False,
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="filter_due",
+        name="Filter Due",
+        icon="mdi:air-filter",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda device: device.derived.filter_due,
+        enabled=lambda device: True,
+        registers=FILTER_REGISTERS,
+    ),
+)
+
+"""Recovered energy is integrated on every cycle. See SaveConnectTotalSensor."""
+RECOVERED_ENERGY_SENSOR = SaveConnectSensorEntityDescription(
+    key="recovered_energy",
+    name="Recovered Energy",
+    icon="mdi:heat-wave",
+    native_unit_of_measurement=ENERGY_KILO_WATT_HOUR,
+    state_class=SensorStateClass.TOTAL_INCREASING,
+    device_class=SensorDeviceClass.ENERGY,
+    value_fn=lambda device: round(device.derived.recovered_energy, 3),
+    enabled=lambda device: True,
+    registers=RECOVERY_REGISTERS,
+    entity_registry_enabled_default=False,
+)
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+"""Metrics of the integration, added when debug sensors are enabled in the options."""
+DEBUG_SENSORS: tuple[SaveConnectSensorEntityDescription, ...] = (
+
+    SaveConnectSensorEntityDescription(
+        key="debug_poll_latency",
+        name="Poll Latency",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: _milliseconds(device.metrics.poll_latency.last),
+        enabled=lambda device: True,
+        registers=frozenset(),
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="debug_poll_failures",
+        name="Poll Failures",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: device.metrics.poll_failures,
+        enabled=lambda device: True,
+        registers=frozenset(),
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="debug_push_rate",
+        name="Push Rate",
+        icon="mdi:cloud-download-outline",
+        native_unit_of_measurement="pushes/min",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: device.metrics.push_rate,
+        enabled=lambda device: True,
+        registers=frozenset(),
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="debug_callback_time",
+        name="Callback Dispatch Time",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: _milliseconds(device.metrics.mean_callback_time),
+        enabled=lambda device: True,
+        registers=frozenset(),
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="debug_entity_writes",
+        name="Entity Writes Per Cycle",
+        icon="mdi:pencil-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: device.metrics.last_cycle_entity_writes,
+        enabled=lambda device: True,
+        registers=frozenset(),
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="debug_request_queue_depth",
+        name="Request Queue Depth",
+        icon="mdi:tray-full",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: device.api.scheduler.queue_depth,
+        enabled=lambda device: hasattr(device.api, "scheduler"),
+        registers=frozenset(),
+    ),
+
+    SaveConnectSensorEntityDescription(
+        key="debug_request_wait_time",
+        name="Mean Request Wait Time",
+        icon="mdi:timer-sand",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda device: _milliseconds(device.api.scheduler.wait_time.mean),
+        enabled=lambda device: hasattr(device.api, "scheduler"),
+        registers=frozenset(),
+    ),
+)
+
+
 async def async_setup_entry(hass, entry, async_add_entities: AddEntitiesCallback):
     """Add sensors for passed config_entry in HA."""
     entry_config = hass.data[DOMAIN][entry.entry_id]
@@ -102,15 +300,59 @@ async def async_setup_entry(hass, entry, async_add_entities: AddEntitiesCallback
     entities = []
     entities.extend([
         SaveConnectDeviceSensor(sc_device, description)
-        for description in SENSORS
+        for description in (*SENSORS, *CATALOG_SENSORS, *DERIVED_SENSORS)
         for sc_device in sc_devices
         if description.enabled(sc_device)
     ])
+    entities.extend([
+        SaveConnectTotalSensor(sc_device, RECOVERED_ENERGY_SENSOR)
+        for sc_device in sc_devices
+    ])
+
+    if entry.options.get(HA_SC_DEBUG_SENSORS, False):
+        entities.extend([
+            SaveConnectDebugSensor(sc_device, description)
+            for description in DEBUG_SENSORS
+            for sc_device in sc_devices
+            if description.enabled(sc_device)
+        ])
+
+    if entry.options.get(HA_SC_IMPORT_STATISTICS, False) and "recorder" not in hass.config.components:
+        _LOGGER.warning("Readings of %s are not imported as statistics, as the recorder is not set up", entry.title)
+    elif entry.options.get(HA_SC_IMPORT_STATISTICS, False):
+        """The recorder is only imported when readings are imported as statistics."""
+        from .statistics import SaveConnectStatisticsImporter  # pylint: disable=import-outside-toplevel
+
+        importer = SaveConnectStatisticsImporter(hass, entry.entry_id, [
+            (sc_device, _device_description(description, sc_device))
+            for description in (*SENSORS, *CATALOG_SENSORS, *DERIVED_SENSORS)
+            for sc_device in sc_devices
+            if description.enabled(sc_device)
+        ])
+        await importer.async_load()
+        entry.async_on_unload(importer.async_start(entry_config[SAVECONNECT_COORDINATOR]))
 
     async_add_entities(entities)
 
 
-class SaveConnectDeviceSensor(CoordinatorEntity, SensorEntity):
+def _device_description(
+        description: SaveConnectSensorEntityDescription,
+        device: SaveConnectDevice
+) -> SaveConnectSensorEntityDescription:
+    """Return the description of a sensor for a device, in the temperature unit of the device."""
+    if (
+            description.device_class == SensorDeviceClass.TEMPERATURE
+            and device.device.units.temperature == SAVECONNECT_UNITS_FAHRENHEIT
+    ):
+        return dataclasses.replace(
+            description,
+            native_unit_of_measurement=TEMP_FAHRENHEIT,
+            icon="mdi:temperature-fahrenheit"
+        )
+    return description
+
+
+class SaveConnectDeviceSensor(SaveConnectEntity, SensorEntity):
     """Representation of a Sensor."""
 
     entity_description: SaveConnectSensorEntityDescription
@@ -121,35 +363,30 @@ class SaveConnectDeviceSensor(CoordinatorEntity, SensorEntity):
             description: SaveConnectSensorEntityDescription,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(device.coordinator)
-        self._device: SaveConnectDevice = device
+        super().__init__(device)
+        self._registers = description.registers
 
         self._attr_name = f"{description.name}"
         self._attr_unique_id = f"{SAVECONNECT_NAME}-{device.device_id}-{description.key}"
+        self.entity_description = _device_description(description, device)
 
-        """Determine which unit metric to use on the sensor in the case of temperature."""
-        if description.device_class == SensorDeviceClass.TEMPERATURE:
-            sc_temp_units = self._device.device.units.temperature
-
-            if sc_temp_units == SAVECONNECT_UNITS_CELSIUS:
-                description.native_unit_of_measurement = TEMP_CELSIUS
-                description.icon = "mdi:temperature-celsius"
-            elif sc_temp_units == SAVECONNECT_UNITS_FAHRENHEIT:
-                description.native_unit_of_measurement = TEMP_FAHRENHEIT
-                description.icon = "mdi:temperature-fahrenheit"
+        self._value_available = False
+        self._async_update_from_device()
 
-        self.entity_description = description
+    @callback
+    def _async_update_from_device(self) -> None:
+        """Decode the value of the sensor. It is unavailable while its registers have not been read."""
+        try:
+            self._attr_native_value = self.entity_description.value_fn(self._device)
+            self._value_available = True
+        except (AttributeError, TypeError, ValueError):
+            self._attr_native_value = None
+            self._value_available = False
 
     @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        try:
-            value = self.entity_description.value_fn(self._device)
-            self._attr_available = True
-            return value
-        except AttributeError:
-            self._attr_available = False
-            return None
+    def available(self) -> bool:
+        """Return True if the coordinator is available and the value could be decoded."""
+        return super().available and self._value_available
 
     @property
     def device_info(self):
@@ -162,6 +399,29 @@ class SaveConnectDeviceSensor(CoordinatorEntity, SensorEntity):
         return self._device.extra_attributes
 
 
+class SaveConnectTotalSensor(SaveConnectDeviceSensor):
+    """Sensor accumulating a value over time. Written whenever the value changed, not only when its registers did."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if self.entity_description.value_fn(self._device) == self._attr_native_value:
+            super()._handle_coordinator_update()
+            return
+
+        self._device.metrics.record_entity_write()
+        self._async_update_from_device()
+        self.async_write_ha_state()
+
+
+class SaveConnectDebugSensor(SaveConnectDeviceSensor):
+    """Sensor exposing a metric of the integration. Written on every coordinator update."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._async_update_from_device()
+        self.async_write_ha_state()
+
+
 def try_parse(value, t):
     try:
         return t(value)
@@ -0,0 +1,55 @@
+"""Snapshots of the device state for the Systemair SAVE Connect integration."""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, Iterable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY, SNAPSHOT_STORAGE_VERSION
+
+if TYPE_CHECKING:
+    from .device import SaveConnectDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SaveConnectSnapshotStore:
+    """Persist the last known state and registers of the devices of a config entry.
+
+    The snapshot is restored at setup, so that entities have their last known, stale, values
+    while the first refresh runs in the background. Saves are delayed, so that a burst of
+    updates results in a single write.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the snapshot store."""
+        self._store = Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.snapshot_{entry_id}")
+        self._devices: list[SaveConnectDevice] = []
+
+    async def async_load(self) -> dict[str, dict[str, Any]]:
+        """Return the snapshot of each device, by device ID."""
+        try:
+            return await self._store.async_load() or {}
+        except Exception as e:  # pylint: disable=broad-except
+            _LOGGER.warning("Could not load the SaveConnect snapshot, ignoring it: %s", e)
+            return {}
+
+    @callback
+    def async_track(self, devices: Iterable[SaveConnectDevice]) -> None:
+        """Set the devices included in the snapshot."""
+        self._devices = list(devices)
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the snapshot after SNAPSHOT_SAVE_DELAY, coalescing saves scheduled in the meantime."""
+        self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the snapshot, e.g. once it no longer matches the devices of the account."""
+        await self._store.async_remove()
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        return {device.device_id: device.snapshot() for device in self._devices}
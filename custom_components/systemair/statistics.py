@@ -0,0 +1,273 @@
+"""Import of sensor readings as long-term statistics for the Systemair SAVE Connect integration.
+
+The recorder compiles hourly statistics from the states of the enabled entities it records. The
+readings of the other measurement sensors, like the disabled sensors of the register catalog, are
+aggregated here per hour, device and sensor, and each completed hour is imported in bulk as
+external statistics, without recording any state.
+
+Each reading holds until the next one, and the hourly mean is weighted by how long each value was
+held. A value stops holding when its device turns unavailable or stale, or when the importer stops.
+The SaveConnect API and the Modbus registers expose no history, so the hours Home Assistant was not
+running stay empty. The aggregate of the current hour is checkpointed along with the time it was
+saved, like the snapshot of the devices, so that an hour interrupted by a restart is completed up
+to that time, and resumed or imported once it is over. No hour is imported twice.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Iterable
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN, SAVECONNECT_NAME, STATISTICS_SAVE_DELAY, STATISTICS_STORAGE_VERSION
+
+if TYPE_CHECKING:
+    from .device import SaveConnectDevice
+    from .sensor import SaveConnectSensorEntityDescription
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+
+class HourlyAggregate:
+    """Time-weighted mean, minimum and maximum of the readings of an hour, and the value held since the last one."""
+
+    def __init__(self, start: datetime, duration: float = 0.0, total: float = 0.0,
+                 minimum: float | None = None, maximum: float | None = None,
+                 value: float | None = None, since: datetime | None = None) -> None:
+        self.start = start
+        self.duration = duration
+        self.total = total
+        self.min = minimum
+        self.max = maximum
+        self.value = value
+        self.since = since
+
+    @classmethod
+    def holding(cls, start: datetime, value: float) -> HourlyAggregate:
+        """Return the aggregate of an hour starting with the value held from the previous hour."""
+        return cls(start, minimum=value, maximum=value, value=value, since=start)
+
+    def advance(self, until: datetime) -> None:
+        """Account for the held value up to until."""
+        if self.value is not None and until > self.since:
+            seconds = (until - self.since).total_seconds()
+            self.duration += seconds
+            self.total += self.value * seconds
+            self.since = until
+
+    def record(self, now: datetime, value: float) -> None:
+        self.advance(now)
+        self.value = value
+        self.since = now
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def release(self, now: datetime) -> None:
+        """Stop holding the last value, e.g. while its device is unavailable."""
+        self.advance(now)
+        self.value = self.since = None
+
+    def as_statistic(self) -> StatisticData | None:
+        if not self.duration:
+            return None
+        return StatisticData(start=self.start, mean=self.total / self.duration, min=self.min, max=self.max)
+
+    def as_dict(self, now: datetime) -> dict[str, Any]:
+        return {"start": self.start.isoformat(), "duration": self.duration, "total": self.total,
+                "min": self.min, "max": self.max, "value": self.value,
+                "since": self.since.isoformat() if self.since else None, "saved": now.isoformat()}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> HourlyAggregate:
+        """Restore an aggregate, with its value held up to the time it was saved, and not over the downtime."""
+        aggregate = cls(dt_util.parse_datetime(data["start"]), data["duration"], data["total"], data["min"],
+                        data["max"], data["value"], dt_util.parse_datetime(data["since"]) if data["since"] else None)
+        aggregate.release(min(dt_util.parse_datetime(data["saved"]), aggregate.start + HOUR))
+        return aggregate
+
+
+class SaveConnectStatisticsImporter:
+    """Aggregate the readings of the measurement sensors the recorder does not record, and import them per hour."""
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            entry_id: str,
+            sensors: Iterable[tuple[SaveConnectDevice, SaveConnectSensorEntityDescription]],
+    ) -> None:
+        """Initialize the importer with the sensors of the devices, described in the units of each device."""
+        self._hass = hass
+        self._store = Store(hass, STATISTICS_STORAGE_VERSION, f"{DOMAIN}.statistics_{entry_id}")
+
+        self._devices: dict[str, SaveConnectDevice] = {}
+        self._descriptions: dict[str, dict[str, SaveConnectSensorEntityDescription]] = {}
+        for device, description in sensors:
+            if description.state_class != SensorStateClass.MEASUREMENT:
+                continue
+            self._devices[device.device_id] = device
+            self._descriptions.setdefault(device.device_id, {})[description.key] = description
+
+        """Checkpoints by device ID and sensor key: the start of the last imported hour, and the current hour."""
+        self._imported: dict[str, dict[str, datetime]] = {}
+        self._pending: dict[str, dict[str, HourlyAggregate]] = {}
+
+    async def async_load(self) -> None:
+        """Load the checkpoints, importing the hours that ended while Home Assistant was not running."""
+        try:
+            stored = await self._store.async_load() or {}
+        except Exception as e:  # pylint: disable=broad-except
+            _LOGGER.warning("Could not load the SaveConnect statistics checkpoints, ignoring them: %s", e)
+            stored = {}
+
+        for device_id, keys in stored.items():
+            for key, checkpoint in keys.items():
+                if checkpoint.get("imported"):
+                    self._imported.setdefault(device_id, {})[key] = dt_util.parse_datetime(checkpoint["imported"])
+                if checkpoint.get("pending"):
+                    self._pending.setdefault(device_id, {})[key] = HourlyAggregate.from_dict(checkpoint["pending"])
+
+        self._async_import_completed(self._hour_start(dt_util.utcnow()))
+
+    @callback
+    def async_start(self, coordinator: DataUpdateCoordinator) -> CALLBACK_TYPE:
+        """Read the registers of the sensors on each poll, even if their entities are disabled, and record them.
+
+        Returns a callback that stops the importer.
+        """
+        for device_id, descriptions in self._descriptions.items():
+            for description in descriptions.values():
+                self._devices[device_id].async_require_registers(description.registers)
+        remove_listener = coordinator.async_add_listener(self.async_record)
+
+        @callback
+        def async_stop() -> None:
+            remove_listener()
+            for device_id, descriptions in self._descriptions.items():
+                for description in descriptions.values():
+                    self._devices[device_id].async_release_registers(description.registers)
+
+            now = dt_util.utcnow()
+            self._async_import_completed(self._hour_start(now))
+            for pending in self._pending.values():
+                for aggregate in pending.values():
+                    aggregate.release(now)
+            self._store.async_delay_save(self._data_to_save, STATISTICS_SAVE_DELAY)
+
+        return async_stop
+
+    @callback
+    def async_record(self) -> None:
+        """Record the readings of the devices. Called after every coordinator update."""
+        now = dt_util.utcnow()
+        hour_start = self._hour_start(now)
+        self._async_import_completed(hour_start)
+
+        for device_id, device in self._devices.items():
+            available = device.available and not device.stale
+            pending = self._pending.setdefault(device_id, {})
+            for description in self._descriptions[device_id].values():
+                try:
+                    value = float(description.value_fn(device)) if available else None
+                except (AttributeError, TypeError, ValueError):
+                    value = None
+
+                if value is None:
+                    if description.key in pending:
+                        pending[description.key].release(now)
+                    continue
+
+                if description.key not in pending:
+                    pending[description.key] = HourlyAggregate(hour_start)
+                pending[description.key].record(now, value)
+
+        self._store.async_delay_save(self._data_to_save, STATISTICS_SAVE_DELAY)
+
+    @callback
+    def _async_import_completed(self, hour_start: datetime) -> None:
+        """Import the hours before hour_start, one bulk import per device and sensor.
+
+        A value held at the end of an hour is held from the start of the next one.
+        """
+        for device_id, pending in self._pending.items():
+            for key, aggregate in list(pending.items()):
+                statistics = []
+                while aggregate.start < hour_start:
+                    end = aggregate.start + HOUR
+                    aggregate.advance(end)
+                    statistic = aggregate.as_statistic()
+                    if statistic is not None:
+                        statistics.append(statistic)
+
+                    if aggregate.value is None:
+                        del pending[key]
+                        break
+                    aggregate = pending[key] = HourlyAggregate.holding(end, aggregate.value)
+
+                imported = self._imported.setdefault(device_id, {})
+                statistics = [statistic for statistic in statistics
+                              if key not in imported or statistic["start"] > imported[key]]
+                description = self._descriptions.get(device_id, {}).get(key)
+                if not statistics or description is None:
+                    continue
+
+                device = self._devices[device_id]
+                if not self._recorded(device, description):
+                    async_add_external_statistics(self._hass, self._metadata(device, description), statistics)
+                imported[key] = statistics[-1]["start"]
+
+    def _recorded(self, device: SaveConnectDevice, description: SaveConnectSensorEntityDescription) -> bool:
+        """Return True if the recorder compiles the statistics of the entity of the sensor."""
+        registry = er.async_get(self._hass)
+        entity_id = registry.async_get_entity_id(
+            "sensor", DOMAIN, f"{SAVECONNECT_NAME}-{device.device_id}-{description.key}"
+        )
+        if entity_id is None or registry.async_get(entity_id).disabled:
+            return False
+        entity_filter = get_instance(self._hass).entity_filter
+        return entity_filter is None or entity_filter(entity_id)
+
+    @staticmethod
+    def _metadata(device: SaveConnectDevice, description: SaveConnectSensorEntityDescription) -> StatisticMetaData:
+        return StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=f"{device.name} {description.name}",
+            source=DOMAIN,
+            statistic_id=f"{DOMAIN}:{slugify(device.device_id)}_{description.key}",
+            unit_of_measurement=description.native_unit_of_measurement,
+        )
+
+    @staticmethod
+    def _hour_start(now: datetime) -> datetime:
+        return now.replace(minute=0, second=0, microsecond=0)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        now = dt_util.utcnow()
+        data: dict[str, dict[str, Any]] = {}
+        for device_id in {*self._imported, *self._pending}:
+            for key in {*self._imported.get(device_id, {}), *self._pending.get(device_id, {})}:
+                imported = self._imported.get(device_id, {}).get(key)
+                pending = self._pending.get(device_id, {}).get(key)
+                data.setdefault(device_id, {})[key] = {
+                    "imported": imported.isoformat() if imported else None,
+                    "pending": pending.as_dict(now) if pending else None,
+                }
+        return data
+
+
+async def async_remove_checkpoints(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the checkpoints of a removed config entry. Imported statistics are kept."""
+    await Store(hass, STATISTICS_STORAGE_VERSION, f"{DOMAIN}.statistics_{entry_id}").async_remove()
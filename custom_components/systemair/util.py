@@ -1,4 +1,9 @@
+import asyncio
+from typing import Coroutine
+
 from homeassistant.const import MAJOR_VERSION, MINOR_VERSION
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
 
 
 def is_min_ha_version(min_ha_major_ver: int, min_ha_minor_ver: int) -> bool:
@@ -8,3 +13,20 @@ def is_min_ha_version(min_ha_major_ver: int, min_ha_minor_ver: int) -> bool:
             (MAJOR_VERSION == min_ha_major_ver and MINOR_VERSION >= min_ha_minor_ver)
     )
 
+
+def async_create_background_task(hass: HomeAssistant, target: Coroutine, name: str) -> asyncio.Task:
+    """Create a task that Home Assistant does not wait for, e.g. at startup, using new method from HA version 2023.4."""
+    if is_min_ha_version(2023, 4):
+        return hass.async_create_background_task(target, name)
+    return hass.async_create_task(target)
+
+
+@callback
+def async_cancel_on_unload(entry: ConfigEntry, task: asyncio.Task) -> None:
+    """Cancel the task when the entry is unloaded. Task.cancel returns a bool, which must not reach the unload jobs."""
+
+    @callback
+    def async_cancel() -> None:
+        task.cancel()
+
+    entry.async_on_unload(async_cancel)
@@ -0,0 +1,146 @@
+"""Fixtures for the tests of the Systemair SAVE Connect integration."""
+from __future__ import annotations
+
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_EMAIL, CONF_HOST, CONF_PASSWORD, CONF_PORT
+from homeassistant.core import HomeAssistant, callback
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.systemair.const import (DOMAIN, HA_SC_CLOUD_PUSH, HA_SC_MODBUS_SLAVE, HA_SC_TRANSPORT,
+                                               HA_SC_TRANSPORT_CLOUD, HA_SC_TRANSPORT_LOCAL, SAVECONNECT_SCHEDULER)
+from custom_components.systemair.scheduler import SaveConnectRequestScheduler
+
+from .fake_saveconnect import EMAIL, PASSWORD, FakeSaveConnect, FakeSaveConnectBackend
+from .modbus_simulator import SLAVE, ModbusSimulator
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    yield
+
+
+@pytest.fixture
+def backend() -> FakeSaveConnectBackend:
+    """The SaveConnect API, with a single device."""
+    return FakeSaveConnectBackend()
+
+
+@pytest.fixture
+def fake_saveconnect(backend: FakeSaveConnectBackend) -> Generator[FakeSaveConnectBackend, None, None]:
+    """Connect the SaveConnect clients of the integration to the fake backend, without a rate limit.
+
+    The rate limit of the request scheduler would otherwise dominate the setup of many devices.
+    """
+
+    @callback
+    def async_get_scheduler(hass: HomeAssistant) -> SaveConnectRequestScheduler:
+        scheduler = hass.data.get(SAVECONNECT_SCHEDULER)
+        if scheduler is None:
+            scheduler = hass.data[SAVECONNECT_SCHEDULER] = SaveConnectRequestScheduler(hass, rate=1e6, burst=10 ** 6)
+        return scheduler
+
+    with patch(
+        "custom_components.systemair.gateway.SaveConnect",
+        side_effect=lambda **kwargs: FakeSaveConnect(backend, **kwargs),
+    ), patch(
+        "custom_components.systemair.gateway.async_get_scheduler", async_get_scheduler
+    ):
+        yield backend
+
+
+def cloud_config_entry(push: bool = True, options: dict | None = None) -> MockConfigEntry:
+    return MockConfigEntry(
+        domain=DOMAIN,
+        title=EMAIL,
+        data={
+            CONF_EMAIL: EMAIL,
+            CONF_PASSWORD: PASSWORD,
+            HA_SC_CLOUD_PUSH: push,
+            HA_SC_TRANSPORT: HA_SC_TRANSPORT_CLOUD,
+        },
+        options=options or {},
+    )
+
+
+@pytest.fixture
+async def setup_integration(hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend):
+    """Return a function setting up a cloud config entry. Entries are unloaded after the test."""
+    entries: list[MockConfigEntry] = []
+
+    async def async_setup(push: bool = True, options: dict | None = None) -> MockConfigEntry:
+        entry = cloud_config_entry(push, options)
+        entry.add_to_hass(hass)
+        entries.append(entry)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        return entry
+
+    yield async_setup
+
+    for entry in entries:
+        if entry.state is ConfigEntryState.LOADED:
+            await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+@pytest.fixture
+def modbus_simulator(socket_enabled) -> Generator[ModbusSimulator, None, None]:
+    """A unit answering Modbus/TCP on 127.0.0.1."""
+    simulator = ModbusSimulator()
+    simulator.start()
+    yield simulator
+    simulator.stop()
+
+
+def local_config_entry(simulator: ModbusSimulator, options: dict | None = None) -> MockConfigEntry:
+    return MockConfigEntry(
+        domain=DOMAIN,
+        title="127.0.0.1",
+        data={
+            CONF_HOST: "127.0.0.1",
+            CONF_PORT: simulator.port,
+            HA_SC_MODBUS_SLAVE: SLAVE,
+            HA_SC_TRANSPORT: HA_SC_TRANSPORT_LOCAL,
+        },
+        options=options or {},
+    )
+
+
+class BenchmarkReport:
+    """Results of the benchmarks, printed at the end of the test session."""
+
+    def __init__(self) -> None:
+        self.results: list[tuple[str, dict[str, Any]]] = []
+
+    def record(self, benchmark: str, **results: Any) -> None:
+        self.results.append((benchmark, results))
+
+
+_BENCHMARK_REPORT = BenchmarkReport()
+
+
+@pytest.fixture
+def benchmark_report() -> BenchmarkReport:
+    return _BENCHMARK_REPORT
+
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    if not _BENCHMARK_REPORT.results:
+        return
+
+    terminalreporter.write_sep("-", "benchmarks")
+    for benchmark, results in _BENCHMARK_REPORT.results:
+        terminalreporter.write_line(
+            f"{benchmark}: " + ", ".join(
+                f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in results.items()
+            )
+        )
@@ -0,0 +1,360 @@
+"""Fake SaveConnect backend for the tests and benchmarks of the Systemair SAVE Connect integration.
+
+The SaveConnect library is used as is. Only its HTTP clients are given a transport that answers the
+SSO and GraphQL requests from registers held in memory, in the shape of the responses of the
+SaveConnect API, and its websocket is replaced by a queue of push messages. No request leaves the
+process, and latency and failures can be injected per request.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import secrets
+import time
+from collections import Counter
+from typing import Any, Iterable
+from urllib.parse import parse_qs
+
+import httpx
+from systemair.saveconnect import SaveConnect
+from systemair.saveconnect.const import Airflow, APIRoutes, UserModes
+from systemair.saveconnect.register import Register
+from systemair.saveconnect.websocket import WSClient
+
+from custom_components.systemair.catalog import CATALOG_REGISTERS
+from custom_components.systemair.const import DEVICE_HOME_ROUTE
+from custom_components.systemair.device import ALARM_REGISTERS, VERSION_REGISTER_STATE_FIELDS
+
+EMAIL = "user@example.com"
+PASSWORD = "password"
+
+SSO_AUTH_URL = "https://sso.systemair.com/auth/realms/iot/protocol/openid-connect/auth"
+SSO_LOGIN_URL = "https://sso.systemair.com/auth/realms/iot/login-actions/authenticate"
+SSO_TOKEN_URL = "https://sso.systemair.com/auth/realms/iot/protocol/openid-connect/token"
+REDIRECT_URL = "https://homesolutions.systemair.com"
+API_URL = "https://homesolutions.systemair.com/gateway/api"
+
+TOKEN_LIFETIME = 300
+REFRESH_TOKEN_LIFETIME = 1800
+
+"""Registers shown on the home screen of the app: user mode, airflow, alarms and the main sensors."""
+HOME_REGISTERS: frozenset[int] = frozenset({
+    Register.REG_USERMODE_MODE_HMI,
+    Register.REG_USERMODE_HMI_CHANGE_REQUEST,
+    Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF,
+    Register.REG_SPEED_INDICATION_APP,
+    Register.REG_SENSOR_RHS_PDM,
+    Register.REG_SENSOR_PDM_EAT_VALUE,
+    Register.REG_SENSOR_OAT,
+    Register.REG_SENSOR_OHT,
+    Register.REG_SENSOR_SAT,
+}) | frozenset(ALARM_REGISTERS.values())
+
+"""Registers returned by each device view."""
+VIEW_REGISTERS: dict[str, frozenset[int]] = {
+    DEVICE_HOME_ROUTE: HOME_REGISTERS,
+    APIRoutes.VIEWS_UNIT_INFORMATION_COMPONENTS_DESC: frozenset({
+        Register.REG_SYSTEM_UNIT_MODEL1,
+        Register.REG_FILTER_PERIOD,
+        Register.REG_FILTER_REMAINING_TIME_L,
+    }),
+    APIRoutes.VIEWS_UNIT_INFORMATION_SENSORS_DESC: CATALOG_REGISTERS | frozenset({
+        Register.REG_SENSOR_RHS_PDM,
+        Register.REG_SENSOR_PDM_EAT_VALUE,
+        Register.REG_SENSOR_OAT,
+        Register.REG_SENSOR_OHT,
+        Register.REG_SENSOR_SAT,
+    }),
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_INPUT_STATUS_DESC: frozenset(),
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_OUTPUT_STATUS_DESC: frozenset({
+        Register.REG_OUTPUT_SAF,
+        Register.REG_OUTPUT_EAF,
+    }),
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_DATE_TIME_TITLE: frozenset(),
+    APIRoutes.VIEWS_UNIT_INFORMATION_UNIT_VERSION_DESC: frozenset(VERSION_REGISTER_STATE_FIELDS),
+    APIRoutes.ACTIVE_ALARMS: frozenset(ALARM_REGISTERS.values()),
+}
+
+"""Every register known to the library, as returned in a full-registry response."""
+ALL_REGISTERS: frozenset[int] = frozenset(int(register) for register in Register.map)
+
+"""Register values of a unit running in manual mode at normal airflow, without alarms."""
+DEFAULT_VALUES: dict[int, Any] = {
+    Register.REG_USERMODE_MODE_HMI: UserModes.MANUAL,
+    Register.REG_USERMODE_HMI_CHANGE_REQUEST: UserModes.MANUAL,
+    Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF: Airflow.NORMAL,
+    Register.REG_SPEED_INDICATION_APP: Airflow.NORMAL,
+    **{register: "inactive" for register in ALARM_REGISTERS.values()},
+    Register.REG_SYSTEM_UNIT_MODEL1: "VTR 300",
+    Register.REG_FILTER_PERIOD: 12,
+    Register.REG_FILTER_REMAINING_TIME_L: 90 * 86400,
+    Register.REG_PU_RUNNING_VERSION_MAJOR: 1,
+    Register.REG_PU_RUNNING_VERSION_MINOR: 22,
+    Register.REG_PU_RUNNING_VERSION_BUILD: 3,
+    Register.REG_SENSOR_RHS_PDM: 45,
+    Register.REG_SENSOR_PDM_EAT_VALUE: 215,
+    Register.REG_SENSOR_OAT: 52,
+    Register.REG_SENSOR_OHT: 240,
+    Register.REG_SENSOR_SAT: 188,
+    Register.REG_SENSOR_EAT: 214,
+    Register.REG_SENSOR_FLOW_SAF: 180,
+    Register.REG_SENSOR_FLOW_EAF: 175,
+}
+
+LOGIN_FORM = f"""<html><body>
+<form id="kc-form-login" action="{SSO_LOGIN_URL}" method="post">
+<input name="username"/><input name="password" type="password"/>
+</form>
+</body></html>"""
+
+
+def device_identifier(index: int) -> str:
+    return f"IAM{index:010d}"
+
+
+def data_item(register: int, value: Any) -> dict[str, Any]:
+    """A register in the form of the dataItems of the SaveConnect API."""
+    return {
+        "register": register,
+        "value": value,
+        "defaultValue": value,
+        "readOnly": isinstance(value, int),
+        "type": 0 if isinstance(value, int) else 1,
+        "internalDeviceType": 1,
+        "min": 0,
+        "max": 65535,
+        "decimals": 0,
+        "increment": 1,
+        "exportable": True,
+        "conditionalProperties": [],
+    }
+
+
+class _FakeWebSocketConnection:
+    """Open websocket connection, as seen by the library."""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeSaveConnectBackend:
+    """In-memory SaveConnect API serving the devices of a single account."""
+
+    def __init__(self, device_count: int = 1, latency: float = 0.0) -> None:
+        self.devices: dict[str, dict[str, Any]] = {}
+        self.registers: dict[str, dict[int, Any]] = {}
+        for index in range(1, device_count + 1):
+            self.add_device(device_identifier(index))
+
+        """Delay, in seconds, before each request is answered."""
+        self.latency = latency
+
+        """Devices whose view reads and writes fail, and whether the API is unreachable altogether."""
+        self.failing_devices: set[str] = set()
+        self.offline = False
+
+        """Whether connections to the SSO token endpoint time out."""
+        self.token_timeout = False
+
+        self.password = PASSWORD
+        self._codes: set[str] = set()
+        self.access_tokens: set[str] = set()
+        self.refresh_tokens: set[str] = set()
+
+        """Requests answered, by operation or route, response bytes sent, and requests in flight."""
+        self.requests: Counter[str] = Counter()
+        self.response_bytes = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        """Push messages waiting to be delivered to each connected websocket."""
+        self._websockets: list[asyncio.Queue[str]] = []
+
+    def add_device(self, device_id: str) -> None:
+        self.devices[device_id] = {
+            "name": f"SAVE {device_id}",
+            "identifier": device_id,
+            "connectionStatus": "ONLINE",
+            "startupWizardRequired": "false",
+            "updateInProgress": "false",
+            "units": {"temperature": "UNITS_CELSIUS", "pressure": "UNITS_PASCAL", "flow": "UNITS_CUBIC_METERS_PER_HOUR"},
+        }
+        self.registers[device_id] = {register: DEFAULT_VALUES.get(register, 0) for register in ALL_REGISTERS}
+
+    def view_response(self, device_id: str, route: str) -> dict[str, Any]:
+        """The GraphQL response to a GetDeviceView query."""
+        return self._view_response(device_id, route, VIEW_REGISTERS.get(route, frozenset()))
+
+    def full_registry_response(self, device_id: str) -> dict[str, Any]:
+        """A GetDeviceView response holding every register of the device."""
+        return self._view_response(device_id, DEVICE_HOME_ROUTE, ALL_REGISTERS)
+
+    def _view_response(self, device_id: str, route: str, registers: Iterable[int]) -> dict[str, Any]:
+        values = self.registers[device_id]
+        return {"data": {"GetDeviceView": {
+            "route": route,
+            "title": route.rsplit("/", 1)[-1],
+            "elements": [],
+            "translationVariables": {},
+            "dataItems": [data_item(register, values[register]) for register in sorted(registers)],
+        }}}
+
+    def push_message(self, device_id: str, values: dict[int, Any]) -> str:
+        """A DEVICE_PUSH_EVENT websocket message."""
+        return json.dumps({
+            "type": "DEVICE_PUSH_EVENT",
+            "payload": {
+                "deviceId": device_id,
+                "dataItems": [data_item(register, value) for register, value in values.items()],
+            },
+        })
+
+    async def async_push(self, device_id: str, values: dict[int, Any]) -> None:
+        """Change registers of a device, and push them to the connected websockets, waiting for their delivery."""
+        self.registers[device_id].update(values)
+        message = self.push_message(device_id, values)
+        for queue in self._websockets:
+            queue.put_nowait(message)
+        for queue in list(self._websockets):
+            await queue.join()
+
+    async def async_listen(self, ws: FakeWSClient) -> None:
+        """Deliver push messages to the callback of a websocket client, until it is cancelled."""
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        self._websockets.append(queue)
+        ws.ws = _FakeWebSocketConnection()
+        try:
+            while True:
+                message = await queue.get()
+                try:
+                    await ws.callback(message)
+                finally:
+                    queue.task_done()
+        finally:
+            self._websockets.remove(queue)
+            ws.ws = None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """Answer a request of the library."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.offline:
+                raise httpx.ConnectError("The SaveConnect API is unreachable", request=request)
+
+            response = self._route(request)
+            self.response_bytes += len(response.content)
+            return response
+        finally:
+            self.in_flight -= 1
+
+    def _route(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url).split("?", 1)[0]
+        if url == SSO_AUTH_URL:
+            self.requests["sso_auth"] += 1
+            return httpx.Response(200, text=LOGIN_FORM)
+        if url == SSO_LOGIN_URL:
+            self.requests["sso_login"] += 1
+            return self._login(request)
+        if url == REDIRECT_URL or url == REDIRECT_URL + "/":
+            return httpx.Response(200, text="")
+        if url == SSO_TOKEN_URL:
+            if self.token_timeout:
+                raise httpx.ConnectTimeout("The SSO token endpoint timed out", request=request)
+            return self._token(request)
+        if url == API_URL:
+            return self._graphql(request)
+        return httpx.Response(404)
+
+    def _login(self, request: httpx.Request) -> httpx.Response:
+        form = {key: values[0] for key, values in parse_qs(request.content.decode()).items()}
+        if form.get("username") != EMAIL or form.get("password") != self.password:
+            return httpx.Response(200, text=LOGIN_FORM)
+
+        code = secrets.token_hex(8)
+        self._codes.add(code)
+        return httpx.Response(302, headers={"location": f"{REDIRECT_URL}/?state=xyzABC123&code={code}"})
+
+    def _token(self, request: httpx.Request) -> httpx.Response:
+        form = {key: values[0] for key, values in parse_qs(request.content.decode()).items()}
+        grant_type = form.get("grant_type")
+        self.requests[f"token_{grant_type}"] += 1
+
+        if grant_type == "authorization_code" and form.get("code") in self._codes:
+            self._codes.discard(form["code"])
+        elif grant_type == "refresh_token" and form.get("refresh_token") in self.refresh_tokens:
+            self.refresh_tokens.discard(form["refresh_token"])
+        else:
+            return httpx.Response(400, json={"error": "invalid_grant", "error_description": "Invalid grant"})
+
+        access_token = secrets.token_hex(16)
+        refresh_token = secrets.token_hex(16)
+        self.access_tokens.add(access_token)
+        self.refresh_tokens.add(refresh_token)
+        return httpx.Response(200, json={
+            "access_token": access_token,
+            "expires_in": TOKEN_LIFETIME,
+            "refresh_token": refresh_token,
+            "refresh_expires_in": REFRESH_TOKEN_LIFETIME,
+            "token_type": "Bearer",
+            "issued_at": time.time(),
+        })
+
+    def _graphql(self, request: httpx.Request) -> httpx.Response:
+        if request.headers.get("x-access-token") not in self.access_tokens:
+            self.requests["unauthorized"] += 1
+            return httpx.Response(200, text="UnauthorizedError: invalid access token")
+
+        body = json.loads(request.content)
+        query = body["query"]
+        variables = body.get("variables", {})
+
+        if "GetAccount" in query:
+            self.requests["GetAccount"] += 1
+            return httpx.Response(200, json={"data": {"GetAccount": {
+                "email": EMAIL,
+                "devices": list(self.devices.values()),
+            }}})
+
+        device_id = variables["input"]["deviceId"]
+        if device_id in self.failing_devices:
+            raise httpx.ConnectError(f"Device {device_id} does not answer", request=request)
+
+        if "GetDeviceView" in query:
+            route = variables["input"]["route"]
+            self.requests[route] += 1
+            return httpx.Response(200, json=self.view_response(device_id, route))
+
+        if "WriteDeviceValues" in query:
+            self.requests["WriteDeviceValues"] += 1
+            for item in json.loads(variables["input"]["registerValues"]):
+                self.registers[device_id][item["register"]] = item["value"]
+            return httpx.Response(200, json={"data": {"WriteDeviceValues": None}})
+
+        return httpx.Response(400, json={"errors": [{"message": "Unknown query"}]})
+
+
+class FakeWSClient(WSClient):
+    """Websocket client of the library, receiving the push messages of a FakeSaveConnectBackend."""
+
+    def __init__(self, backend: FakeSaveConnectBackend, saveconnect: SaveConnect, **kwargs) -> None:
+        super().__init__(saveconnect, **kwargs)
+        self.backend = backend
+
+    async def listen_forever(self):
+        await self.backend.async_listen(self)
+
+
+class FakeSaveConnect(SaveConnect):
+    """The SaveConnect client of the library, connected to a FakeSaveConnectBackend."""
+
+    def __init__(self, backend: FakeSaveConnectBackend, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.backend = backend
+
+        transport = httpx.MockTransport(backend.handle)
+        self.auth._http = httpx.AsyncClient(transport=transport)
+        self.graphql._http = httpx.AsyncClient(transport=transport, timeout=300)
+        self._ws = FakeWSClient(backend, self, url=self._ws.url, callback=self.on_ws_data, loop=self.loop)
@@ -0,0 +1,109 @@
+"""Modbus/TCP simulator of a Systemair unit, for the tests and benchmarks of the local transport.
+
+A pymodbus server holds the raw holding registers of a single unit. It runs on its own thread and
+event loop, so that the delay it can add to each request, like a slow RTU bus behind a gateway,
+does not block the event loop of Home Assistant. Only the registers of the unit are served: reads
+spanning unused registers get an exception response, as from the units that reject them.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import Counter
+
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext, ModbusSparseDataBlock
+from pymodbus.server import ModbusTcpServer
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.modbus import LOCAL_ALARM_REGISTERS, LOCAL_REGISTER_SOURCES, LOCAL_VIEW_REGISTERS
+
+SLAVE = 1
+
+"""Raw values of a unit running in manual mode at normal airflow, without alarms."""
+DEFAULT_RAW_VALUES: dict[int, int] = {
+    Register.REG_USERMODE_MODE: 1,
+    Register.REG_USERMODE_HMI_CHANGE_REQUEST: 0,
+    Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF: 3,
+    Register.REG_SPEED_INDICATION_APP: 3,
+    **{register: 0 for register in LOCAL_ALARM_REGISTERS},
+    Register.REG_SENSOR_RHS_PDM: 45,
+    Register.REG_SENSOR_PDM_EAT_VALUE: 215,
+    Register.REG_SENSOR_OAT: 0x10000 - 52,
+    Register.REG_SENSOR_OHT: 240,
+    Register.REG_SENSOR_SAT: 188,
+}
+
+
+class _ModbusDataBlock(ModbusSparseDataBlock):
+    """Holding registers of the unit, answering each request after a delay.
+
+    The delay blocks the thread of the server, as a bus handles one request at a time. Home Assistant
+    patches time.sleep to fail in event loops, so an event is waited on instead.
+    """
+
+    def __init__(self, values: dict[int, int], simulator: ModbusSimulator) -> None:
+        super().__init__(values)
+        self._simulator = simulator
+        self._delay = threading.Event()
+
+    def getValues(self, address, count=1):
+        self._simulator.requests["read"] += 1
+        self._delay.wait(self._simulator.latency)
+        return super().getValues(address, count)
+
+    def setValues(self, address, values, use_as_default=False):
+        if not use_as_default:
+            self._simulator.requests["write"] += 1
+            self._delay.wait(self._simulator.latency)
+        super().setValues(address, values, use_as_default)
+
+
+class ModbusSimulator:
+    """Modbus/TCP server of a single unit on 127.0.0.1, with the registers read by the local transport."""
+
+    def __init__(self, values: dict[int, int] | None = None, latency: float = 0.0, dense: bool = False) -> None:
+        """Serve the registers read by the local transport, or with `dense`, every address between them."""
+        addresses = {
+            LOCAL_REGISTER_SOURCES.get(register, register)
+            for registers in LOCAL_VIEW_REGISTERS.values()
+            for register in registers
+        }
+        if dense:
+            addresses = set(range(min(addresses), max(addresses) + 1))
+        values = {address: 0 for address in addresses} | DEFAULT_RAW_VALUES | (values or {})
+
+        """Delay, in seconds, before each request is answered, and requests answered, by type."""
+        self.latency = latency
+        self.requests: Counter[str] = Counter()
+
+        self.registers = _ModbusDataBlock(values, self)
+        self._server: ModbusTcpServer | None = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="modbus simulator", daemon=True)
+        self.port: int | None = None
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _async_listen(self) -> None:
+        self._server = ModbusTcpServer(
+            ModbusServerContext(slaves={SLAVE: ModbusSlaveContext(hr=self.registers, zero_mode=True)}, single=False),
+            address=("127.0.0.1", 0),
+        )
+        await self._server.listen()
+
+    def start(self) -> None:
+        """Start serving, and set the port the server listens on."""
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._async_listen(), self._loop).result(5)
+        self.port = self._server.transport.sockets[0].getsockname()[1]
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._server.shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def value(self, address: int) -> int:
+        return self.registers.values[address]
@@ -0,0 +1,65 @@
+"""Tests for the token management of the Systemair SAVE Connect integration."""
+from homeassistant.core import HomeAssistant
+from homeassistant.util import slugify
+
+from custom_components.systemair.const import DOMAIN, SAVECONNECT_API
+from custom_components.systemair.gateway import async_discard_api, async_get_api
+
+from .fake_saveconnect import EMAIL, PASSWORD, FakeSaveConnectBackend
+
+TOKEN_STORAGE_KEY = f"{DOMAIN}.token_{slugify(EMAIL)}"
+
+
+async def test_refresh_timeout_keeps_expiry(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration, hass_storage
+) -> None:
+    """A refresh the library gave up on after a timeout is a failed refresh, not a new token."""
+    entry = await setup_integration()
+    tokens = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_API].tokens
+    stored = hass_storage[TOKEN_STORAGE_KEY]["data"]
+
+    fake_saveconnect.token_timeout = True
+    assert not await tokens._async_refresh()
+    assert tokens._expires_at == stored["expires_at"]
+    assert hass_storage[TOKEN_STORAGE_KEY]["data"] == stored
+
+    fake_saveconnect.token_timeout = False
+    assert await tokens._async_refresh()
+    assert tokens._expires_at > stored["expires_at"]
+
+
+async def test_remove_last_entry_removes_token(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration, hass_storage
+) -> None:
+    """The stored tokens of an account are kept until its last entry is removed."""
+    first = await setup_integration()
+    second = await setup_integration()
+    assert TOKEN_STORAGE_KEY in hass_storage
+
+    await hass.config_entries.async_remove(first.entry_id)
+    await hass.async_block_till_done()
+    assert TOKEN_STORAGE_KEY in hass_storage
+
+    await hass.config_entries.async_remove(second.entry_id)
+    await hass.async_block_till_done()
+    assert TOKEN_STORAGE_KEY not in hass_storage
+
+
+async def test_stored_token_requires_password(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration, hass_storage
+) -> None:
+    """Stored tokens are only reused by a client with the password they were issued for."""
+    entry = await setup_integration()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert PASSWORD not in hass_storage[TOKEN_STORAGE_KEY]["data"].values()
+
+    api = await async_get_api(hass, EMAIL, "wrong password", ws_enabled=False)
+    assert not await api.auth()
+    assert api.tokens.login_count == 1
+    await async_discard_api(hass, api)
+
+    api = await async_get_api(hass, EMAIL, PASSWORD, ws_enabled=False)
+    assert await api.auth()
+    assert api.tokens.login_count == 0
+    await async_discard_api(hass, api)
@@ -0,0 +1,223 @@
+"""Benchmarks of the hot paths of the Systemair SAVE Connect integration, against the fake SaveConnect backend.
+
+For 1, 10 and 100 devices, the integration is set up with all three platforms, then polled and fed
+websocket pushes. The response size and parse time of the device views read in a poll cycle are
+compared with a response holding the full registry. Setup time, CPU time and allocations per update, and Home Assistant state writes
+are reported at the end of the session. State writes are exact and asserted, so that a change that
+writes entities which did not change fails. Time budgets are loose, to catch regressions by an order
+of magnitude rather than noise.
+"""
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant
+from systemair.saveconnect.data import SaveConnectData
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.const import DOMAIN, SAVECONNECT_COORDINATOR, SAVECONNECT_DEVICES
+from custom_components.systemair.device import SLOW_REGISTERS
+
+from .fake_saveconnect import VIEW_REGISTERS, FakeSaveConnectBackend, device_identifier
+
+DEVICE_COUNTS = (1, 10, 100)
+
+"""CPU time budgets, in seconds: setup per device, and handling of a single update."""
+SETUP_CPU_BUDGET_PER_DEVICE = 0.5
+UPDATE_CPU_BUDGET = 0.05
+
+PARSE_REPEATS = 20
+
+
+class StateWriteCounter:
+    """Count the state changes written to the state machine."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.count = 0
+        self._unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, self._on_state_changed)
+
+    def _on_state_changed(self, event) -> None:
+        self.count += 1
+
+    def take(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+    def close(self) -> None:
+        self._unsub()
+
+
+class Measurement:
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.allocated = 0
+
+
+@contextmanager
+def measure(trace_allocations: bool = False):
+    """Measure the wall and CPU time of a block, and optionally the peak memory it allocated."""
+    measurement = Measurement()
+    if trace_allocations:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield measurement
+    finally:
+        measurement.wall = time.perf_counter() - wall
+        measurement.cpu = time.process_time() - cpu
+        if trace_allocations:
+            measurement.allocated = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+@pytest.mark.parametrize("device_count", DEVICE_COUNTS)
+async def test_benchmark(
+        hass: HomeAssistant,
+        fake_saveconnect: FakeSaveConnectBackend,
+        setup_integration,
+        benchmark_report,
+        device_count: int,
+) -> None:
+    """Set up the integration, then poll and push updates to all devices."""
+    backend = fake_saveconnect
+    for index in range(2, device_count + 1):
+        backend.add_device(device_identifier(index))
+    writes = StateWriteCounter(hass)
+
+    with measure() as setup:
+        entry = await setup_integration(push=True)
+    entry_config = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_config[SAVECONNECT_COORDINATOR]
+    devices = entry_config[SAVECONNECT_DEVICES]
+    entities = len(hass.states.async_all())
+
+    assert len(devices) == device_count
+    assert all(device.available for device in devices)
+    assert writes.take() == entities
+    assert setup.cpu < SETUP_CPU_BUDGET_PER_DEVICE * device_count
+    benchmark_report.record(
+        f"setup[{device_count}]",
+        wall_s=setup.wall,
+        cpu_s=setup.cpu,
+        entities=entities,
+        state_writes=entities,
+        requests=sum(backend.requests.values()),
+    )
+
+    """A poll cycle reading unchanged registers writes no state."""
+    requests = sum(backend.requests.values())
+    with measure() as poll:
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert writes.take() == 0
+    benchmark_report.record(
+        f"poll unchanged[{device_count}]",
+        cpu_ms_per_device=poll.cpu * 1000 / device_count,
+        requests=sum(backend.requests.values()) - requests,
+        state_writes=0,
+    )
+
+    """A poll cycle reading a changed humidity on every device writes that sensor only."""
+    for device in devices:
+        backend.registers[device.device_id][Register.REG_SENSOR_RHS_PDM] += 1
+    with measure() as poll:
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert writes.take() == device_count
+    benchmark_report.record(
+        f"poll changed[{device_count}]",
+        cpu_ms_per_device=poll.cpu * 1000 / device_count,
+        state_writes=device_count,
+    )
+
+    """A pushed humidity change writes that sensor only, once per device."""
+    with measure() as push:
+        for device in devices:
+            await backend.async_push(device.device_id, {Register.REG_SENSOR_RHS_PDM: 60})
+        await hass.async_block_till_done()
+    assert writes.take() == device_count
+    assert push.cpu / device_count < UPDATE_CPU_BUDGET
+
+    with measure(trace_allocations=True) as push_allocations:
+        for device in devices:
+            await backend.async_push(device.device_id, {Register.REG_SENSOR_RHS_PDM: 61})
+        await hass.async_block_till_done()
+    assert writes.take() == device_count
+
+    """A pushed register the entities do not depend on writes no state."""
+    with measure() as push_unused:
+        for device in devices:
+            await backend.async_push(device.device_id, {Register.REG_SENSOR_EAT: 230})
+        await hass.async_block_till_done()
+    assert writes.take() == 0
+
+    benchmark_report.record(
+        f"push[{device_count}]",
+        cpu_ms_per_update=push.cpu * 1000 / device_count,
+        unused_cpu_ms_per_update=push_unused.cpu * 1000 / device_count,
+        peak_alloc_kib_per_update=push_allocations.allocated / 1024 / device_count,
+        state_writes=device_count,
+    )
+
+    writes.close()
+
+
+def parse_time(backend: FakeSaveConnectBackend, device_id: str, responses: list[dict]) -> float:
+    """Return the best time, in seconds, for the library to parse the responses of a cycle."""
+    best = float("inf")
+    for _ in range(PARSE_REPEATS):
+        data = SaveConnectData()
+        data.update_device(backend.devices[device_id])
+        start = time.perf_counter()
+        for response in responses:
+            data.update(device_id, response["data"])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def test_route_planning_benchmark(
+        hass: HomeAssistant,
+        fake_saveconnect: FakeSaveConnectBackend,
+        setup_integration,
+        benchmark_report,
+) -> None:
+    """Compare the views planned for a poll cycle with a response holding the full registry."""
+    backend = fake_saveconnect
+    entry = await setup_integration(push=False)
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+
+    routes = device._plan_routes()
+    planned = [backend.view_response(device.device_id, route) for route in routes]
+    full = [backend.full_registry_response(device.device_id)]
+    planned_bytes = sum(len(json.dumps(response)) for response in planned)
+    full_bytes = len(json.dumps(full[0]))
+
+    """The planned views cover the registers of every entity."""
+    read = set().union(*(VIEW_REGISTERS[route] for route in routes))
+    assert set(device._required_registers) - SLOW_REGISTERS <= read
+    assert planned_bytes < full_bytes
+
+    """A poll cycle sends what was planned."""
+    response_bytes = backend.response_bytes
+    await hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR].async_refresh()
+    assert backend.response_bytes - response_bytes == sum(
+        len(httpx.Response(200, json=response).content) for response in planned
+    )
+
+    planned_time = parse_time(backend, device.device_id, planned)
+    full_time = parse_time(backend, device.device_id, full)
+    benchmark_report.record(
+        "routes",
+        routes=len(routes),
+        planned_bytes=planned_bytes,
+        full_bytes=full_bytes,
+        planned_parse_ms=planned_time * 1000,
+        full_parse_ms=full_time * 1000,
+    )
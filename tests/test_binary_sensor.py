@@ -0,0 +1,46 @@
+"""Tests for the alarm binary sensors of the Systemair SAVE Connect integration."""
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.systemair.const import DOMAIN, SAVECONNECT_NAME
+from custom_components.systemair.device import ALARM_REGISTERS
+
+from .fake_saveconnect import FakeSaveConnectBackend, device_identifier
+
+DEVICE_COUNT = 3
+
+
+def alarm_state(hass: HomeAssistant, device_id: str, key: str) -> str:
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "binary_sensor", DOMAIN, f"{SAVECONNECT_NAME}-{device_id}-{key}"
+    )
+    return hass.states.get(entity_id).state
+
+
+async def test_alarm_sensors(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Each device has one sensor per alarm, reading the alarms of that device only."""
+    alarms = list(ALARM_REGISTERS)
+    for index in range(2, DEVICE_COUNT + 1):
+        fake_saveconnect.add_device(device_identifier(index))
+    """Device i has the i-th alarm active."""
+    for index in range(1, DEVICE_COUNT + 1):
+        fake_saveconnect.registers[device_identifier(index)][ALARM_REGISTERS[alarms[index]]] = "active"
+
+    await setup_integration(push=True)
+
+    assert len(ALARM_REGISTERS) == 31
+    assert len(hass.states.async_entity_ids("binary_sensor")) == 31 * DEVICE_COUNT
+    for index in range(1, DEVICE_COUNT + 1):
+        for key in alarms:
+            expected = STATE_ON if key == alarms[index] else STATE_OFF
+            assert alarm_state(hass, device_identifier(index), key) == expected, (index, key)
+
+    """A pushed alarm changes the sensor of its device only."""
+    await fake_saveconnect.async_push(device_identifier(2), {ALARM_REGISTERS[alarms[0]]: "active"})
+    await hass.async_block_till_done()
+    assert alarm_state(hass, device_identifier(2), alarms[0]) == STATE_ON
+    assert alarm_state(hass, device_identifier(1), alarms[0]) == STATE_OFF
+    assert alarm_state(hass, device_identifier(3), alarms[0]) == STATE_OFF
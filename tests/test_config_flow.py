@@ -0,0 +1,61 @@
+"""Tests for the config flow of the Systemair SAVE Connect integration."""
+from homeassistant import config_entries
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.systemair.const import (DOMAIN, HA_SC_CLOUD_PUSH, HA_SC_TRANSPORT_CLOUD, SAVECONNECT_API,
+                                               SAVECONNECT_CLIENTS)
+from custom_components.systemair.gateway import async_get_api
+
+from .fake_saveconnect import EMAIL, PASSWORD, FakeSaveConnectBackend
+
+
+async def async_submit_cloud_step(hass: HomeAssistant, password: str):
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    assert result["type"] == FlowResultType.MENU
+    result = await hass.config_entries.flow.async_configure(result["flow_id"], {"next_step_id": HA_SC_TRANSPORT_CLOUD})
+    return await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_EMAIL: EMAIL, CONF_PASSWORD: password, HA_SC_CLOUD_PUSH: True}
+    )
+
+
+async def test_invalid_auth_closes_client(hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend) -> None:
+    """A client that failed to log in is closed, with its background tasks."""
+    result = await async_submit_cloud_step(hass, "wrong password")
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_auth"}
+    assert not hass.data[SAVECONNECT_CLIENTS]
+
+
+async def test_create_entry_reuses_client(hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend) -> None:
+    """The client logged in by the flow is handed over to the entry it creates."""
+    result = await async_submit_cloud_step(hass, PASSWORD)
+    await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    entry = hass.config_entries.async_entries(DOMAIN)[0]
+    api = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_API]
+    assert api.ref_count == 1
+    assert api.tokens.login_count == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not hass.data[SAVECONNECT_CLIENTS]
+
+
+async def test_password_change_closes_unused_client(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend
+) -> None:
+    """A client replaced after a password change is closed when no entry uses it."""
+    old = await async_get_api(hass, EMAIL, "old password", ws_enabled=True)
+    tasks = set(old._library_tasks)
+    assert tasks and not any(task.done() for task in tasks)
+
+    new = await async_get_api(hass, EMAIL, PASSWORD, ws_enabled=True)
+    assert new is not old
+    assert hass.data[SAVECONNECT_CLIENTS] == {EMAIL: new}
+    assert all(task.cancelled() for task in tasks)
+
+    await new.async_close()
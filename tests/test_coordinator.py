@@ -0,0 +1,161 @@
+"""Tests for the polling of the Systemair SAVE Connect integration."""
+import asyncio
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.const import (DEVICE_HOME_ROUTE, DOMAIN, HA_SC_BREAKER_FAILURE_THRESHOLD,
+                                               MAX_POLL_BACKOFF_INTERVAL, SAVECONNECT_API, SAVECONNECT_COORDINATOR,
+                                               SAVECONNECT_DEVICES)
+from custom_components.systemair.coordinator import SaveConnectPollScheduler
+from custom_components.systemair.scheduler import SaveConnectRequestScheduler
+
+from .fake_saveconnect import FakeSaveConnectBackend, data_item, device_identifier
+
+DEVICE_COUNT = 4
+
+"""Duration, in seconds, of a listener blocking the event loop."""
+LISTENER_TIME = 0.01
+
+
+def test_failed_polls_back_off() -> None:
+    """Failed polls double the interval up to the maximum backoff, however long they keep failing."""
+    scheduler = SaveConnectPollScheduler(
+        min_interval=timedelta(seconds=30),
+        max_interval=timedelta(seconds=300),
+        activity_window=timedelta(minutes=2),
+    )
+
+    intervals = [scheduler.next_interval(False, False, False) for _ in range(1000)]
+    assert intervals[:3] == [timedelta(seconds=60), timedelta(seconds=120), timedelta(seconds=240)]
+    assert intervals[-1] == MAX_POLL_BACKOFF_INTERVAL
+
+    assert scheduler.next_interval(True, False, False) == timedelta(seconds=60)
+
+
+async def test_queued_polls_do_not_fail(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Polls waiting for the rate limit longer than the request timeout do not fail their devices."""
+    for index in range(2, DEVICE_COUNT + 1):
+        fake_saveconnect.add_device(device_identifier(index))
+    entry = await setup_integration(push=False)
+    api = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_API]
+    coordinator = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR]
+    api.scheduler = SaveConnectRequestScheduler(hass, rate=20, burst=1, request_timeout=0.05)
+
+    await coordinator.async_refresh()
+
+    assert api.scheduler.wait_time.max > api.scheduler.request_timeout
+    for device in hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]:
+        assert device.available
+        assert device.metrics.poll_failures == 0
+    api.scheduler.async_close()
+
+
+async def test_push_skips_polls_per_device(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Only the devices pushing their registers skip polls. The others keep being polled."""
+    fake_saveconnect.add_device(device_identifier(2))
+    entry = await setup_integration(push=True)
+    coordinator = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR]
+    pushing, quiet = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]
+
+    await fake_saveconnect.async_push(pushing.device_id, {Register.REG_SENSOR_RHS_PDM: 60})
+    await hass.async_block_till_done()
+    assert coordinator.push_healthy(pushing.device_id)
+    assert not coordinator.push_healthy(quiet.device_id)
+
+    polls = {device.device_id: device.metrics.poll_successes for device in (pushing, quiet)}
+    await coordinator.async_refresh()
+    assert pushing.metrics.poll_successes == polls[pushing.device_id]
+    assert quiet.metrics.poll_successes == polls[quiet.device_id] + 1
+
+
+async def test_push_during_read(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """A push arriving while a view read is in flight is applied as a push, and not learned as part of the view."""
+    entry = await setup_integration(push=True)
+    api = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_API]
+    coordinator = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR]
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+
+    fake_saveconnect.latency = 0.05
+    read = hass.async_create_task(device.async_update())
+    await asyncio.sleep(0.01)
+    api.client.data.update(device.device_id, [data_item(Register.REG_OUTPUT_SAF, 55)])
+    assert await read
+    await hass.async_block_till_done()
+
+    assert device.register_value(Register.REG_OUTPUT_SAF) == "55"
+    assert coordinator.push_healthy(device.device_id)
+    assert device.metrics.push_batch_size.count == 1
+    assert Register.REG_OUTPUT_SAF not in device._route_registers[DEVICE_HOME_ROUTE]
+
+
+async def test_push_dispatch_time(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """The dispatch time of a push covers the notification of the listeners, not only its buffering."""
+    entry = await setup_integration(push=True)
+    coordinator = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR]
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+    unsubscribe = coordinator.async_add_listener(lambda: time.sleep(LISTENER_TIME))
+
+    await fake_saveconnect.async_push(device.device_id, {Register.REG_OUTPUT_SAF: 55})
+    await hass.async_block_till_done()
+    unsubscribe()
+
+    assert device.metrics.callbacks == 1
+    assert device.metrics.mean_callback_time >= LISTENER_TIME
+
+
+async def test_push_read_is_scheduled(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """The read following pushes goes through the request scheduler, once for the pushes received meanwhile."""
+    entry = await setup_integration(push=True)
+    api = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_API]
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+    requests = api.scheduler.requests
+    home_reads = fake_saveconnect.requests[DEVICE_HOME_ROUTE]
+
+    fake_saveconnect.latency = 0.05
+    for value in (50, 55, 60):
+        await fake_saveconnect.async_push(device.device_id, {Register.REG_OUTPUT_SAF: value})
+    await asyncio.gather(*api._push_reads.values())
+    await hass.async_block_till_done()
+
+    assert api.scheduler.requests == requests + 1
+    assert fake_saveconnect.requests[DEVICE_HOME_ROUTE] == home_reads + 1
+    assert device.register_value(Register.REG_OUTPUT_SAF) == "60"
+
+
+async def test_device_failures_keep_account_available(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Devices failing on their own do not pause their account. Cycles in which every device fails do."""
+    for index in range(2, DEVICE_COUNT + 1):
+        fake_saveconnect.add_device(device_identifier(index))
+    entry = await setup_integration(push=False)
+    api = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_API]
+    coordinator = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR]
+    healthy, *failing = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]
+
+    fake_saveconnect.failing_devices.update(device.device_id for device in failing)
+    for _ in range(HA_SC_BREAKER_FAILURE_THRESHOLD + 1):
+        await coordinator.async_refresh()
+
+    assert healthy.available
+    assert api.breaker.closed
+    assert not any(device.available for device in failing)
+
+    fake_saveconnect.failing_devices.add(healthy.device_id)
+    for _ in range(HA_SC_BREAKER_FAILURE_THRESHOLD):
+        await coordinator.async_refresh()
+
+    assert api.breaker.open
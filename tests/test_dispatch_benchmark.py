@@ -0,0 +1,182 @@
+"""Benchmark of the register dispatch, against the if/elif chain it replaced.
+
+A stream of register updates, in the shape of full-registry poll responses, is replayed through both
+dispatches. They must leave the same state, and the time per update of each is reported.
+"""
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+from systemair.saveconnect.const import Airflow, UserModes
+from systemair.saveconnect.models import SaveConnectRegisterItem
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.const import DOMAIN, SAVECONNECT_DEVICES
+from custom_components.systemair.device import ALARM_REGISTERS, VERSION_REGISTER_STATE_FIELDS
+
+from .fake_saveconnect import FakeSaveConnectBackend, data_item
+
+CYCLES = 20
+REPEATS = 5
+
+
+class IfElifDispatch:
+    """The register dispatch of the integration before the field index, kept as the baseline."""
+
+    def __init__(self) -> None:
+        self.state = SimpleNamespace()
+
+    def set_update_callback(self, register, value, metadata):
+        if register in [Register.REG_USERMODE_MODE_HMI, Register.REG_USERMODE_HMI_CHANGE_REQUEST]:
+            self.state.user_mode = value
+        elif register in [Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF, Register.REG_SPEED_INDICATION_APP]:
+            self.state.airflow_level = value
+        elif register == Register.REG_SYSTEM_UNIT_MODEL1:
+            self.state.device_model = value
+        elif register == Register.REG_PU_RUNNING_VERSION_MAJOR:
+            if metadata.internalDeviceType == 1:
+                self.state.main_board_version_major = value
+            elif metadata.internalDeviceType == 2:
+                self.state.iam_version_major = value
+        elif register == Register.REG_PU_RUNNING_VERSION_MINOR:
+            if metadata.internalDeviceType == 1:
+                self.state.main_board_version_minor = value
+            elif metadata.internalDeviceType == 2:
+                self.state.iam_version_minor = value
+        elif register == Register.REG_PU_RUNNING_VERSION_BUILD:
+            if metadata.internalDeviceType == 1:
+                self.state.main_board_version_build = value
+            elif metadata.internalDeviceType == 2:
+                self.state.iam_version_build = value
+        elif register == Register.REG_ALARM_SAF_CTRL_ALARM:
+            self.state.alarm_supply_air_fan_control = value
+        elif register == Register.REG_ALARM_EAF_CTRL_ALARM:
+            self.state.alarm_extract_air_fan_control = value
+        elif register == Register.REG_ALARM_FROST_PROT_ALARM:
+            self.state.alarm_frost_protection = value
+        elif register == Register.REG_ALARM_DEFROSTING_ALARM:
+            self.state.alarm_defrosting_malfunction = value
+        elif register == Register.REG_ALARM_SAF_RPM_ALARM:
+            self.state.alarm_supply_air_fan_rpm = value
+        elif register == Register.REG_ALARM_EAF_RPM_ALARM:
+            self.state.alarm_extract_air_fan_rpm = value
+        elif register == Register.REG_ALARM_FPT_ALARM:
+            self.state.alarm_frost_protection_sensor = value
+        elif register == Register.REG_ALARM_OAT_ALARM:
+            self.state.alarm_outdoor_air_temperature_sensor = value
+        elif register == Register.REG_ALARM_SAT_ALARM:
+            self.state.alarm_supply_air_temperature_sensor = value
+        elif register == Register.REG_ALARM_RAT_ALARM:
+            self.state.alarm_room_air_temperature_sensor = value
+        elif register == Register.REG_ALARM_EAT_ALARM:
+            self.state.alarm_extract_air_temperature_sensor = value
+        elif register == Register.REG_ALARM_ECT_ALARM:
+            self.state.alarm_extra_controller_temperature = value
+        elif register == Register.REG_ALARM_EFT_ALARM:
+            self.state.alarm_efficiency_temperature = value
+        elif register == Register.REG_ALARM_OHT_ALARM:
+            self.state.alarm_overheat_temperature = value
+        elif register == Register.REG_ALARM_EMT_ALARM:
+            self.state.alarm_emergency_thermostat = value
+        elif register == Register.REG_ALARM_RGS_ALARM:
+            self.state.alarm_rotor_guard_sensor = value
+        elif register == Register.REG_ALARM_BYS_ALARM:
+            self.state.alarm_bypass_damper_malfunction = value
+        elif register == Register.REG_ALARM_SECONDARY_AIR_ALARM:
+            self.state.alarm_secondary_air_damper_position = value
+        elif register == Register.REG_ALARM_FILTER_ALARM:
+            self.state.alarm_filter_change = value
+        elif register == Register.REG_ALARM_EXTRA_CONTROLLER_ALARM:
+            self.state.alarm_extra_controller_malfunction = value
+        elif register == Register.REG_ALARM_EXTERNAL_STOP_ALARM:
+            self.state.alarm_external_stop = value
+        elif register == Register.REG_ALARM_RH_ALARM:
+            self.state.alarm_relative_humidity_sensor = value
+        elif register == Register.REG_ALARM_CO2_ALARM:
+            self.state.alarm_co2_sensor = value
+        elif register == Register.REG_ALARM_LOW_SAT_ALARM:
+            self.state.alarm_supply_air_temperature_low = value
+        elif register == Register.REG_ALARM_BYF_ALARM:
+            self.state.alarm_bypass_damper_feedback = value
+        elif register == Register.REG_ALARM_PDM_RHS_ALARM:
+            self.state.alarm_builtin_relative_humidity_sensor = value
+        elif register == Register.REG_ALARM_PDM_EAT_ALARM:
+            self.state.alarm_builtin_extract_air_temperature = value
+        elif register == Register.REG_ALARM_MANUAL_FAN_STOP_ALARM:
+            self.state.alarm_manual_stop = value
+        elif register == Register.REG_ALARM_OVERHEAT_TEMPERATURE_ALARM:
+            self.state.alarm_overheat_temperature2 = value
+        elif register == Register.REG_ALARM_FIRE_ALARM_ALARM:
+            self.state.alarm_fire_alarm = value
+        elif register == Register.REG_ALARM_FILTER_WARNING_ALARM:
+            self.state.alarm_filter_warning = value
+
+
+def update_stream(backend: FakeSaveConnectBackend, device_id: str) -> list[tuple[int, object, SaveConnectRegisterItem]]:
+    """Full-registry responses of a device whose mode, airflow, humidity and alarms change between cycles."""
+    alarms = list(ALARM_REGISTERS.values())
+    registers = backend.registers[device_id]
+    stream = []
+    for cycle in range(CYCLES):
+        registers[Register.REG_USERMODE_MODE_HMI] = UserModes.AWAY if cycle % 2 else UserModes.MANUAL
+        registers[Register.REG_SPEED_INDICATION_APP] = Airflow.HIGH if cycle % 3 else Airflow.NORMAL
+        registers[Register.REG_SENSOR_RHS_PDM] = 40 + cycle
+        registers[alarms[cycle % len(alarms)]] = "active"
+        registers[alarms[(cycle - 1) % len(alarms)]] = "inactive"
+
+        items = [
+            SaveConnectRegisterItem.parse_obj(item)
+            for item in backend.full_registry_response(device_id)["data"]["GetDeviceView"]["dataItems"]
+        ]
+        """Version registers are reported by the IAM as well as by the main board."""
+        items += [
+            SaveConnectRegisterItem.parse_obj({**data_item(register, cycle), "internalDeviceType": 2})
+            for register in VERSION_REGISTER_STATE_FIELDS
+        ]
+        stream += [(item.register_, item.value, item) for item in items]
+    return stream
+
+
+def replay(set_update_callback, stream) -> float:
+    """Return the best time, in seconds, to dispatch the whole stream."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for register, value, metadata in stream:
+            set_update_callback(register, value, metadata)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def test_dispatch_benchmark(
+        hass: HomeAssistant,
+        setup_integration,
+        fake_saveconnect: FakeSaveConnectBackend,
+        benchmark_report,
+) -> None:
+    """Replay the stream through both dispatches, which must agree on the resulting state."""
+    entry = await setup_integration(push=False)
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+    stream = update_stream(fake_saveconnect, device.device_id)
+
+    baseline = IfElifDispatch()
+    baseline_time = replay(baseline.set_update_callback, stream)
+    dispatch_time = replay(device.set_update_callback, stream)
+
+    for field in ("user_mode", "airflow_level", "device_model",
+                  "main_board_version_major", "main_board_version_minor", "main_board_version_build",
+                  "iam_version_major", "iam_version_minor", "iam_version_build"):
+        assert getattr(device.state, field) == getattr(baseline.state, field), field
+    for key in ALARM_REGISTERS:
+        assert device.state.is_alarm_active(key) == (getattr(baseline.state, key) == "active"), key
+    assert dispatch_time < baseline_time
+
+    benchmark_report.record(
+        "dispatch",
+        updates=len(stream),
+        if_elif_us_per_update=baseline_time * 1e6 / len(stream),
+        indexed_us_per_update=dispatch_time * 1e6 / len(stream),
+        speedup=baseline_time / dispatch_time,
+    )
@@ -0,0 +1,48 @@
+"""Tests for the fan of the Systemair SAVE Connect integration."""
+from homeassistant.components.fan import ATTR_PERCENTAGE, DOMAIN as FAN_DOMAIN, SERVICE_SET_PERCENTAGE
+from homeassistant.const import ATTR_ENTITY_ID, STATE_OFF, STATE_ON, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant
+from systemair.saveconnect.const import Airflow
+from systemair.saveconnect.register import Register
+
+from .fake_saveconnect import FakeSaveConnectBackend, device_identifier
+
+FAN = "fan.ventilation"
+
+
+async def test_set_low_percentage(hass: HomeAssistant, setup_integration) -> None:
+    """The low level written optimistically by a percentage of one third is shown as such."""
+    await setup_integration(push=True)
+
+    await hass.services.async_call(
+        FAN_DOMAIN, SERVICE_SET_PERCENTAGE, {ATTR_ENTITY_ID: FAN, ATTR_PERCENTAGE: 33}, blocking=True
+    )
+    await hass.async_block_till_done()
+
+    state = hass.states.get(FAN)
+    assert state.state == STATE_ON
+    assert state.attributes[ATTR_PERCENTAGE] == 33
+    assert state.attributes["fan_speed"] == Airflow.LOW
+
+
+async def test_airflow_levels(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Every airflow level reported by the device maps to a percentage. Unknown levels are unknown."""
+    await setup_integration(push=True)
+
+    for level, expected_state, expected_percentage in (
+            (Airflow.OFF, STATE_OFF, 0),
+            (Airflow.MINIMUM, STATE_ON, 33),
+            (Airflow.LOW, STATE_ON, 33),
+            (Airflow.NORMAL, STATE_ON, 66),
+            (Airflow.HIGH, STATE_ON, 100),
+            (Airflow.MAXIMUM, STATE_ON, 100),
+            ("turbo", STATE_UNKNOWN, None),
+    ):
+        await fake_saveconnect.async_push(device_identifier(1), {Register.REG_SPEED_INDICATION_APP: level})
+        await hass.async_block_till_done()
+
+        state = hass.states.get(FAN)
+        assert state.state == expected_state, level
+        assert state.attributes.get(ATTR_PERCENTAGE) == expected_percentage, level
@@ -0,0 +1,90 @@
+"""Import-time benchmark of the integration, and of the import of its library in the executor.
+
+The integration is imported in a fresh interpreter running with -X importtime, in the order Home
+Assistant imports it: the package on the event loop, the device module with the SaveConnect library
+in the executor at setup, then the platforms on the event loop again.
+"""
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+"""Budget, in milliseconds, of the import of the package on the event loop."""
+PACKAGE_IMPORT_BUDGET_MS = 100
+
+"""Home Assistant has loaded these by the time it imports the integration."""
+PRELOADED_MODULES = (
+    "homeassistant.config_entries",
+    "homeassistant.core",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+
+PLATFORM_MODULES = (
+    "custom_components.systemair.sensor",
+    "custom_components.systemair.fan",
+    "custom_components.systemair.binary_sensor",
+)
+
+IMPORT_SCRIPT = f"""
+import asyncio
+import sys
+import time
+
+for module in {PRELOADED_MODULES!r}:
+    __import__(module)
+
+import custom_components.systemair
+print("package imports library:", "systemair.saveconnect" in sys.modules)
+
+async def main():
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    await loop.run_in_executor(None, custom_components.systemair._import_device_module, loop)
+    print("executor import ms:", (time.perf_counter() - start) * 1000)
+
+asyncio.run(main())
+print("executor imports library:", "systemair.saveconnect" in sys.modules)
+
+for module in {PLATFORM_MODULES!r}:
+    __import__(module)
+"""
+
+
+def import_times(stderr: str) -> dict[str, float]:
+    """Return the cumulative import time, in milliseconds, of each module in the -X importtime output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test_import_time(benchmark_report) -> None:
+    """The package does not import the library, which imports in an executor thread."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert "package imports library: False" in result.stdout
+    assert "executor imports library: True" in result.stdout
+
+    times = import_times(result.stderr)
+    """importlib.import_module is not timed by -X importtime, so the script times the executor import itself."""
+    executor_ms = float(result.stdout.split("executor import ms:")[1].split()[0])
+    assert times["custom_components.systemair"] < PACKAGE_IMPORT_BUDGET_MS
+
+    benchmark_report.record(
+        "import",
+        package_ms=times["custom_components.systemair"],
+        executor_ms=executor_ms,
+        **{f"{module.rsplit('.', 1)[1]}_ms": times[module] for module in PLATFORM_MODULES},
+    )
@@ -0,0 +1,131 @@
+"""Tests for the setup of the Systemair SAVE Connect integration."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.systemair.const import (DOMAIN, HA_SC_MAX_CONCURRENT_REQUESTS, SAVECONNECT_API, SAVECONNECT_DEVICES,
+                                               SNAPSHOT_SAVE_DELAY)
+
+from .fake_saveconnect import FakeSaveConnectBackend, device_identifier
+
+
+async def test_setup_and_unload(hass: HomeAssistant, setup_integration) -> None:
+    entry = await setup_integration()
+    assert entry.state is ConfigEntryState.LOADED
+
+    devices = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]
+    assert len(devices) == 1
+    assert devices[0].available
+    assert devices[0].name == "Systemair VTR 300"
+    assert hass.states.get("fan.ventilation").state == "on"
+    assert hass.states.get("sensor.outdoor_temperature").state == "5.2"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.NOT_LOADED
+
+
+async def test_setup_concurrency_cap(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Devices are set up concurrently, with at most max_concurrent_requests requests in flight."""
+    for index in range(2, 11):
+        fake_saveconnect.add_device(device_identifier(index))
+    fake_saveconnect.latency = 0.02
+
+    entry = await setup_integration(options={HA_SC_MAX_CONCURRENT_REQUESTS: 3})
+
+    devices = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]
+    assert len(devices) == 10
+    assert all(device.available for device in devices)
+    """Requests overlap while the backend delays its answers, but never beyond the cap."""
+    assert fake_saveconnect.max_in_flight == 3
+
+
+async def test_setup_retries_failing_device(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """A device failing during setup is unavailable, and set up in the background once it answers again."""
+    fake_saveconnect.add_device(device_identifier(2))
+    fake_saveconnect.failing_devices.add(device_identifier(2))
+
+    with patch("custom_components.systemair.device.HA_SC_SETUP_RETRY_INTERVAL", timedelta(milliseconds=10)):
+        entry = await setup_integration()
+        assert entry.state is ConfigEntryState.LOADED
+        devices = {device.device_id: device for device in hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]}
+        assert devices[device_identifier(1)].available
+        assert not devices[device_identifier(2)].available
+
+        """Retries keep failing while the device does."""
+        await asyncio.sleep(0.05)
+        await hass.async_block_till_done()
+        assert not devices[device_identifier(2)].available
+
+        fake_saveconnect.failing_devices.clear()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            await hass.async_block_till_done()
+            if devices[device_identifier(2)].available:
+                break
+
+    assert devices[device_identifier(2)].available
+    assert devices[device_identifier(2)].name == "Systemair VTR 300"
+
+
+
+async def test_unload_cancels_setup_retry(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration
+) -> None:
+    """Unloading the entry while a device is still retried cancels the retry, and unloads cleanly."""
+    fake_saveconnect.failing_devices.add(device_identifier(1))
+    entry = await setup_integration()
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+    assert not device.available
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.NOT_LOADED
+    assert not [task for task in asyncio.all_tasks() if task.get_name().startswith(f"{DOMAIN} retry setup")]
+
+async def test_entries_share_client(hass: HomeAssistant, setup_integration) -> None:
+    """Entries of the same account share a single client, which lists the devices again for the second entry."""
+    first = await setup_integration()
+    second = await setup_integration()
+    assert second.state is ConfigEntryState.LOADED
+
+    api = hass.data[DOMAIN][first.entry_id][SAVECONNECT_API]
+    assert hass.data[DOMAIN][second.entry_id][SAVECONNECT_API] is api
+    assert api.ref_count == 2
+    assert api.tokens.login_count == 1
+    assert all(device.available for device in hass.data[DOMAIN][second.entry_id][SAVECONNECT_DEVICES])
+
+
+
+async def test_restore_while_offline_keeps_snapshot(
+        hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration, hass_storage
+) -> None:
+    """An entry restored from its snapshot while the API is unreachable keeps its devices and the snapshot."""
+    entry = await setup_integration()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=SNAPSHOT_SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+    snapshot_key = f"{DOMAIN}.snapshot_{entry.entry_id}"
+    assert device_identifier(1) in hass_storage[snapshot_key]["data"]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    fake_saveconnect.offline = True
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.LOADED
+    devices = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES]
+    assert [device.device_id for device in devices] == [device_identifier(1)]
+    assert devices[0].stale
+    assert device_identifier(1) in hass_storage[snapshot_key]["data"]
+    assert hass.states.get("sensor.outdoor_temperature").state == "5.2"
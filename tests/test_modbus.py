@@ -0,0 +1,171 @@
+"""Tests for the local Modbus/TCP transport of the Systemair SAVE Connect integration, against a simulated unit."""
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.components.fan import ATTR_PERCENTAGE, DOMAIN as FAN_DOMAIN, SERVICE_SET_PERCENTAGE
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import ATTR_ENTITY_ID, STATE_ON
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from systemair.saveconnect.const import UserModes
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.const import DEVICE_HOME_ROUTE, DOMAIN, SAVECONNECT_DEVICES, SAVECONNECT_NAME
+from custom_components.systemair.modbus import (LOCAL_VIEW_REGISTERS, SaveConnectModbusAPI,
+                                                SaveConnectModbusConnection, register_blocks)
+
+from .conftest import local_config_entry
+from .modbus_simulator import SLAVE, ModbusSimulator
+
+
+async def test_local_transport(hass: HomeAssistant, modbus_simulator: ModbusSimulator) -> None:
+    """The entities read the registers of the unit, and commands are written to it."""
+    entry = local_config_entry(modbus_simulator)
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.LOADED
+
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+    assert device.available
+    fan = hass.states.get("fan.ventilation")
+    assert fan.state == STATE_ON
+    assert fan.attributes[ATTR_PERCENTAGE] == 66
+    assert fan.attributes["preset_mode"] == "Manual"
+
+    """Temperatures are signed."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{SAVECONNECT_NAME}-{device.device_id}-outdoor_temperature"
+    )
+    assert hass.states.get(entity_id).state == "-5.2"
+
+    await hass.services.async_call(
+        FAN_DOMAIN, SERVICE_SET_PERCENTAGE, {ATTR_ENTITY_ID: "fan.ventilation", ATTR_PERCENTAGE: 100}, blocking=True
+    )
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert modbus_simulator.value(Register.REG_USERMODE_MANUAL_AIRFLOW_LEVEL_SAF) == 4
+    assert hass.states.get("fan.ventilation").attributes[ATTR_PERCENTAGE] == 100
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+class _ModbusResponse:
+    registers = [1]
+
+    def isError(self) -> bool:
+        return False
+
+
+class _DeviceIdModbusClient:
+    """Client with the request signatures of pymodbus 3.10, where `slave` was renamed to `device_id`."""
+
+    def __init__(self, host, port, timeout) -> None:
+        self.connected = False
+        self.requests = []
+
+    async def connect(self) -> None:
+        self.connected = True
+
+    async def read_holding_registers(self, address, *, count=1, device_id=1, no_response_expected=False):
+        self.requests.append(("read", address, count, device_id))
+        return _ModbusResponse()
+
+    async def write_register(self, address, value, *, device_id=1, no_response_expected=False):
+        self.requests.append(("write", address, value, device_id))
+        return _ModbusResponse()
+
+    def close(self) -> None:
+        self.connected = False
+
+
+async def test_device_id_keyword() -> None:
+    """The unit identifier is passed as `device_id` to pymodbus versions that renamed `slave`."""
+    connection = SaveConnectModbusConnection("127.0.0.1", 502)
+    with patch("pymodbus.client.AsyncModbusTcpClient", _DeviceIdModbusClient):
+        assert await connection.read_registers(3, 1160, 1) == [1]
+        await connection.write_register(3, 1130, 2)
+
+    assert connection._client.requests == [("read", 1160, 1, 3), ("write", 1130, 2, 3)]
+    connection.close()
+
+
+def test_register_blocks() -> None:
+    """Addresses are grouped into blocks bridging gaps up to max_gap, and spanning at most max_size registers."""
+    assert register_blocks([], max_gap=16, max_size=125) == []
+    assert register_blocks([5, 3, 4, 4], max_gap=0, max_size=125) == [(3, 3)]
+
+    """Gaps of exactly max_gap unused registers are bridged, larger ones are not."""
+    assert register_blocks([10, 13], max_gap=2, max_size=125) == [(10, 4)]
+    assert register_blocks([10, 14], max_gap=2, max_size=125) == [(10, 1), (14, 1)]
+
+    """A block ends before it would span more than max_size registers."""
+    assert register_blocks(range(10), max_gap=0, max_size=4) == [(0, 4), (4, 4), (8, 2)]
+    assert register_blocks([0, 3, 4], max_gap=16, max_size=4) == [(0, 4), (4, 1)]
+    assert register_blocks([0, 1, 2], max_gap=0, max_size=1) == [(0, 1), (1, 1), (2, 1)]
+
+    """Every address is covered, and blocks do not overlap."""
+    addresses = [1000, 1001, 1030, 1100, 1101, 1250, 1500, 1501, 1502]
+    blocks = register_blocks(addresses, max_gap=16, max_size=125)
+    assert all(any(start <= address < start + count for start, count in blocks) for address in addresses)
+    assert all(start + count <= next_start for (start, count), (next_start, _) in zip(blocks, blocks[1:]))
+    assert all(count <= 125 for _, count in blocks)
+
+
+async def test_read_view_splits_rejected_blocks(hass: HomeAssistant, modbus_simulator: ModbusSimulator) -> None:
+    """A block read rejected by the unit, which does not serve the gaps, is split into gapless reads from then on."""
+    api = SaveConnectModbusAPI(hass, "127.0.0.1", modbus_simulator.port, SLAVE, max_gap=16, max_block_size=125)
+    device = (await api.get_devices())[0]
+    values = {}
+    device.add_update_callback(lambda register, value, metadata: values.__setitem__(register, value))
+
+    try:
+        planned = list(api._plan_view(DEVICE_HOME_ROUTE)[1])
+        assert await api.read_view(device, DEVICE_HOME_ROUTE)
+        split = api._plan_view(DEVICE_HOME_ROUTE)[1]
+        assert len(split) > len(planned)
+        assert values[Register.REG_SENSOR_OAT] == "-52"
+        assert values[Register.REG_USERMODE_MODE_HMI] == UserModes.MANUAL
+
+        """The split plan is reused, without rejected reads."""
+        requests = api.read_requests
+        assert await api.read_view(device, DEVICE_HOME_ROUTE)
+        assert api.read_requests - requests == len(split)
+    finally:
+        await api.async_close()
+
+
+async def test_block_read_benchmark(hass: HomeAssistant, socket_enabled, benchmark_report) -> None:
+    """Compare block reads with per-register reads, on a bus taking 5 ms per request."""
+    simulator = ModbusSimulator(latency=0.005, dense=True)
+    simulator.start()
+    try:
+        results = {}
+        for name, max_gap, max_block_size in (("per_register", 0, 1), ("blocks", 16, 125)):
+            api = SaveConnectModbusAPI(hass, "127.0.0.1", simulator.port, SLAVE, max_gap, max_block_size)
+            device = (await api.get_devices())[0]
+            start = time.perf_counter()
+            for route in LOCAL_VIEW_REGISTERS:
+                assert await api.read_view(device, route)
+            results[name] = (api.read_requests, api.registers_read, time.perf_counter() - start)
+            await api.async_close()
+    finally:
+        simulator.stop()
+
+    per_register_requests, _, per_register_time = results["per_register"]
+    block_requests, block_registers, block_time = results["blocks"]
+    assert per_register_requests == sum(len(registers) for registers in LOCAL_VIEW_REGISTERS.values())
+    assert block_requests * 2 < per_register_requests
+    assert block_time < per_register_time
+    benchmark_report.record(
+        "modbus reads",
+        per_register_requests=per_register_requests,
+        per_register_ms=per_register_time * 1000,
+        block_requests=block_requests,
+        block_registers=block_registers,
+        block_ms=block_time * 1000,
+    )
@@ -0,0 +1,41 @@
+"""Tests for the request scheduler of the Systemair SAVE Connect integration."""
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.systemair.scheduler import SaveConnectRequestScheduler
+
+REQUEST_TIMEOUT = 0.05
+
+
+async def async_request(duration: float) -> bool:
+    await asyncio.sleep(duration)
+    return True
+
+
+async def test_queue_wait_is_not_timed(hass: HomeAssistant) -> None:
+    """Requests waiting longer than the timeout for a token still run, with the full timeout."""
+    scheduler = SaveConnectRequestScheduler(hass, rate=20, burst=1, request_timeout=REQUEST_TIMEOUT)
+
+    results = await asyncio.gather(*(
+        scheduler.async_read(index, lambda: async_request(REQUEST_TIMEOUT / 2)) for index in range(5)
+    ))
+
+    assert results == [True] * 5
+    assert scheduler.wait_time.max > REQUEST_TIMEOUT
+    assert scheduler.failures == 0
+    assert scheduler.rate == scheduler.max_rate
+    scheduler.async_close()
+
+
+async def test_request_timeout(hass: HomeAssistant) -> None:
+    """A request running longer than the timeout fails, and lowers the rate."""
+    scheduler = SaveConnectRequestScheduler(hass, rate=20, burst=1, request_timeout=REQUEST_TIMEOUT)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.async_read("slow", lambda: async_request(REQUEST_TIMEOUT * 4))
+
+    assert scheduler.failures == 1
+    assert scheduler.rate < scheduler.max_rate
+    scheduler.async_close()
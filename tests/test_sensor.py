@@ -0,0 +1,41 @@
+"""Tests for the sensors of the Systemair SAVE Connect integration."""
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.const import DOMAIN, SAVECONNECT_COORDINATOR, SAVECONNECT_DEVICES, SAVECONNECT_NAME
+from custom_components.systemair.derived import DAYS_PER_MONTH
+
+from .fake_saveconnect import FakeSaveConnectBackend
+
+FILTER_REMAINING_DAYS = 90
+
+
+def sensor_state(hass: HomeAssistant, device_id: str, key: str) -> str:
+    entity_id = er.async_get(hass).async_get_entity_id("sensor", DOMAIN, f"{SAVECONNECT_NAME}-{device_id}-{key}")
+    return hass.states.get(entity_id).state
+
+
+async def test_filter_due(hass: HomeAssistant, fake_saveconnect: FakeSaveConnectBackend, setup_integration) -> None:
+    """The filter due date is seeded from the countdown of the unit, and does not move as it counts down."""
+    entry = await setup_integration(push=False)
+    coordinator = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_COORDINATOR]
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+
+    due = dt_util.parse_datetime(sensor_state(hass, device.device_id, "filter_due"))
+    expected = dt_util.utcnow() + timedelta(days=FILTER_REMAINING_DAYS)
+    assert abs(due - expected) < timedelta(minutes=1)
+    assert device.derived.filter_replaced == device.derived.filter_due - timedelta(days=12 * DAYS_PER_MONTH)
+
+    fake_saveconnect.registers[device.device_id][Register.REG_FILTER_REMAINING_TIME_L] -= 600
+    await device.async_update_device_info()
+    await coordinator.async_refresh()
+    assert sensor_state(hass, device.device_id, "filter_due") == due.isoformat()
+
+    fake_saveconnect.registers[device.device_id][Register.REG_ALARM_FILTER_ALARM] = "active"
+    await coordinator.async_refresh()
+    due = dt_util.parse_datetime(sensor_state(hass, device.device_id, "filter_due"))
+    assert abs(due - dt_util.utcnow()) < timedelta(minutes=1)
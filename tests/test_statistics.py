@@ -0,0 +1,74 @@
+"""Tests for the import of sensor readings as long-term statistics of the Systemair SAVE Connect integration."""
+from datetime import datetime, timedelta
+
+import pytest
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.components.recorder import Recorder, get_instance
+from homeassistant.components.recorder.statistics import list_statistic_ids, statistics_during_period
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.components.recorder.common import async_wait_recording_done
+from systemair.saveconnect.register import Register
+
+from custom_components.systemair.const import DOMAIN, HA_SC_IMPORT_STATISTICS, SAVECONNECT_DEVICES
+from custom_components.systemair.statistics import HourlyAggregate
+
+from .fake_saveconnect import FakeSaveConnectBackend
+
+HOUR_START = datetime.fromisoformat("2026-10-16T10:00:00+00:00")
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(recorder_db_url, enable_custom_integrations):
+    """Load the integration from custom_components. The database of the recorder must be set up before hass."""
+    yield
+
+
+async def async_statistics(hass: HomeAssistant, statistic_id: str) -> list[dict]:
+    statistics = await get_instance(hass).async_add_executor_job(
+        statistics_during_period, hass, HOUR_START, None, {statistic_id}, "hour", None, {"mean", "min", "max"}
+    )
+    return statistics.get(statistic_id, [])
+
+
+async def test_import_statistics(
+        recorder_mock: Recorder,
+        hass: HomeAssistant,
+        fake_saveconnect: FakeSaveConnectBackend,
+        setup_integration,
+        freezer: FrozenDateTimeFactory,
+) -> None:
+    """Readings of the sensors the recorder does not record are imported per hour, weighted by how long they held."""
+    freezer.move_to(HOUR_START)
+    entry = await setup_integration(push=True, options={HA_SC_IMPORT_STATISTICS: True})
+    device = hass.data[DOMAIN][entry.entry_id][SAVECONNECT_DEVICES][0]
+
+    await fake_saveconnect.async_push(device.device_id, {Register.REG_SENSOR_EAT: 200})
+    freezer.move_to(HOUR_START + timedelta(minutes=45))
+    await fake_saveconnect.async_push(device.device_id, {Register.REG_SENSOR_EAT: 300})
+    freezer.move_to(HOUR_START + timedelta(minutes=65))
+    await fake_saveconnect.async_push(device.device_id, {Register.REG_SENSOR_EAT: 300})
+    await hass.async_block_till_done()
+    await async_wait_recording_done(hass)
+
+    """The extract temperature sensor of the catalog is disabled, so its readings are imported."""
+    statistics = await async_statistics(hass, f"{DOMAIN}:{device.device_id.lower()}_extract_temperature")
+    assert len(statistics) == 1
+    assert statistics[0]["mean"] == 20.0 * 0.75 + 30.0 * 0.25
+    assert (statistics[0]["min"], statistics[0]["max"]) == (20.0, 30.0)
+
+    """The outdoor temperature sensor is enabled, and recorded by the recorder, so its readings are not imported."""
+    statistic_ids = await get_instance(hass).async_add_executor_job(list_statistic_ids, hass)
+    assert f"{DOMAIN}:{device.device_id.lower()}_outdoor_temperature" not in {
+        statistic["statistic_id"] for statistic in statistic_ids
+    }
+
+
+def test_checkpoint_holds_until_saved() -> None:
+    """A value restored from a checkpoint holds until the checkpoint was saved, not over the downtime."""
+    aggregate = HourlyAggregate(HOUR_START)
+    aggregate.record(HOUR_START, 20.0)
+    restored = HourlyAggregate.from_dict(aggregate.as_dict(HOUR_START + timedelta(minutes=15)))
+
+    restored.record(HOUR_START + timedelta(minutes=45), 30.0)
+    restored.advance(HOUR_START + timedelta(hours=1))
+    assert restored.as_statistic()["mean"] == 25.0